@@ -6,17 +6,33 @@ from datalad_remake._version import __version__
 from datalad_remake.utils.patternpath import PatternPath
 
 __all__ = [
+    'PatternPath',
     '__version__',
+    'admission_dir_config_key',
     'allow_untrusted_execution_key',
     'auto_remote_name',
+    'background_cleanup_config_key',
+    'cache_dir_config_key',
     'command_suite',
+    'cpu_budget_config_key',
+    'daemon_config_key',
+    'daemon_idle_timeout_config_key',
+    'daemon_socket_config_key',
+    'failure_backoff_config_key',
+    'memory_budget_config_key',
+    'metrics_file_config_key',
+    'output_discovery_config_key',
     'priority_config_key',
+    'queue_dir_config_key',
+    'queue_timeout_config_key',
+    'scratch_dirs_config_key',
+    'scratch_quota_config_key',
+    'scratch_reserve_config_key',
     'specification_dir',
     'template_dir',
     'trusted_keys_config_key',
     'url_scheme',
     'worktree_source_config_key',
-    'PatternPath',
 ]
 
 
@@ -48,6 +64,46 @@ command_suite = (
             # optional name of the command in the Python API
             'provision',
         ),
+        (
+            # importable module that contains the command implementation
+            'datalad_remake.commands.realize_cmd',
+            # name of the command class implementation in above module
+            'Realize',
+            # optional name of the command in the cmdline API
+            'make-realize',
+            # optional name of the command in the Python API
+            'make_realize',
+        ),
+        (
+            # importable module that contains the command implementation
+            'datalad_remake.commands.worker_cmd',
+            # name of the command class implementation in above module
+            'MakeWorker',
+            # optional name of the command in the cmdline API
+            'make-worker',
+            # optional name of the command in the Python API
+            'make_worker',
+        ),
+        (
+            # importable module that contains the command implementation
+            'datalad_remake.commands.clear_failures_cmd',
+            # name of the command class implementation in above module
+            'ClearFailures',
+            # optional name of the command in the cmdline API
+            'make-clear-failures',
+            # optional name of the command in the Python API
+            'make_clear_failures',
+        ),
+        (
+            # importable module that contains the command implementation
+            'datalad_remake.commands.gc_cmd',
+            # name of the command class implementation in above module
+            'GarbageCollect',
+            # optional name of the command in the cmdline API
+            'make-gc',
+            # optional name of the command in the Python API
+            'make_gc',
+        ),
     ],
 )
 
@@ -60,3 +116,19 @@ allow_untrusted_execution_key = 'datalad.make.allow-untrusted-execution.d-'
 priority_config_key = 'datalad.make.priority'
 auto_remote_name = 'datalad-remake-auto'
 worktree_source_config_key = 'datalad.make.provision-source'
+scratch_dirs_config_key = 'datalad.make.scratch-dirs'
+scratch_quota_config_key = 'datalad.make.scratch-quota'
+scratch_reserve_config_key = 'datalad.make.scratch-reserve'
+background_cleanup_config_key = 'datalad.make.background-cleanup'
+output_discovery_config_key = 'datalad.make.output-discovery'
+cpu_budget_config_key = 'datalad.make.cpu-budget'
+memory_budget_config_key = 'datalad.make.memory-budget'
+admission_dir_config_key = 'datalad.make.admission-dir'
+metrics_file_config_key = 'datalad.make.metrics-file'
+daemon_config_key = 'datalad.make.daemon'
+daemon_socket_config_key = 'datalad.make.daemon-socket'
+daemon_idle_timeout_config_key = 'datalad.make.daemon-idle-timeout'
+queue_dir_config_key = 'datalad.make.queue-dir'
+queue_timeout_config_key = 'datalad.make.queue-timeout'
+cache_dir_config_key = 'datalad.make.cache-dir'
+failure_backoff_config_key = 'datalad.make.failure-backoff'
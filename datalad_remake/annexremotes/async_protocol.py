@@ -0,0 +1,207 @@
+"""Support for the `ASYNC` extension of the git-annex special remote protocol
+
+If git-annex offers the `ASYNC` extension, and the special remote accepts it,
+git-annex sends the requests of all its jobs over a single connection. Every
+message is prefixed with a job number, e.g.::
+
+    J 1 TRANSFER RETRIEVE <key> <file>
+    J 2 TRANSFER RETRIEVE <key> <file>
+    J 1 GETURLS <key> datalad-remake:
+    J 1 VALUE datalad-remake:///?...
+
+`AsyncMaster` handles every request in its own thread. Replies of git-annex to
+questions of a request, e.g. `VALUE`-messages, are routed to the thread that
+handles the request. All messages that a thread sends are prefixed with its job
+number. A single special remote process can therefore perform multiple
+computations concurrently, instead of git-annex starting one process per job.
+
+If git-annex does not offer `ASYNC`, `AsyncMaster` behaves like
+`annexremote.Master`.
+"""
+
+from __future__ import annotations
+
+import logging
+import sys
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from queue import Queue
+from typing import (
+    TYPE_CHECKING,
+    Any,
+)
+
+from annexremote import (
+    Master,
+    NotLinkedError,
+    Protocol,
+    UnsupportedRequest,
+)
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+lgr = logging.getLogger('datalad.remake.annexremotes.async_protocol')
+
+
+# Prefix of all messages that belong to a job
+job_prefix = 'J'
+
+
+class AsyncProtocol(Protocol):
+    """Protocol that accepts the `ASYNC` extension, if git-annex offers it"""
+
+    def __init__(self, remote):
+        super().__init__(remote)
+        self.asynchronous = False
+
+    def do_EXTENSIONS(self, param):  # noqa: N802
+        reply = super().do_EXTENSIONS(param)
+        if 'ASYNC' in self.extensions:
+            self.asynchronous = True
+            return reply + ' ASYNC'
+        return reply
+
+
+class JobChannel:
+    """Receives the messages that git-annex sends to a single job"""
+
+    def __init__(self, job_id: str):
+        self.job_id = job_id
+        self.messages: Queue = Queue()
+
+    def readline(self) -> str:
+        return self.messages.get()
+
+    def put(self, message: str) -> None:
+        self.messages.put(message)
+
+
+class AsyncMaster(Master):
+    """A `Master` that handles jobs of git-annex concurrently"""
+
+    def __init__(self, output=sys.stdout):
+        super().__init__(output=output)
+        self._input: Any = None
+        self._output_lock = threading.Lock()
+        self._channels_lock = threading.Lock()
+        self._channels: dict[str, JobChannel] = {}
+        self._local = threading.local()
+        self._failed = False
+
+    @property
+    def input(self) -> Any:
+        """The channel of the job of the current thread, or the real input"""
+        channel = getattr(self._local, 'channel', None)
+        return self._input if channel is None else channel
+
+    @input.setter
+    def input(self, value: Any) -> None:
+        self._input = value
+
+    def LinkRemote(self, remote):  # noqa: N802
+        super().LinkRemote(remote)
+        self.protocol = AsyncProtocol(remote)
+
+    def Listen(self, input: Any = sys.stdin):  # noqa: N802, A002
+        if not (hasattr(self, 'remote') and hasattr(self, 'protocol')):
+            msg = 'Please execute LinkRemote(remote) first.'
+            raise NotLinkedError(msg)
+
+        self.input = input
+        self._send(self.protocol.version)
+        with ThreadPoolExecutor(thread_name_prefix='remake-job') as executor:
+            while True:
+                line = self._input.readline()
+                if not line:
+                    break
+                line = line.rstrip()
+                job_id, message = self._split_job(line)
+                if job_id is None:
+                    # Messages without a job number are handled synchronously,
+                    # e.g. `EXTENSIONS`, or all messages if git-annex does
+                    # not use the `ASYNC` extension.
+                    if not self._handle(message):
+                        raise SystemExit
+                    continue
+
+                with self._channels_lock:
+                    channel = self._channels.get(job_id)
+                    if channel is not None:
+                        # A reply to a question of a running job
+                        channel.put(message)
+                        continue
+                    channel = JobChannel(job_id)
+                    self._channels[job_id] = channel
+                executor.submit(self._run_job, channel, message)
+        if self._failed:
+            raise SystemExit
+
+    def bind_to_job(self, func: Callable) -> Callable:
+        """Bind `func` to the job of the current thread
+
+        Messages that `func` sends belong to the job of the current thread,
+        even if `func` is called from another thread, e.g. to report
+        progress.
+        """
+        channel = getattr(self._local, 'channel', None)
+
+        def bound(*args, **kwargs):
+            previous = getattr(self._local, 'channel', None)
+            self._local.channel = channel
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self._local.channel = previous
+
+        return bound
+
+    def _split_job(self, line: str) -> tuple[str | None, str]:
+        if not self.protocol.asynchronous:
+            return None, line
+        parts = line.split(' ', 2)
+        if len(parts) == 3 and parts[0] == job_prefix:
+            return parts[1], parts[2]
+        return None, line
+
+    def _run_job(self, channel: JobChannel, message: str) -> None:
+        self._local.channel = channel
+        try:
+            self._handle(message, channel)
+        finally:
+            self._local.channel = None
+
+    def _handle(self, message: str, channel: JobChannel | None = None) -> bool:
+        """Handle a request and send the reply, return `False` on failure"""
+        try:
+            reply = self.protocol.command(message)
+        except UnsupportedRequest:
+            reply = 'UNSUPPORTED-REQUEST'
+        except Exception as e:  # noqa: BLE001
+            lgr.debug('request %r failed', message, exc_info=True)
+            self._unregister(channel)
+            for line in traceback.format_exc().splitlines():
+                self.debug(line)
+            self.error(e)
+            self._failed = True
+            return False
+        # The job is finished before its reply is sent. The next message with
+        # its job number is therefore a new request.
+        self._unregister(channel)
+        if reply:
+            self._send(reply)
+        return True
+
+    def _unregister(self, channel: JobChannel | None) -> None:
+        if channel is None:
+            return
+        with self._channels_lock:
+            self._channels.pop(channel.job_id, None)
+
+    def _send(self, *args, **kwargs):
+        channel = getattr(self._local, 'channel', None)
+        if channel is not None:
+            args = (f'{job_prefix} {channel.job_id}', *args)
+        with self._output_lock:
+            super()._send(*args, **kwargs)
@@ -0,0 +1,51 @@
+"""Requests of the special remote that can be answered without DataLad
+
+This module must not import DataLad, `datalad_next`, or `datalad_core`, see
+`datalad_remake.annexremotes.entrypoint`.
+"""
+
+from __future__ import annotations
+
+from typing import Any
+
+from datalad_remake import url_scheme
+
+
+class CheapRequestsMixin:
+    """Answer requests that do not require DataLad
+
+    This mixin has to precede the special remote base class.
+    """
+
+    annex: Any
+
+    def _check_url(self, url: str) -> bool:
+        return url.startswith((f'URL--{url_scheme}:', f'{url_scheme}:'))
+
+    def prepare(self):
+        self.annex.debug('PREPARE')
+
+    def initremote(self):
+        self.annex.debug('INITREMOTE')
+
+    def remove(self, key: str):
+        self.annex.debug(f'REMOVE {key!r}')
+
+    def transfer_store(self, key: str, local_file: str):
+        self.annex.debug(f'TRANSFER STORE {key!r}, {local_file!r}')
+
+    def claimurl(self, url: str) -> bool:
+        self.annex.debug(f'CLAIMURL {url!r}')
+        return self._check_url(url)
+
+    def checkurl(self, url: str) -> bool:
+        self.annex.debug(f'CHECKURL {url!r}')
+        return self._check_url(url)
+
+    def getcost(self) -> int:
+        self.annex.debug('GETCOST')
+        return 100
+
+    def checkpresent(self, key: str) -> bool:
+        # See if at least one URL with the remake url-scheme is present
+        return self.annex.geturls(key, f'{url_scheme}:') != []
@@ -0,0 +1,232 @@
+"""Long-lived remake daemon
+
+The daemon performs computations for special remote processes, see
+`datalad_remake.annexremotes.daemon_client`. It loads DataLad and its
+extensions once, and keeps process-wide state, e.g. compiled method templates
+and persistent workers, across separate `git annex get` invocations and across
+datasets.
+
+The daemon listens on a Unix socket and handles every connection in its own
+thread. Only one daemon is running per socket, which is ensured by an
+`fcntl`-lock on a lock file next to the socket. The daemon exits, if it has
+not received a request for the configured idle timeout.
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import json
+import logging
+import socketserver
+import threading
+import time
+from pathlib import Path
+from typing import (
+    TYPE_CHECKING,
+    Any,
+)
+
+from datalad_remake.annexremotes.daemon_client import (
+    default_idle_timeout,
+    environment_digest,
+    prepare_socket_dir,
+)
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None  # type: ignore[assignment]
+
+lgr = logging.getLogger('datalad.remake.annexremotes.daemon')
+
+
+# Seconds between two checks of the idle timeout
+idle_check_interval = 1.0
+
+
+class DaemonAnnex:
+    """Stand-in for `annexremote.Master` in requests of the daemon
+
+    Questions to git-annex are answered from the request, messages to
+    git-annex are sent to the client, which relays them.
+    """
+
+    def __init__(self, request: dict[str, Any], send: Callable[[dict], None]):
+        self.request = request
+        self.send = send
+
+    def getgitdir(self) -> str:
+        return self.request['git_dir']
+
+    def geturls(self, key: str, prefix: str) -> list[str]:
+        if key != self.request['key']:
+            msg = f'URLs of key {key!r} were not sent by the client'
+            raise ValueError(msg)
+        return [url for url in self.request['urls'] if url.startswith(prefix)]
+
+    def debug(self, *args) -> None:
+        self.send({'type': 'debug', 'value': ' '.join(map(str, args))})
+
+    def info(self, message: str) -> None:
+        self.send({'type': 'info', 'value': message})
+
+    def error(self, *args) -> None:
+        self.debug('ERROR', *args)
+
+    def progress(self, progress: int) -> None:
+        self.send({'type': 'progress', 'value': int(progress)})
+
+
+class RequestHandler(socketserver.StreamRequestHandler):
+    server: RemakeDaemon
+
+    def handle(self):
+        line = self.rfile.readline()
+        if not line:
+            return
+        with self.server.active():
+            request = json.loads(line)
+            self.send(self.server.handle_request_message(request, self.send))
+
+    def send(self, message: dict) -> None:
+        self.wfile.write((json.dumps(message) + '\n').encode())
+        self.wfile.flush()
+
+
+class RemakeDaemon(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(
+        self,
+        socket_path: Path,
+        idle_timeout: float = default_idle_timeout,
+        remote_factory: Callable[[Any], Any] | None = None,
+    ):
+        super().__init__(str(socket_path), RequestHandler)
+        self.socket_path = socket_path
+        self.idle_timeout = idle_timeout
+        self.remote_factory = remote_factory or _create_remote
+        self.environment = environment_digest()
+        self._lock = threading.Lock()
+        self._active_requests = 0
+        self._last_activity = time.monotonic()
+
+    @contextlib.contextmanager
+    def active(self):
+        with self._lock:
+            self._active_requests += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._active_requests -= 1
+                self._last_activity = time.monotonic()
+
+    def is_idle(self) -> bool:
+        with self._lock:
+            return (
+                self._active_requests == 0
+                and time.monotonic() - self._last_activity > self.idle_timeout
+            )
+
+    def handle_request_message(
+        self,
+        request: dict[str, Any],
+        send: Callable[[dict], None],
+    ) -> dict[str, Any]:
+        """Execute a request and return its result message"""
+        if request.get('environment') != self.environment:
+            return {
+                'type': 'result',
+                'status': 'rejected',
+                'message': 'environment of the client differs from the daemon',
+            }
+        if request.get('command') != 'transfer_retrieve':
+            return {
+                'type': 'result',
+                'status': 'rejected',
+                'message': f'unknown command {request.get("command")!r}',
+            }
+        lock = threading.Lock()
+
+        def locked_send(message: dict) -> None:
+            # Progress might be sent from another thread
+            with lock:
+                send(message)
+
+        try:
+            remote = self.remote_factory(DaemonAnnex(request, locked_send))
+            remote.transfer_retrieve(request['key'], request['file_name'])
+        except Exception as e:  # noqa: BLE001
+            lgr.debug('request %r failed', request, exc_info=True)
+            return {'type': 'result', 'status': 'error', 'message': str(e)}
+        return {'type': 'result', 'status': 'ok'}
+
+    def serve_until_idle(self) -> None:
+        """Serve requests, until the daemon is idle for `idle_timeout`"""
+
+        def watch_idle():
+            while not self.is_idle():
+                time.sleep(idle_check_interval)
+            lgr.debug('remake daemon is idle, shutting down')
+            self.shutdown()
+
+        threading.Thread(target=watch_idle, daemon=True).start()
+        self.serve_forever()
+
+
+def _create_remote(annex: Any) -> Any:
+    from datalad_remake.annexremotes.remake_remote import RemakeRemote
+
+    return RemakeRemote(annex)
+
+
+def serve(socket_path: Path, idle_timeout: float = default_idle_timeout) -> None:
+    """Run a daemon on `socket_path`, unless another daemon is running"""
+    if fcntl is None:
+        lgr.warning('the remake daemon is not supported on this platform')
+        return
+
+    from datalad.support.entrypoints import load_extensions
+    from datalad.ui import ui
+
+    load_extensions()
+    # The daemon has no terminal, and must not write to stdout
+    ui.set_backend('no-progress')
+
+    prepare_socket_dir(socket_path)
+    lock_path = socket_path.with_name(socket_path.name + '.lock')
+    with lock_path.open('a') as lock_file:
+        try:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            lgr.debug('another remake daemon is serving %s', socket_path)
+            return
+        # A socket left over by a daemon that was killed
+        socket_path.unlink(missing_ok=True)
+        with RemakeDaemon(socket_path, idle_timeout) as daemon:
+            try:
+                daemon.serve_until_idle()
+            finally:
+                socket_path.unlink(missing_ok=True)
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description='datalad-remake daemon')
+    parser.add_argument('--socket', required=True, help='path of the socket')
+    parser.add_argument(
+        '--idle-timeout',
+        type=float,
+        default=default_idle_timeout,
+        help='seconds after which an idle daemon exits',
+    )
+    parsed_args = parser.parse_args(args)
+    serve(Path(parsed_args.socket), parsed_args.idle_timeout)
+
+
+if __name__ == '__main__':
+    main()
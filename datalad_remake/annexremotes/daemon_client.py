@@ -0,0 +1,233 @@
+"""Thin client of the remake daemon
+
+If the configuration variable `datalad.make.daemon` is `true`, the special
+remote forwards `TRANSFER RETRIEVE` requests to a long-lived daemon, see
+`datalad_remake.annexremotes.daemon`. The daemon is started on demand and
+listens on a Unix socket. The client collects the information that the daemon
+needs from git-annex, i.e. the git directory and the URLs of the key, sends
+the request, and relays messages and progress of the daemon to git-annex.
+
+Requests are exchanged as lines of JSON. The request has the form::
+
+    {"command": "transfer_retrieve", "key": "...", "file_name": "/...",
+     "git_dir": "/.../.git", "urls": ["datalad-remake:..."],
+     "environment": "<digest>"}
+
+The daemon answers with any number of messages of the form
+`{"type": "debug" | "info" | "progress", "value": ...}`, followed by a
+result, e.g. `{"type": "result", "status": "ok"}`.
+
+The daemon only accepts requests of clients whose relevant environment, e.g.
+`PATH`, `HOME`, or `DATALAD_*`-variables, matches its own environment. If the
+daemon is not available, or if the environments differ, the computation is
+performed by the special remote process itself.
+
+Like `datalad_remake.annexremotes.entrypoint`, this module must not import
+DataLad, `datalad_next`, or `datalad_core` at module level.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import hashlib
+import json
+import logging
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from getpass import getuser
+from pathlib import Path
+from typing import Any
+
+from annexremote import (
+    ProtocolError,
+    RemoteError,
+)
+
+from datalad_remake import (
+    daemon_config_key,
+    daemon_idle_timeout_config_key,
+    daemon_socket_config_key,
+    url_scheme,
+)
+from datalad_remake.utils.platform import make_private_dir
+
+lgr = logging.getLogger('datalad.remake.annexremotes.daemon_client')
+
+
+# Seconds to wait for a daemon that was started on demand
+start_timeout = 20
+
+# Default number of seconds after which an idle daemon exits
+default_idle_timeout = 600
+
+# Environment variables that influence a computation. Requests are only
+# accepted, if they are identical in the client and in the daemon.
+environment_variables = ('HOME', 'PATH', 'GNUPGHOME', 'TMPDIR')
+environment_prefixes = ('DATALAD_', 'GIT_CONFIG')
+
+
+class DaemonUnavailable(Exception):  # noqa: N818
+    """The daemon cannot handle a request, it has to be handled locally"""
+
+
+def is_daemon_enabled() -> bool:
+    """Check whether requests should be forwarded to the daemon"""
+    if not hasattr(socket, 'AF_UNIX'):
+        return False
+
+    from datalad_remake.utils.getconfig import get_config
+
+    return (get_config(daemon_config_key) or '').lower() in ('true', 'yes', '1')
+
+
+def get_socket_path() -> Path:
+    """Get the configured socket path, or the per-user default"""
+    from datalad_remake.utils.getconfig import get_config
+
+    socket_path = get_config(daemon_socket_config_key)
+    if socket_path:
+        return Path(socket_path)
+    return Path(tempfile.gettempdir()) / f'datalad-remake-{getuser()}' / 'daemon.sock'
+
+
+def get_idle_timeout() -> float:
+    """Get the number of seconds after which an idle daemon exits"""
+    from datalad_remake.utils.getconfig import get_config
+
+    idle_timeout = get_config(daemon_idle_timeout_config_key)
+    return default_idle_timeout if idle_timeout is None else float(idle_timeout)
+
+
+def environment_digest(environment: dict[str, str] | None = None) -> str:
+    """Get a digest of the environment variables that affect computations"""
+    if environment is None:
+        environment = dict(os.environ)
+    relevant = sorted(
+        (name, value)
+        for name, value in environment.items()
+        if name in environment_variables or name.startswith(environment_prefixes)
+    )
+    return hashlib.sha256(json.dumps(relevant).encode()).hexdigest()
+
+
+def prepare_socket_dir(socket_path: Path) -> None:
+    """Create the directory of the socket, which must belong to the user"""
+    socket_dir = socket_path.parent
+    if not make_private_dir(socket_dir):
+        msg = f'socket directory {socket_dir} belongs to another user'
+        raise DaemonUnavailable(msg)
+
+
+class DaemonClient:
+    """Forward requests of the special remote to the daemon"""
+
+    def __init__(self, socket_path: Path, idle_timeout: float = default_idle_timeout):
+        self.socket_path = socket_path
+        self.idle_timeout = idle_timeout
+
+    def transfer_retrieve(self, annex: Any, key: str, file_name: str) -> None:
+        """Let the daemon compute `key` and write it to `file_name`
+
+        Raises `DaemonUnavailable`, if the request has to be handled locally,
+        and `RemoteError`, if the daemon failed to compute the key.
+        """
+        request = {
+            'command': 'transfer_retrieve',
+            'key': key,
+            'file_name': os.path.abspath(file_name),
+            'git_dir': os.path.abspath(annex.getgitdir()),
+            'urls': annex.geturls(key, f'{url_scheme}:'),
+            'environment': environment_digest(),
+        }
+        received = False
+        try:
+            with contextlib.closing(self.connect()) as connection:
+                connection.sendall((json.dumps(request) + '\n').encode())
+                with connection.makefile('r', encoding='utf-8') as responses:
+                    for line in responses:
+                        received = True
+                        message = json.loads(line)
+                        if message['type'] == 'result':
+                            self._handle_result(message)
+                            return
+                        self._relay(annex, message)
+            msg = 'remake daemon closed the connection before sending a result'
+        except OSError as e:
+            msg = f'connection to remake daemon failed: {e}'
+        if not received:
+            # The daemon did not start to work on the request, e.g. because
+            # it was shutting down.
+            raise DaemonUnavailable(msg)
+        raise RemoteError(msg)
+
+    def connect(self) -> socket.socket:
+        """Connect to the daemon, start it, if necessary"""
+        prepare_socket_dir(self.socket_path)
+        try:
+            return self._connect()
+        except OSError:
+            pass
+
+        self.start_daemon()
+        deadline = time.monotonic() + start_timeout
+        while True:
+            try:
+                return self._connect()
+            except OSError as e:
+                if time.monotonic() > deadline:
+                    msg = f'could not connect to remake daemon: {e}'
+                    raise DaemonUnavailable(msg) from e
+                time.sleep(0.1)
+
+    def start_daemon(self) -> None:
+        lgr.debug('starting remake daemon on %s', self.socket_path)
+        subprocess.Popen(  # noqa: S603
+            [
+                sys.executable,
+                '-m',
+                'datalad_remake.annexremotes.daemon',
+                '--socket',
+                str(self.socket_path),
+                '--idle-timeout',
+                str(self.idle_timeout),
+            ],
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            cwd=tempfile.gettempdir(),
+            start_new_session=True,
+        )
+
+    def _connect(self) -> socket.socket:
+        connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            connection.connect(str(self.socket_path))
+        except OSError:
+            connection.close()
+            raise
+        return connection
+
+    @staticmethod
+    def _handle_result(message: dict[str, Any]) -> None:
+        status = message['status']
+        if status == 'ok':
+            return
+        if status == 'rejected':
+            raise DaemonUnavailable(message['message'])
+        raise RemoteError(message['message'])
+
+    @staticmethod
+    def _relay(annex: Any, message: dict[str, Any]) -> None:
+        if message['type'] == 'progress':
+            annex.progress(message['value'])
+        elif message['type'] == 'info':
+            try:
+                annex.info(message['value'])
+            except ProtocolError:
+                annex.debug(message['value'])
+        else:
+            annex.debug(message['value'])
@@ -0,0 +1,156 @@
+"""Fast entry point of the `datalad-remake` special remote
+
+git-annex starts the special remote for every command that touches it, e.g.
+for `git annex whereis`, which only sends requests like `CLAIMURL` or
+`CHECKPRESENT`. These requests are answered by `LazyRemakeRemote`, which only
+depends on `annexremote`. DataLad, its extensions, and the
+`RemakeRemote`-implementation are imported when the first request arrives that
+requires them, e.g. `TRANSFER RETRIEVE`. If the remake daemon is enabled,
+`TRANSFER RETRIEVE` is forwarded to the daemon instead, see
+`datalad_remake.annexremotes.daemon_client`.
+
+This module must therefore not import DataLad, `datalad_next`, or
+`datalad_core` at module level.
+"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import os
+import sys
+import threading
+from typing import (
+    TYPE_CHECKING,
+    Any,
+)
+
+from annexremote import SpecialRemote
+
+from datalad_remake.annexremotes.async_protocol import AsyncMaster
+from datalad_remake.annexremotes.base import CheapRequestsMixin
+from datalad_remake.annexremotes.daemon_client import (
+    DaemonClient,
+    DaemonUnavailable,
+    get_idle_timeout,
+    get_socket_path,
+    is_daemon_enabled,
+)
+
+if TYPE_CHECKING:
+    from datalad_remake.annexremotes.remake_remote import RemakeRemote
+
+lgr = logging.getLogger('datalad.remake.annexremotes.entrypoint')
+
+
+class LazyRemakeRemote(CheapRequestsMixin, SpecialRemote):
+    """Answer cheap requests, delegate all others to a `RemakeRemote`"""
+
+    def __init__(self, annex):
+        super().__init__(annex)
+        self._remote: RemakeRemote | None = None
+        self._remote_lock = threading.Lock()
+
+    @property
+    def remote(self) -> RemakeRemote:
+        """The `RemakeRemote` that handles expensive requests
+
+        DataLad and its extensions are loaded on first access.
+        """
+        with self._remote_lock:
+            if self._remote is None:
+                self._remote = _create_remote(self.annex)
+            return self._remote
+
+    def transfer_retrieve(self, key: str, file_name: str) -> None:
+        if is_daemon_enabled():
+            client = DaemonClient(get_socket_path(), get_idle_timeout())
+            try:
+                client.transfer_retrieve(self.annex, key, file_name)
+            except DaemonUnavailable as e:
+                self.annex.debug(f'remake daemon unavailable, computing locally: {e}')
+            else:
+                return
+        self.remote.transfer_retrieve(key, file_name)
+
+    def stop(self) -> None:
+        if self._remote is not None and hasattr(self._remote, 'stop'):
+            self._remote.stop()
+
+
+def _create_remote(annex: Any) -> RemakeRemote:
+    """Load DataLad and its extensions, and create a `RemakeRemote`"""
+    from datalad.support.entrypoints import load_extensions
+    from datalad.ui import ui
+
+    # Load extensions requested by configuration, like
+    # `datalad.customremotes.main.main` does.
+    load_extensions()
+
+    # stdin/stdout will be used for interactions with annex
+    ui.set_backend('annex')
+
+    from datalad_remake.annexremotes.remake_remote import RemakeRemote
+
+    return RemakeRemote(annex)
+
+
+def setup_parser() -> argparse.ArgumentParser:
+    """Create a parser that matches `datalad.customremotes.main.setup_parser`
+
+    The parser is created without DataLad's CLI machinery, which is expensive
+    to import.
+    """
+    parser = argparse.ArgumentParser(
+        description=(
+            'git-annex-remote-datalad-remake is a git-annex custom special '
+            'remote to remake data based on datalad-remake specifications'
+        ),
+        epilog='"DataLad\'s git-annex very special remote"',
+    )
+    parser.add_argument(
+        '-l',
+        '--log-level',
+        dest='log_level',
+        help='set logging verbosity level, e.g. "debug" or "info"',
+    )
+    parser.add_argument(
+        '--version',
+        action='store_true',
+        help='show the version of datalad-remake and exit',
+    )
+    return parser
+
+
+def main(args=None):
+    """cmdline entry point"""
+    parsed_args = setup_parser().parse_args(args)
+    if parsed_args.version:
+        from datalad_remake import __version__
+
+        print(f'datalad-remake {__version__}')  # noqa: T201
+        return
+    if parsed_args.log_level:
+        level = parsed_args.log_level
+        logging.getLogger('datalad').setLevel(
+            int(level) if level.isdigit() else level.upper()
+        )
+
+    # See `RemakeRemote.transfer_retrieve`
+    for variable in ('GIT_DIR', 'GIT_WORK_TREE'):
+        os.environ.pop(variable, None)
+
+    try:
+        master = AsyncMaster()
+        remote = LazyRemakeRemote(master)
+        master.LinkRemote(remote)
+        master.Listen()
+        remote.stop()
+    except Exception as e:  # noqa: BLE001
+        lgr.debug(
+            '%s (%s) - passing ERROR to git-annex and exiting',
+            e,
+            e.__class__.__name__,
+        )
+        print(f'ERROR {e} ({e.__class__.__name__})')  # noqa: T201
+        sys.exit(1)
@@ -1,121 +1,147 @@
 from __future__ import annotations
 
-import json
+import contextlib
+import functools
 import logging
+import os
 import shutil
 import subprocess
+import time
 from pathlib import Path
 from typing import (
     TYPE_CHECKING,
     Any,
 )
-from urllib.parse import (
-    unquote,
-    urlparse,
-)
 
+from annexremote import ProtocolError
 from datalad.customremotes import RemoteError
-from datalad_core.config import (
-    ConfigManager,
-    DataladBranchConfig,
-    GitEnvironment,
-    GlobalGitConfig,
-    ImplementationDefaults,
-    LocalGitConfig,
-)
-from datalad_next.annexremotes import SpecialRemote, super_main
+from datalad_next.annexremotes import SpecialRemote
 from datalad_next.datasets import Dataset
 from datalad_next.runners import (
     call_git_lines,
+    call_git_oneline,
     call_git_success,
 )
 
 from datalad_remake import (
     PatternPath,
+    cache_dir_config_key,
+    failure_backoff_config_key,
+    output_discovery_config_key,
     priority_config_key,
-    specification_dir,
+    queue_dir_config_key,
+    queue_timeout_config_key,
     template_dir,
     url_scheme,
 )
+from datalad_remake.annexremotes.base import CheapRequestsMixin
 from datalad_remake.commands.make_cmd import (
     execute,
     get_file_dataset,
     provide_context,
 )
+from datalad_remake.commands.realize_cmd import (
+    default_jobs,
+    realize_plan,
+)
+from datalad_remake.utils.config_snapshot import (
+    ConfigSnapshot,
+    get_config_snapshot,
+)
+from datalad_remake.utils.costs import (
+    CostRecords,
+    get_costs_dir,
+)
+from datalad_remake.utils.failures import (
+    FailureCache,
+    default_backoff,
+    describe_failure,
+    get_failures_dir,
+)
+from datalad_remake.utils.fingerprint import get_fingerprint
 from datalad_remake.utils.getconfig import (
     get_allow_untrusted_execution,
     get_trusted_keys,
 )
 from datalad_remake.utils.glob import resolve_patterns
+from datalad_remake.utils.instructions import (
+    Instruction,
+    get_compute_info,
+    read_specification,
+    select_instruction,
+)
+from datalad_remake.utils.metrics import measure
 from datalad_remake.utils.patched_env import patched_env
-from datalad_remake.utils.verify import verify_file
+from datalad_remake.utils.planner import (
+    get_missing_inputs,
+    plan,
+)
+from datalad_remake.utils.progress import copy_with_progress
+from datalad_remake.utils.result_cache import ResultCache
+from datalad_remake.utils.work_queue import (
+    QueueTimeoutError,
+    WorkQueue,
+)
 
 if TYPE_CHECKING:
-    from collections.abc import Iterable
+    from collections.abc import (
+        Callable,
+        Iterable,
+    )
 
     from annexremote import Master
+    from datalad_core.config import ConfigManager
 
 
 lgr = logging.getLogger('datalad.remake.annexremotes.remake')
 
+# Share of the progress of a key that is reported for its computation. The
+# rest is reported while the result is copied to git-annex.
+compute_progress_share = 0.9
+
 
-class RemakeRemote(SpecialRemote):
+class RemakeRemote(CheapRequestsMixin, SpecialRemote):
     def __init__(self, annex: Master):
         super().__init__(annex)
-        self._config_manager: ConfigManager | None = None
+        self._config_snapshot: ConfigSnapshot | None = None
 
     @property
-    def config_manager(self):
-        if self._config_manager is None:
-            dataset_dir = self._get_dataset_dir()
-            self._config_manager = ConfigManager(
-                defaults=ImplementationDefaults(),
-                sources={
-                    'git-command': GitEnvironment(),
-                    'git': LocalGitConfig(dataset_dir),
-                    'git-global': GlobalGitConfig(),
-                    'datalad-branch': DataladBranchConfig(dataset_dir),
-                },
-            )
-        return self._config_manager
+    def config_snapshot(self) -> ConfigSnapshot:
+        """The process-wide configuration snapshot of the dataset
 
-    def __del__(self):
-        self.close()
-
-    def close(self) -> None:
-        pass
-
-    def _check_url(self, url: str) -> bool:
-        return url.startswith((f'URL--{url_scheme}:', f'{url_scheme}:'))
-
-    def prepare(self):
-        self.annex.debug('PREPARE')
+        Configuration values, and values derived from them, are memoized in
+        the snapshot, until a configuration file changes.
+        """
+        if self._config_snapshot is None:
+            self._config_snapshot = get_config_snapshot(self._get_dataset_dir())
+        return self._config_snapshot
 
-    def initremote(self):
-        self.annex.debug('INITREMOTE')
+    @property
+    def config_manager(self) -> ConfigManager:
+        return self.config_snapshot.manager
 
-    def remove(self, key: str):
-        self.annex.debug(f'REMOVE {key!r}')
+    def _get_config(self, key: str) -> Any:
+        """Get the value of the configuration variable `key`"""
+        return self.config_snapshot.get(key)
 
-    def transfer_store(self, key: str, local_file: str):
-        self.annex.debug(f'TRANSFER STORE {key!r}, {local_file!r}')
+    def _get_trusted_key_ids(self, dataset_id: str) -> list[str] | None:
+        """Get the trusted keys, or `None`, if untrusted execution is allowed"""
 
-    def claimurl(self, url: str) -> bool:
-        self.annex.debug(f'CLAIMURL {url!r}')
-        return self._check_url(url)
+        def compute() -> list[str] | None:
+            allow_untrusted_execution = get_allow_untrusted_execution(dataset_id)
+            self.annex.debug(
+                'TRANSFER RETRIEVE get_allow_untrusted_execution: '
+                f'{allow_untrusted_execution}'
+            )
+            return None if allow_untrusted_execution else get_trusted_keys()
 
-    def checkurl(self, url: str) -> bool:
-        self.annex.debug(f'CHECKURL {url!r}')
-        return self._check_url(url)
+        return self.config_snapshot.memoize(('trusted-key-ids', dataset_id), compute)
 
-    def getcost(self) -> int:
-        self.annex.debug('GETCOST')
-        return 100
+    def __del__(self):
+        self.close()
 
-    def get_url_encoded_info(self, url: str) -> list[str]:
-        parts = urlparse(url).query.split('&', 3)
-        self.annex.debug(f'get_url_encoded_info: url: {url!r}, parts: {parts!r}')
-        return parts
+    def close(self) -> None:
+        pass
 
     def get_urls_for_key(self, key: str) -> list[str]:
         urls = self.annex.geturls(key, f'{url_scheme}:')
@@ -127,117 +153,331 @@ class RemakeRemote(SpecialRemote):
         key: str,
         trusted_key_ids: list[str] | None,
     ) -> tuple[dict[str, Any], Dataset]:
-        def get_assigned_value(assignment: str) -> str:
-            return assignment.split('=', 1)[1]
+        instruction = self._get_instruction(key)
+        self.annex.debug(f'get_compute_info: instruction: {instruction!r}')
+
+        # Specifications are content-addressed, they are read and verified
+        # once per process.
+        trusted = None if trusted_key_ids is None else tuple(trusted_key_ids)
+        dataset, spec = self.config_snapshot.memoize(
+            ('specification', instruction.root_version, instruction.spec_name, trusted),
+            lambda: self._read_specification(instruction, trusted_key_ids),
+        )
+        return get_compute_info(instruction, spec), dataset
 
+    def _get_instruction(self, key: str) -> Instruction:
         # get all compute instruction URLs for the key and select the
         # prioritized one.
-        compute_instructions = {}
-        for url in self.get_urls_for_key(key):
-            label, root_version, spec_name, this = (
-                unquote(get_assigned_value(expr))
-                for expr in self.get_url_encoded_info(url)
-            )
-            compute_instructions[label] = root_version, spec_name, this
-
-        # Select the compute instruction with the highest priority
-        for label in self._get_priorities():
-            if label in compute_instructions:
-                root_version, spec_name, this = compute_instructions[label]
-                break
-        else:
-            # If no priority is configured, select the first instruction
-            root_version, spec_name, this = next(iter(compute_instructions.values()))
-
-        dataset = self._find_dataset(root_version)
-        spec_path = dataset.pathobj / specification_dir / spec_name
-        if trusted_key_ids is not None:
-            verify_file(dataset.pathobj, spec_path, trusted_key_ids)
-
-        # Ensure that the spec is actually present and read it
-        dataset.get(spec_path, result_renderer='disabled')
-        with open(spec_path, 'rb') as f:
-            spec = json.load(f)
-
-        method_path = dataset.pathobj / template_dir / spec['method']
-        dataset.get(method_path, result_renderer='disabled')
-
-        stdout = spec.get('stdout', None)
-
-        return {
-            'root_version': root_version,
-            'this': PatternPath(this),
-            'method': Path(spec['method']),
-            'input': [PatternPath(path) for path in spec['input']],
-            'output': [PatternPath(path) for path in spec['output']],
-            'stdout': PatternPath(stdout) if stdout else None,
-            'parameter': spec['parameter'],
-        }, dataset
+        urls = tuple(self.get_urls_for_key(key))
+        return self.config_snapshot.memoize(
+            ('instruction', urls),
+            lambda: select_instruction(urls, self._get_priorities()),
+        )
+
+    def _read_specification(
+        self,
+        instruction: Instruction,
+        trusted_key_ids: list[str] | None,
+    ) -> tuple[Dataset, dict[str, Any]]:
+        dataset = self._find_dataset(instruction.root_version)
+        return dataset, read_specification(
+            dataset, instruction.spec_name, trusted_key_ids
+        )
 
     def transfer_retrieve(self, key: str, file_name: str) -> None:
         self.annex.debug(f'TRANSFER RETRIEVE key: {key!r}, file_name: {file_name!r}')
 
         # Remove any `GIT_DIR` and `GIT_WORK_TREE` environment variables during
         # the computation. This is necessary to avoid interference with the
-        # `Dataset.get` implementation in DataLad.
-        with patched_env(remove=['GIT_DIR', 'GIT_WORK_TREE']):
-            dataset_id = self.config_manager.get('datalad.dataset.id').value
+        # `Dataset.get` implementation in DataLad. `main` removes them once
+        # on startup, because patching the environment of a process is not
+        # safe, while concurrent requests are handled.
+        git_variables = [v for v in ('GIT_DIR', 'GIT_WORK_TREE') if v in os.environ]
+        with (
+            patched_env(remove=git_variables)
+            if git_variables
+            else contextlib.nullcontext()
+        ):
+            dataset_id = self._get_config('datalad.dataset.id')
             self.annex.debug(f'TRANSFER RETRIEVE dataset_id: {dataset_id!r}')
-            self.annex.debug(
-                'TRANSFER RETRIEVE get_allow_untrusted_execution: '
-                f'{get_allow_untrusted_execution(dataset_id)}'
-            )
-            if get_allow_untrusted_execution(dataset_id):
-                trusted_key_ids = None
+            trusted_key_ids = self._get_trusted_key_ids(dataset_id)
+            if trusted_key_ids is None:
                 lgr.warning('datalad remake remote performs UNTRUSTED execution')
-            else:
-                trusted_key_ids = get_trusted_keys()
 
-            compute_info, dataset = self.get_compute_info(key, trusted_key_ids)
+            # The fingerprint is determined from the unverified specification,
+            # such that failed verifications are recorded, too.
+            compute_info, dataset = self.get_compute_info(key, None)
             self.annex.debug(f'TRANSFER RETRIEVE compute_info: {compute_info!r}')
 
-            # Perform the computation, and collect the results
-            lgr.debug('Starting provision')
-            self.annex.debug('Starting provision')
-            with provide_context(
+            fingerprint = get_fingerprint(dataset.pathobj, compute_info)
+            self.annex.debug(f'TRANSFER RETRIEVE fingerprint: {fingerprint}')
+
+            failures = self._get_failure_cache(dataset)
+            record_failure = (
+                None
+                if failures is None
+                else functools.partial(failures.record, fingerprint, key)
+            )
+            cache = ResultCache.from_directory(self._get_config(cache_dir_config_key))
+            with contextlib.ExitStack() as stack:
+                # Concurrent requests for the same computation, e.g. by other
+                # jobs of `git annex get -J`, wait for the running computation,
+                # and find its failure record afterwards.
+                if failures is not None:
+                    stack.enter_context(failures.locked(fingerprint, self._notify))
+                    failure = failures.get(fingerprint)
+                    if failure is not None:
+                        raise RemoteError(describe_failure(failure, failures.backoff))
+
+                if trusted_key_ids is not None:
+                    try:
+                        compute_info, dataset = self.get_compute_info(
+                            key, trusted_key_ids
+                        )
+                    except ValueError as e:
+                        if record_failure is not None:
+                            record_failure(e)
+                        raise
+
+                # Look up the outputs in the shared result cache, if one is
+                # configured. The lock of the entry is held until the outputs
+                # are published, such that concurrent requests for the same
+                # computation wait for it, instead of repeating it.
+                if cache is not None:
+                    stack.enter_context(cache.locked(fingerprint, self._notify))
+                    with measure('cache', key=key) as record:
+                        record['bytes'] = cache.fetch(
+                            fingerprint, compute_info['this'], file_name
+                        )
+                    if record['bytes'] >= 0:
+                        self.annex.debug(f'TRANSFER RETRIEVE cache hit: {fingerprint}')
+                        return
+
+                seconds = self._compute(
+                    dataset,
+                    key,
+                    file_name,
+                    compute_info,
+                    trusted_key_ids,
+                    None
+                    if cache is None
+                    else functools.partial(cache.publish, fingerprint),
+                    record_failure,
+                )
+                # Outputs that were fetched from the cache do not tell how
+                # long a recomputation takes, only computations are recorded.
+                if seconds is not None:
+                    costs = CostRecords(get_costs_dir(self._get_git_dir(dataset)))
+                    costs.record(fingerprint, seconds)
+
+    def _get_failure_cache(self, dataset: Dataset) -> FailureCache | None:
+        """Get the failure records of `dataset`, or `None`, if disabled"""
+        backoff = self._get_config(failure_backoff_config_key)
+        backoff = default_backoff if backoff is None else float(backoff)
+        if backoff <= 0:
+            return None
+        return FailureCache(get_failures_dir(self._get_git_dir(dataset)), backoff)
+
+    @staticmethod
+    def _get_git_dir(dataset: Dataset) -> Path:
+        return Path(
+            call_git_oneline(['rev-parse', '--absolute-git-dir'], cwd=dataset.pathobj)
+        )
+
+    def _compute(
+        self,
+        dataset: Dataset,
+        key: str,
+        file_name: str,
+        compute_info: dict[str, Any],
+        trusted_key_ids: list[str] | None,
+        publish: Callable[[Path, list[PatternPath]], None] | None = None,
+        record_failure: Callable[[BaseException], None] | None = None,
+    ) -> float | None:
+        """Perform the computation of `key` and collect its outputs
+
+        If `publish` is given, it is called with the directory that contains
+        the outputs, and the paths of all outputs, before they are collected.
+        If `record_failure` is given, it is called with the error, if the
+        execution of the method template fails.
+
+        Returns the duration of provisioning, execution, and collection in
+        seconds, i.e. the cost of a recomputation, if the inputs are present.
+        Missing inputs are computed first, their costs are recorded with their
+        own computations. For queued computations, the duration is reported by
+        the worker, it is `None`, if the worker does not report it.
+        """
+        # Compute missing inputs that are outputs of other computations
+        # up front, instead of retrieving them one by one, and recursively,
+        # during provisioning.
+        with measure('planning', key=key):
+            self._realize_inputs(dataset, compute_info, trusted_key_ids)
+
+        # Let a worker perform the computation, if a queue is configured
+        queue_dir = self._get_config(queue_dir_config_key)
+        if queue_dir:
+            return self._compute_in_queue(
+                WorkQueue(Path(queue_dir)),
                 dataset,
-                compute_info['root_version'],
-                compute_info['input'],
-            ) as worktree:
-                # Ensure that the method template is present, in case it is annexed.
+                key,
+                file_name,
+                compute_info,
+                publish,
+            )
+
+        # Perform the computation, and collect the results
+        start = time.monotonic()
+        lgr.debug('Starting provision')
+        self.annex.debug('Starting provision')
+        with contextlib.ExitStack() as stack:
+            with measure('provision', key=key):
+                worktree = stack.enter_context(
+                    provide_context(
+                        dataset,
+                        compute_info['root_version'],
+                        compute_info['input'],
+                        compute_info['output'],
+                    )
+                )
+                # Ensure that the method template is present, in case it
+                # is annexed.
                 lgr.debug('Fetching method template')
                 Dataset(worktree).get(
                     PatternPath(template_dir) / compute_info['method'],
                     result_renderer='disabled',
                 )
 
-                lgr.debug('Starting execution')
-                self.annex.debug('Starting execution')
-                execute(
+            lgr.debug('Starting execution')
+            self.annex.debug('Starting execution')
+            with measure('execution', key=key):
+                try:
+                    changed_outputs = execute(
+                        worktree,
+                        compute_info['method'],
+                        compute_info['parameter'],
+                        compute_info['output'],
+                        compute_info['stdout'],
+                        trusted_key_ids,
+                        output_discovery=self._get_output_discovery(),
+                        notify=self._notify,
+                        progress=self._get_compute_progress(key),
+                        requested=[compute_info['this']],
+                        capture_stderr=record_failure is not None,
+                    )
+                except (
+                    subprocess.CalledProcessError,
+                    subprocess.TimeoutExpired,
+                    ValueError,
+                ) as e:
+                    # Failed commands, and invalid or unverifiable templates
+                    if record_failure is not None:
+                        record_failure(e)
+                    raise
+
+            if publish is not None:
+                # Publish before collecting, because collecting moves the
+                # outputs into the annex.
+                if changed_outputs is None:
+                    changed_outputs = resolve_patterns(
+                        root_dir=worktree, patterns=compute_info['output']
+                    )
+                publish(worktree, _with_stdout(changed_outputs, compute_info))
+
+            lgr.debug('Starting collection')
+            self.annex.debug('Starting collection')
+            with measure('collection', key=key) as record:
+                record['bytes'] = self._collect(
                     worktree,
-                    compute_info['method'],
-                    compute_info['parameter'],
+                    dataset,
                     compute_info['output'],
                     compute_info['stdout'],
-                    trusted_key_ids,
+                    compute_info['this'],
+                    file_name,
+                    changed_outputs,
+                    self._get_collect_progress(key),
                 )
+            lgr.debug('Leaving provision context')
+            self.annex.debug('Leaving provision context')
+        return time.monotonic() - start
 
-                lgr.debug('Starting collection')
-                self.annex.debug('Starting collection')
-                self._collect(
-                    worktree,
+    def _realize_inputs(
+        self,
+        dataset: Dataset,
+        compute_info: dict[str, Any],
+        trusted_key_ids: list[str] | None,
+    ) -> None:
+        """Compute all missing inputs of a computation in dependency order"""
+        priorities = self._get_priorities()
+        missing_inputs = get_missing_inputs(
+            dataset, compute_info['root_version'], compute_info['input'], priorities
+        )
+        if not missing_inputs:
+            return
+        dependencies = plan(dataset, missing_inputs, priorities, trusted_key_ids)
+        self.annex.debug(f'_realize_inputs: {len(dependencies)} computations')
+        for node, _, error in realize_plan(
+            dataset, dependencies, trusted_key_ids, default_jobs
+        ):
+            if error is not None:
+                paths = ', '.join(str(request.path) for request in node.requests)
+                msg = f'could not compute inputs {paths}: {error}'
+                raise RemoteError(msg)
+
+    def _compute_in_queue(
+        self,
+        work_queue: WorkQueue,
+        dataset: Dataset,
+        key: str,
+        file_name: str,
+        compute_info: dict[str, Any],
+        publish: Callable[[Path, list[PatternPath]], None] | None = None,
+    ) -> float | None:
+        """Queue the computation, wait for a worker, and collect the outputs
+
+        Returns the duration of the computation that is reported by the
+        worker, and the duration of the collection.
+        """
+        job_id = work_queue.enqueue(
+            {
+                'dataset': str(dataset.pathobj),
+                'key': key,
+                'instruction': self._get_instruction(key)._asdict(),
+            }
+        )
+        self.annex.debug(f'_compute_in_queue: queued job {job_id}')
+        timeout = self._get_config(queue_timeout_config_key)
+        try:
+            with measure('queue', key=key):
+                status = work_queue.wait(
+                    job_id,
+                    self._notify,
+                    None if timeout is None else float(timeout),
+                )
+            if status['status'] != 'ok':
+                raise RemoteError(status.get('message', f'job {job_id} failed'))
+            results_dir = work_queue.get_results_dir(job_id)
+            outputs = [PatternPath(path) for path in status['outputs']]
+            if publish is not None:
+                publish(results_dir, _with_stdout(outputs, compute_info))
+            start = time.monotonic()
+            with measure('collection', key=key) as record:
+                record['bytes'] = self._collect(
+                    results_dir,
                     dataset,
                     compute_info['output'],
                     compute_info['stdout'],
                     compute_info['this'],
                     file_name,
+                    outputs,
+                    self._get_collect_progress(key),
                 )
-                lgr.debug('Leaving provision context')
-                self.annex.debug('Leaving provision context')
-
-    def checkpresent(self, key: str) -> bool:
-        # See if at least one URL with the remake url-scheme is present
-        return self.annex.geturls(key, f'{url_scheme}:') != []
+            if 'seconds' not in status:
+                return None
+            return status['seconds'] + time.monotonic() - start
+        except QueueTimeoutError as e:
+            raise RemoteError(str(e)) from e
+        finally:
+            work_queue.remove(job_id)
 
     def _find_dataset(self, commit: str) -> Dataset:
         """Find the first enclosing dataset with the given commit"""
@@ -269,11 +509,20 @@ class RemakeRemote(SpecialRemote):
         stdout: PatternPath | None,
         this: PatternPath,
         this_destination: str,
-    ) -> None:
-        """Collect computation results for `this` (and all other outputs)"""
+        outputs: Iterable[PatternPath] | None = None,
+        progress: Callable[[int], Any] | None = None,
+    ) -> int:
+        """Collect computation results for `this` (and all other outputs)
+
+        The number of copied bytes of `this` is reported to `progress`.
+        Returns the number of collected bytes.
+        """
+        collected = 0
 
-        # Get all outputs that were created during computation
-        outputs = resolve_patterns(root_dir=worktree, patterns=output_patterns)
+        # Get all outputs that were created during computation, unless they
+        # were already determined by change tracking.
+        if outputs is None:
+            outputs = resolve_patterns(root_dir=worktree, patterns=output_patterns)
 
         # Collect all output files that have been created while creating
         # `this` file.
@@ -289,6 +538,7 @@ class RemakeRemote(SpecialRemote):
                 self.annex.debug(
                     f'_collect: reinject: {worktree / output} -> {dataset_path}:{file_path}'
                 )
+                collected += (worktree / output).stat().st_size
                 call_git_success(
                     ['annex', 'reinject', str(worktree / output), str(file_path)],
                     cwd=dataset_path,
@@ -297,6 +547,9 @@ class RemakeRemote(SpecialRemote):
 
         # Collect possible stdout
         if stdout is not None:
+            # `stdout` might match an output pattern and be collected already
+            if (worktree / stdout).exists():
+                collected += (worktree / stdout).stat().st_size
             is_annexed, dataset_path, file_path = self._is_annexed(dataset, stdout)
             if is_annexed:
                 self.annex.debug(
@@ -312,7 +565,11 @@ class RemakeRemote(SpecialRemote):
 
         # Collect `this` file. It has to be copied to the destination given
         # by git-annex. Git-annex will check its integrity.
-        shutil.copyfile(worktree / this, this_destination)
+        return collected + copy_with_progress(
+            worktree / this,
+            this_destination,
+            progress,
+        )
 
     def _is_annexed(
         self, dataset: Dataset, file_path: PatternPath
@@ -342,19 +599,85 @@ class RemakeRemote(SpecialRemote):
             list[str]: list of priorities, highest priority first. If no
             priorities are configured, an empty list is returned.
         """
-        setting = self.config_manager.get(priority_config_key)
-        if setting.value:
-            return setting.value.split(',')
+        setting = self._get_config(priority_config_key)
+        if setting:
+            return setting.split(',')
         return []
 
+    def _notify(self, message: str) -> None:
+        """Show `message` to the user, if git-annex supports it"""
+        try:
+            self.annex.info(message)
+        except ProtocolError:
+            self.annex.debug(message)
+
+    def _get_compute_progress(self, key: str) -> Callable[[float], None]:
+        """Get a callback that reports the progress of the computation of `key`
+
+        git-annex expects progress in bytes. The computation is reported in
+        the first `compute_progress_share` of the size of `key`. If the size
+        of `key` is not known, the progress is only sent as debug message.
+        """
+        size = get_key_size(key)
+
+        def report(fraction: float) -> None:
+            if size is None:
+                self.annex.debug(f'computation progress: {fraction:.0%}')
+            else:
+                self.annex.progress(int(fraction * compute_progress_share * size))
+
+        # The callback is invoked from another thread, its messages belong to
+        # the job of this thread.
+        bind = getattr(self.annex, 'bind_to_job', None)
+        return report if bind is None else bind(report)
+
+    def _get_collect_progress(self, key: str) -> Callable[[int], None]:
+        """Get a callback that reports the progress of copying the result `key`
+
+        The copied bytes are reported after the progress of the computation,
+        see `_get_compute_progress`, so that the progress does not go
+        backwards. If the size of `key` is not known, the copied bytes are
+        reported as they are.
+        """
+        size = get_key_size(key)
+        if size is None:
+            return self.annex.progress
+        offset = compute_progress_share * size
+
+        def report(copied: int) -> None:
+            share = (1 - compute_progress_share) * min(copied, size)
+            self.annex.progress(int(offset + share))
+
+        return report
+
+    def _get_output_discovery(self) -> str:
+        """Get the configured output discovery mode, default is `'glob'`"""
+        return self._get_config(output_discovery_config_key) or 'glob'
+
     def _get_dataset_dir(self) -> Path:
         return Path(self.annex.getgitdir()).parent.absolute()
 
 
-def main():
-    """cmdline entry point"""
-    super_main(
-        cls=RemakeRemote,
-        remote_name='datalad-remake',
-        description='Remake data based on datalad-remake specifications',
-    )
+def _with_stdout(
+    outputs: Iterable[PatternPath],
+    compute_info: dict[str, Any],
+) -> list[PatternPath]:
+    """Get `outputs` and the captured stdout of a computation"""
+    stdout = compute_info['stdout']
+    return sorted(set(outputs) | ({stdout} if stdout is not None else set()))
+
+
+def get_key_size(key: str) -> int | None:
+    """Get the size of a git-annex key, if it is part of the key"""
+    fields = key.split('--', 1)[0].split('-')
+    for field in fields[1:]:
+        if field.startswith('s') and field[1:].isdigit():
+            return int(field[1:])
+    return None
+
+
+def main(args=None):
+    """cmdline entry point, see `datalad_remake.annexremotes.entrypoint`"""
+    from datalad_remake.annexremotes.entrypoint import main as entrypoint_main
+
+    entrypoint_main(args)
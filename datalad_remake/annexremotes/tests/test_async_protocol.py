@@ -0,0 +1,245 @@
+from __future__ import annotations
+
+import threading
+from io import TextIOBase
+from typing import cast
+
+from annexremote import SpecialRemote
+from datalad_core.config import ConfigItem
+
+from datalad_remake import (
+    PatternPath,
+    allow_untrusted_execution_key,
+    specification_dir,
+    template_dir,
+)
+from datalad_remake.annexremotes.async_protocol import AsyncMaster
+from datalad_remake.annexremotes.remake_remote import RemakeRemote
+from datalad_remake.commands.make_cmd import build_json
+from datalad_remake.commands.tests.create_datasets import create_ds_hierarchy
+from datalad_remake.utils.platform import on_windows
+
+if on_windows:
+    template = """
+    parameters = ['content', 'output']
+    command = ["pwsh", "-c", "Write-Output 'content: {content}' > {output}"]
+    """
+else:
+    template = """
+    parameters = ['content', 'output']
+    command = ["bash", "-c", "echo content: {content} > '{output}'"]
+    """
+
+
+class BlockingRemote(SpecialRemote):
+    """A remote whose first request only finishes after the second request"""
+
+    def __init__(self, annex):
+        super().__init__(annex)
+        self.second_done = threading.Event()
+
+    def initremote(self):
+        pass
+
+    def prepare(self):
+        pass
+
+    def transfer_store(self, key, local_file):
+        pass
+
+    def transfer_retrieve(self, key, local_file):
+        pass
+
+    def remove(self, key):
+        pass
+
+    def checkpresent(self, key):
+        if key == 'key1':
+            return self.second_done.wait(timeout=30)
+        value = self.annex.getconfig('setting')
+        self.second_done.set()
+        return value == 'expected'
+
+
+class ProgressRemote(BlockingRemote):
+    """A remote that reports progress from another thread"""
+
+    def checkpresent(self, key):
+        thread = threading.Thread(
+            target=self.annex.bind_to_job(self.annex.progress), args=(5,)
+        )
+        thread.start()
+        thread.join()
+        return True
+
+
+class RecordingOutput:
+    def __init__(self):
+        self.output = ''
+        self.condition = threading.Condition()
+
+    def write(self, *args, **_):
+        with self.condition:
+            self.output += ''.join(args)
+            self.condition.notify_all()
+
+    def flush(self):
+        pass
+
+    def wait_for(self, line):
+        with self.condition:
+            assert self.condition.wait_for(
+                lambda: line in self.output.splitlines(), timeout=30
+            )
+
+
+class ScriptedInput:
+    """Send messages like git-annex, optionally after the remote sent a line"""
+
+    def __init__(self, output, messages):
+        self.output = output
+        self.messages = list(messages)
+
+    def readline(self):
+        if not self.messages:
+            return ''
+        message = self.messages.pop(0)
+        if isinstance(message, tuple):
+            expected, message = message
+            self.output.wait_for(expected)
+        return message + '\n'
+
+
+def run_master(remote_class, messages):
+    output = RecordingOutput()
+    master = AsyncMaster(output=cast(TextIOBase, output))
+    master.LinkRemote(remote_class(master))
+    master.Listen(input=cast(TextIOBase, ScriptedInput(output, messages)))
+    return [
+        line
+        for line in output.output.splitlines()
+        if not line.startswith(('DEBUG ', 'J 1 DEBUG ', 'J 2 DEBUG '))
+    ]
+
+
+def test_async_jobs_run_concurrently():
+    lines = run_master(
+        BlockingRemote,
+        [
+            'EXTENSIONS INFO ASYNC',
+            'J 1 CHECKPRESENT key1',
+            'J 2 CHECKPRESENT key2',
+            'J 2 VALUE expected',
+        ],
+    )
+    assert lines == [
+        'VERSION 1',
+        'EXTENSIONS ASYNC',
+        'J 2 GETCONFIG setting',
+        'J 2 CHECKPRESENT-SUCCESS key2',
+        'J 1 CHECKPRESENT-SUCCESS key1',
+    ]
+
+
+def test_async_job_numbers_are_reused():
+    lines = run_master(
+        BlockingRemote,
+        [
+            'EXTENSIONS ASYNC',
+            'J 1 CHECKPRESENT key2',
+            'J 1 VALUE expected',
+            ('J 1 CHECKPRESENT-SUCCESS key2', 'J 1 CHECKPRESENT key1'),
+            ('J 1 CHECKPRESENT-SUCCESS key1', 'J 1 UNKNOWNREQUEST'),
+            ('J 1 UNSUPPORTED-REQUEST', 'J 1 CHECKPRESENT key1'),
+        ],
+    )
+    assert lines == [
+        'VERSION 1',
+        'EXTENSIONS ASYNC',
+        'J 1 GETCONFIG setting',
+        'J 1 CHECKPRESENT-SUCCESS key2',
+        'J 1 CHECKPRESENT-SUCCESS key1',
+        'J 1 UNSUPPORTED-REQUEST',
+        'J 1 CHECKPRESENT-SUCCESS key1',
+    ]
+
+
+def test_progress_from_other_thread():
+    lines = run_master(
+        ProgressRemote,
+        ['EXTENSIONS ASYNC', 'J 3 CHECKPRESENT key1'],
+    )
+    assert lines[2:] == ['J 3 PROGRESS 5', 'J 3 CHECKPRESENT-SUCCESS key1']
+
+
+def test_without_async_extension():
+    lines = run_master(
+        BlockingRemote,
+        [
+            'EXTENSIONS INFO',
+            'CHECKPRESENT key2',
+            'VALUE unexpected',
+        ],
+    )
+    assert lines == [
+        'VERSION 1',
+        'EXTENSIONS',
+        'GETCONFIG setting',
+        'CHECKPRESENT-FAILURE key2',
+    ]
+
+
+def test_remake_remote_async(tmp_path, cfgman, monkeypatch):
+    dataset = create_ds_hierarchy(tmp_path, 'ds1', 0)[0][2]
+    monkeypatch.chdir(dataset.path)
+
+    template_path = dataset.pathobj / template_dir
+    template_path.mkdir(parents=True)
+    (template_path / 'echo').write_text(template)
+
+    specification_path = dataset.pathobj / specification_dir
+    specification_path.mkdir(parents=True, exist_ok=True)
+    urls = {}
+    for name in ('a', 'b'):
+        (specification_path / name).write_text(
+            build_json(
+                'echo',
+                [],
+                [PatternPath(f'{name}.txt')],
+                None,
+                {'content': name, 'output': f'{name}.txt'},
+            )
+        )
+    dataset.save()
+    for name in ('a', 'b'):
+        urls[name] = 'datalad-make:///?' + '&'.join(
+            [
+                'label=test1',
+                f'root_version={dataset.repo.get_hexsha()}',
+                f'specification={name}',
+                f'this={name}.txt',
+            ]
+        )
+
+    # The dataset directory is fixed, because the number of `GETGITDIR`
+    # requests per job depends on the order in which the jobs are executed.
+    monkeypatch.setattr(RemakeRemote, '_get_dataset_dir', lambda _: dataset.pathobj)
+
+    # Both jobs are started before git-annex answers their questions
+    messages = ['EXTENSIONS INFO ASYNC']
+    for job, name in ((1, 'a'), (2, 'b')):
+        messages.append(
+            f'J {job} TRANSFER RETRIEVE key-{name} {tmp_path / (name + ".txt")!s}'
+        )
+    for job, name in ((1, 'a'), (2, 'b')):
+        messages.extend([f'J {job} VALUE {urls[name]}', f'J {job} VALUE'])
+
+    with cfgman.overrides(
+        {allow_untrusted_execution_key + dataset.id: ConfigItem('true')}
+    ):
+        lines = run_master(RemakeRemote, messages)
+
+    assert 'J 1 TRANSFER-SUCCESS RETRIEVE key-a' in lines
+    assert 'J 2 TRANSFER-SUCCESS RETRIEVE key-b' in lines
+    for name in ('a', 'b'):
+        assert (tmp_path / f'{name}.txt').read_text().strip() == f'content: {name}'
@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+import contextlib
+import tempfile
+import threading
+from pathlib import Path
+
+import pytest
+from annexremote import RemoteError
+
+from datalad_remake.annexremotes.daemon import RemakeDaemon
+from datalad_remake.annexremotes.daemon_client import (
+    DaemonClient,
+    DaemonUnavailable,
+)
+
+
+class FakeAnnex:
+    def __init__(self, git_dir: Path):
+        self.git_dir = git_dir
+        self.messages: list[tuple[str, object]] = []
+
+    def getgitdir(self) -> str:
+        return str(self.git_dir)
+
+    def geturls(self, key: str, prefix: str) -> list[str]:
+        return [f'{prefix}///?label=test&root_version=1&specification=2']
+
+    def debug(self, *args):
+        self.messages.append(('debug', ' '.join(map(str, args))))
+
+    def info(self, message):
+        self.messages.append(('info', message))
+
+    def progress(self, progress):
+        self.messages.append(('progress', progress))
+
+
+class FakeRemote:
+    def __init__(self, annex):
+        self.annex = annex
+
+    def transfer_retrieve(self, key: str, file_name: str) -> None:
+        if key == 'failing-key':
+            msg = 'computation failed'
+            raise RuntimeError(msg)
+        urls = self.annex.geturls(key, 'datalad-remake:')
+        self.annex.info(f'computing {key}')
+        self.annex.progress(5)
+        Path(file_name).write_text(f'{self.annex.getgitdir()} {urls[0]}')
+
+
+@contextlib.contextmanager
+def running_daemon(socket_path: Path):
+    daemon = RemakeDaemon(socket_path, remote_factory=FakeRemote)
+    thread = threading.Thread(target=daemon.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield daemon
+    finally:
+        daemon.shutdown()
+        daemon.server_close()
+        thread.join()
+
+
+@pytest.fixture
+def socket_path():
+    # Paths of Unix sockets are limited to about 100 characters, which
+    # `tmp_path` might exceed.
+    with tempfile.TemporaryDirectory(prefix='remake-') as socket_dir:
+        yield Path(socket_dir) / 'daemon.sock'
+
+
+def test_daemon_computes_key(tmp_path, socket_path):
+    annex = FakeAnnex(tmp_path / '.git')
+    target = tmp_path / 'result'
+    with running_daemon(socket_path):
+        DaemonClient(socket_path).transfer_retrieve(annex, 'some-key', str(target))
+    assert target.read_text() == (
+        f'{tmp_path / ".git"} datalad-remake:///?label=test&root_version=1'
+        '&specification=2'
+    )
+    assert annex.messages == [('info', 'computing some-key'), ('progress', 5)]
+
+
+def test_daemon_reports_errors(tmp_path, socket_path):
+    annex = FakeAnnex(tmp_path / '.git')
+    with running_daemon(socket_path), pytest.raises(RemoteError):
+        DaemonClient(socket_path).transfer_retrieve(
+            annex, 'failing-key', str(tmp_path / 'result')
+        )
+
+
+def test_daemon_rejects_other_environment(tmp_path, socket_path, monkeypatch):
+    annex = FakeAnnex(tmp_path / '.git')
+    with running_daemon(socket_path):
+        monkeypatch.setenv('DATALAD_SOME_SETTING', 'different')
+        with pytest.raises(DaemonUnavailable):
+            DaemonClient(socket_path).transfer_retrieve(
+                annex, 'some-key', str(tmp_path / 'result')
+            )
+    assert not (tmp_path / 'result').exists()
@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+import re
+import subprocess
+import sys
+
+# Upper limit for the cumulative import time of the entry point in
+# microseconds. Importing DataLad and its extensions takes considerably
+# longer.
+import_time_budget = 250_000
+
+heavy_packages = ('datalad', 'datalad_core', 'datalad_next')
+
+report_heavy_modules = (
+    'import sys; '
+    'print(sorted(m for m in sys.modules '
+    f'if m.split(".")[0] in {heavy_packages!r}), file=sys.stderr)'
+)
+
+
+def test_import_budget():
+    result = subprocess.run(
+        [
+            sys.executable,
+            '-X',
+            'importtime',
+            '-c',
+            'import datalad_remake.annexremotes.entrypoint; ' + report_heavy_modules,
+        ],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    assert result.stderr.splitlines()[-1] == '[]'
+    match = re.search(
+        r'^import time:\s+\d+ \|\s+(\d+) \| datalad_remake\.annexremotes\.entrypoint$',
+        result.stderr,
+        re.MULTILINE,
+    )
+    assert match is not None
+    assert int(match[1]) < import_time_budget
+
+
+def test_cheap_requests_without_datalad():
+    requests = [
+        'EXTENSIONS INFO',
+        'PREPARE',
+        'CLAIMURL datalad-remake:///?label=x',
+        'CHECKPRESENT some-key',
+        'VALUE datalad-remake:///?label=x',
+        'VALUE',
+        'GETCOST',
+    ]
+    result = subprocess.run(
+        [
+            sys.executable,
+            '-c',
+            'from datalad_remake.annexremotes.entrypoint import main; main([]); '
+            + report_heavy_modules,
+        ],
+        input=''.join(request + '\n' for request in requests),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    replies = [
+        line for line in result.stdout.splitlines() if not line.startswith('DEBUG')
+    ]
+    assert replies == [
+        'VERSION 1',
+        'EXTENSIONS',
+        'PREPARE-SUCCESS',
+        'CLAIMURL-SUCCESS',
+        'GETURLS some-key datalad-remake:',
+        'CHECKPRESENT-SUCCESS some-key',
+        'COST 100',
+    ]
+    assert result.stderr.splitlines()[-1] == '[]'
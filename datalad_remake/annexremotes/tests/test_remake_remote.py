@@ -2,6 +2,10 @@ import pytest
 from datalad_core.config import ConfigItem
 
 from datalad_remake import allow_untrusted_execution_key
+from datalad_remake.annexremotes.remake_remote import (
+    RemakeRemote,
+    get_key_size,
+)
 from datalad_remake.commands.tests.create_datasets import create_ds_hierarchy
 from datalad_remake.utils.platform import on_windows
 
@@ -86,3 +90,31 @@ def test_compute_remote_main(tmp_path, cfgman, monkeypatch, trusted):
     # At this point the datalad-remake remote should have executed the
     # computation and written the result.
     assert (tmp_path / 'remade.txt').read_text().strip() == 'content: some_string'
+
+
+def test_get_key_size():
+    assert get_key_size('MD5E-s1234--0123456789abcdef.txt') == 1234
+    assert get_key_size('SHA256E-s0-m1700000000--abc') == 0
+    assert get_key_size('URL--datalad-remake:some-s12') is None
+    assert get_key_size('some-fake-annex-key') is None
+
+
+def test_progress_does_not_go_backwards():
+    class Annex:
+        def __init__(self):
+            self.reported = []
+
+        def progress(self, value):
+            self.reported.append(value)
+
+    annex = Annex()
+    remote = RemakeRemote(annex)
+    key = 'MD5E-s1000--0123456789abcdef.txt'
+    compute_progress = remote._get_compute_progress(key)
+    collect_progress = remote._get_collect_progress(key)
+    for fraction in (0.0, 0.5, 1.0):
+        compute_progress(fraction)
+    for copied in (0, 500, 1000):
+        collect_progress(copied)
+    assert annex.reported == sorted(annex.reported)
+    assert annex.reported[-1] == 1000
@@ -0,0 +1,132 @@
+"""DataLad make-clear-failures command
+
+Remove records of failed computations, see `datalad_remake.utils.failures`,
+such that the next request performs the computation again, instead of failing
+until the back-off period has passed.
+"""
+
+from __future__ import annotations
+
+import logging
+import subprocess
+from pathlib import Path
+from typing import (
+    TYPE_CHECKING,
+    ClassVar,
+)
+
+from datalad.distribution.dataset import resolve_path
+from datalad_next.commands import (
+    EnsureCommandParameterization,
+    Parameter,
+    ValidatedInterface,
+    build_doc,
+    datasetmethod,
+    eval_results,
+    get_status_dict,
+)
+from datalad_next.constraints import (
+    DatasetParameter,
+    EnsureDataset,
+    EnsureListOf,
+    EnsureStr,
+)
+from datalad_next.datasets import Dataset
+from datalad_next.runners import call_git_oneline
+
+from datalad_remake.utils.failures import (
+    FailureCache,
+    get_failures_dir,
+)
+
+if TYPE_CHECKING:
+    from collections.abc import Generator
+
+lgr = logging.getLogger('datalad.remake.clear_failures_cmd')
+
+
+# decoration auto-generates standard help
+@build_doc
+# all commands must be derived from Interface
+class ClearFailures(ValidatedInterface):
+    # first docstring line is used a short description in the cmdline help
+    # the rest is put in the verbose help and manpage
+    """Remove records of failed computations
+
+    The special remote records failed computations, and lets further
+    requests for the same computation fail immediately, until the back-off
+    period `datalad.make.failure-backoff` has passed. This command removes
+    the records of all failed computations of the dataset, or of the
+    computations of the given files.
+    """
+
+    _validator_ = EnsureCommandParameterization(
+        {
+            'dataset': EnsureDataset(installed=True),
+            'path': EnsureListOf(EnsureStr(min_len=1)),
+        }
+    )
+
+    # parameters of the command, must be exhaustive
+    _params_: ClassVar[dict[str, Parameter]] = {
+        'dataset': Parameter(
+            args=('-d', '--dataset'),
+            doc='Dataset whose failure records should be removed.',
+        ),
+        'path': Parameter(
+            args=('path',),
+            nargs='*',
+            doc='Files whose failure records should be removed. If no file '
+            'is given, all failure records of the dataset are removed.',
+        ),
+    }
+
+    @staticmethod
+    @datasetmethod(name='make_clear_failures')
+    @eval_results
+    def __call__(
+        path: list[str] | None = None,
+        *,
+        dataset: DatasetParameter | None = None,
+    ) -> Generator:
+        ds: Dataset = dataset.ds if dataset else Dataset('.')
+
+        keys = None
+        if path:
+            paths = [
+                str(resolve_path(p, dataset.original if dataset else None))
+                for p in path
+            ]
+            # Files that are not annexed yield empty lines
+            keys = [
+                key
+                for key in subprocess.run(
+                    ['git', 'annex', 'lookupkey', '--batch'],  # noqa: S607
+                    cwd=ds.pathobj,
+                    input=''.join(f'{p}\n' for p in paths),
+                    capture_output=True,
+                    text=True,
+                    check=True,
+                ).stdout.splitlines()
+                if key
+            ]
+
+        git_dir = call_git_oneline(['rev-parse', '--absolute-git-dir'], cwd=ds.pathobj)
+        failures = FailureCache(get_failures_dir(Path(git_dir)))
+        cleared = 0
+        for record in failures.clear(keys):
+            cleared += 1
+            yield get_status_dict(
+                action='make-clear-failures',
+                path=ds.path,
+                status='ok',
+                message=f'removed failure record {record["fingerprint"]}: '
+                f'{record["error"]}',
+            )
+        if not cleared:
+            yield get_status_dict(
+                action='make-clear-failures',
+                path=ds.path,
+                status='notneeded',
+                message='no failure records found',
+            )
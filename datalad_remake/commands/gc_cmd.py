@@ -0,0 +1,332 @@
+"""DataLad make-gc command
+
+Drop the content of computed files, that is cheap to get back, until the
+annexed content of the dataset fits into a disk budget. Candidates are present
+files with a compute instruction. They are ranked by the number of bytes that
+dropping them frees, per second that is needed to recompute them. The cost of
+a computation is taken from the records of the special remote, see
+`datalad_remake.utils.costs`. Files that have a copy on a remote other than
+the special remote, are ranked first, because they are retrieved instead of
+recomputed. Files without a cost record and without such a copy are never
+dropped.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import subprocess
+from pathlib import Path
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    ClassVar,
+    NamedTuple,
+)
+
+from datalad.distribution.dataset import resolve_path
+from datalad_next.commands import (
+    EnsureCommandParameterization,
+    Parameter,
+    ValidatedInterface,
+    build_doc,
+    datasetmethod,
+    eval_results,
+    get_status_dict,
+)
+from datalad_next.constraints import (
+    DatasetParameter,
+    EnsureDataset,
+    EnsureListOf,
+    EnsureStr,
+)
+from datalad_next.datasets import Dataset
+from datalad_next.runners import call_git_oneline
+
+from datalad_remake import (
+    PatternPath,
+    specification_dir,
+)
+from datalad_remake.commands.realize_cmd import get_priorities
+from datalad_remake.utils.costs import (
+    CostRecords,
+    get_costs_dir,
+)
+from datalad_remake.utils.fingerprint import get_fingerprint
+from datalad_remake.utils.instructions import (
+    Instruction,
+    get_compute_info,
+    select_instruction,
+)
+from datalad_remake.utils.planner import get_key_locations
+from datalad_remake.utils.size import parse_size
+from datalad_remake.utils.trees import (
+    get_annexed_keys,
+    get_tree_entries,
+)
+
+if TYPE_CHECKING:
+    from collections.abc import (
+        Generator,
+        Iterable,
+    )
+
+lgr = logging.getLogger('datalad.remake.gc_cmd')
+
+
+# Lower bound of recorded costs, in seconds, to rank computations that were
+# recorded with a duration of zero.
+min_cost = 0.001
+
+
+class Candidate(NamedTuple):
+    """A present annexed file, whose content might be dropped"""
+
+    path: Path
+    key: str
+    size: int
+    # Recorded duration of the computation, `None` if it is unknown
+    cost: float | None
+    # Whether the content is stored on a remote other than the special remote
+    stored: bool
+
+    @property
+    def rank(self) -> tuple[bool, float]:
+        if self.stored:
+            return True, float(self.size)
+        return False, self.size / max(self.cost or 0.0, min_cost)
+
+
+# decoration auto-generates standard help
+@build_doc
+# all commands must be derived from Interface
+class GarbageCollect(ValidatedInterface):
+    # first docstring line is used a short description in the cmdline help
+    # the rest is put in the verbose help and manpage
+    """Drop computed files that are cheap to recompute
+
+    The annexed content of the dataset, or of the given paths, is reduced to
+    the given budget, by dropping present files that have a compute
+    instruction. Files that are stored on another remote are dropped first,
+    then files that free the most space per second of recomputation. The
+    duration of a computation is recorded by the special remote, when it
+    computes a file. Files whose computation was not recorded, and that are
+    not stored elsewhere, are kept. Dropping honors the configured number of
+    copies, just like `datalad drop`.
+    """
+
+    _validator_ = EnsureCommandParameterization(
+        {
+            'dataset': EnsureDataset(installed=True),
+            'path': EnsureListOf(EnsureStr(min_len=1)),
+            'budget': EnsureStr(min_len=1),
+        }
+    )
+
+    # parameters of the command, must be exhaustive
+    _params_: ClassVar[dict[str, Parameter]] = {
+        'dataset': Parameter(
+            args=('-d', '--dataset'),
+            doc='Dataset whose content should be reduced.',
+        ),
+        'path': Parameter(
+            args=('path',),
+            nargs='*',
+            doc='Files or directories whose content should be reduced. If no '
+            'path is given, the content of the whole dataset is reduced.',
+        ),
+        'budget': Parameter(
+            args=('--budget',),
+            doc="Size of annexed content that should be kept, e.g. '500M' or "
+            "'2GiB'. Suffixes are interpreted as powers of 1024.",
+        ),
+        'dry_run': Parameter(
+            args=('--dry-run',),
+            action='store_true',
+            doc='Only report the files that would be dropped.',
+        ),
+    }
+
+    @staticmethod
+    @datasetmethod(name='make_gc')
+    @eval_results
+    def __call__(
+        path: list[str] | None = None,
+        *,
+        dataset: DatasetParameter | None = None,
+        budget: str | None = None,
+        dry_run: bool = False,
+    ) -> Generator:
+        ds: Dataset = dataset.ds if dataset else Dataset('.')
+        if budget is None:
+            msg = 'A budget is required, e.g. `--budget 20G`'
+            raise ValueError(msg)
+
+        paths = [
+            str(resolve_path(p, dataset.original if dataset else None))
+            for p in path or [ds.path]
+        ]
+        present = get_present_files(ds, paths)
+        # Content is counted once per key, even if several files refer to it
+        sizes = {key: size for _, key, size in present}
+        excess = sum(sizes.values()) - parse_size(budget)
+        if excess <= 0:
+            yield get_status_dict(
+                action='make-gc',
+                path=ds.path,
+                status='notneeded',
+                message=f'{sum(sizes.values())} bytes of annexed content fit '
+                'into the budget',
+            )
+            return
+
+        candidates = sorted(
+            (
+                candidate
+                for candidate in get_candidates(ds, present)
+                if candidate.stored or candidate.cost is not None
+            ),
+            key=lambda candidate: candidate.rank,
+            reverse=True,
+        )
+        selected = []
+        for candidate in candidates:
+            if excess <= 0:
+                break
+            if candidate.key in sizes:
+                excess -= sizes.pop(candidate.key)
+            selected.append(candidate)
+
+        for candidate in selected:
+            if dry_run:
+                yield get_status_dict(
+                    action='make-gc',
+                    path=str(candidate.path),
+                    status='ok',
+                    message=f'would drop {describe(candidate)}',
+                )
+                continue
+            for result in ds.drop(
+                candidate.path,
+                on_failure='ignore',
+                result_renderer='disabled',
+                return_type='generator',
+            ):
+                yield {
+                    **result,
+                    'action': 'make-gc',
+                    'message': f'dropped {describe(candidate)}'
+                    if result['status'] == 'ok'
+                    else result.get('message'),
+                }
+
+        if excess > 0:
+            yield get_status_dict(
+                action='make-gc',
+                path=ds.path,
+                status='impossible',
+                message=f'{excess} bytes over budget, remaining files are not '
+                'computed, or their computation costs are unknown',
+            )
+
+
+def get_present_files(
+    dataset: Dataset,
+    paths: Iterable[str],
+) -> list[tuple[Path, str, int]]:
+    """Get path, key, and size of the present annexed files in `paths`
+
+    The keys of computed files are URL keys without a size, their size is
+    determined from their present content.
+    """
+    result = subprocess.run(
+        ['git', 'annex', 'find', '--json', '--', *paths],  # noqa: S607
+        cwd=dataset.pathobj,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    present = []
+    for record in map(json.loads, result.stdout.splitlines()):
+        path = dataset.pathobj / record['file']
+        size = (
+            path.stat().st_size
+            if record['bytesize'] == 'unknown'
+            else int(record['bytesize'])
+        )
+        present.append((path, record['key'], size))
+    return present
+
+
+def get_candidates(
+    dataset: Dataset,
+    present: list[tuple[Path, str, int]],
+) -> Generator[Candidate]:
+    """Yield the files in `present` that have a compute instruction"""
+    locations = get_key_locations(dataset.pathobj, (key for _, key, _ in present))
+    git_dir = call_git_oneline(['rev-parse', '--absolute-git-dir'], cwd=dataset.pathobj)
+    costs = CostRecords(get_costs_dir(Path(git_dir)))
+    priorities = get_priorities(dataset)
+    specs: dict[tuple[str, str], dict[str, Any] | None] = {}
+    for path, key, size in present:
+        location = locations[key]
+        if not location.urls:
+            continue
+        instruction = select_instruction(location.urls, priorities)
+        spec_id = (instruction.root_version, instruction.spec_name)
+        if spec_id not in specs:
+            specs[spec_id] = get_specification(dataset, instruction)
+        spec = specs[spec_id]
+        cost = None
+        if spec is not None:
+            compute_info = get_compute_info(instruction, spec)
+            cost = costs.get(get_fingerprint(dataset.pathobj, compute_info))
+        yield Candidate(path, key, size, cost, location.stored)
+
+
+def get_specification(
+    dataset: Dataset,
+    instruction: Instruction,
+) -> dict[str, Any] | None:
+    """Read the specification of `instruction` from its root version
+
+    The specification is not verified, because it is not executed, and it is
+    not retrieved, because the dataset should not grow. `None` is returned, if
+    the root version is not a commit of `dataset`, or if the specification is
+    annexed and not present.
+    """
+    path = PatternPath(specification_dir) / instruction.spec_name
+    try:
+        entry = get_tree_entries(dataset.pathobj, instruction.root_version).get(path)
+        if entry is None:
+            return None
+        key = get_annexed_keys(dataset.pathobj, instruction.root_version).get(path)
+        if key is None:
+            content = subprocess.run(
+                ['git', 'cat-file', 'blob', entry.object],  # noqa: S607
+                cwd=dataset.pathobj,
+                capture_output=True,
+                check=True,
+            ).stdout
+        else:
+            location = subprocess.run(
+                ['git', 'annex', 'contentlocation', key],  # noqa: S607
+                cwd=dataset.pathobj,
+                capture_output=True,
+                text=True,
+                check=False,
+            ).stdout.strip()
+            if not location:
+                return None
+            content = (dataset.pathobj / location).read_bytes()
+        return json.loads(content)
+    except (subprocess.CalledProcessError, OSError, ValueError) as e:
+        lgr.debug('cannot read specification %s: %s', instruction.spec_name, e)
+        return None
+
+
+def describe(candidate: Candidate) -> str:
+    """Describe the size and the cost of a candidate"""
+    if candidate.stored:
+        return f'{candidate.size} bytes, stored on another remote'
+    return f'{candidate.size} bytes, recomputation takes {candidate.cost:.1f}s'
@@ -31,31 +31,44 @@ from datalad_next.constraints import (
 )
 from datalad_next.datasets import Dataset
 from datalad_next.runners import (
+    call_git_lines,
     call_git_oneline,
     call_git_success,
 )
 
 from datalad_remake import (
     PatternPath,
+    background_cleanup_config_key,
+    output_discovery_config_key,
     specification_dir,
     template_dir,
     url_scheme,
 )
 from datalad_remake.commands import provision_cmd
-from datalad_remake.utils.chdir import chdir
+from datalad_remake.utils.changes import (
+    get_changes,
+    take_snapshot,
+)
 from datalad_remake.utils.compute import compute
 from datalad_remake.utils.getconfig import get_trusted_keys
-from datalad_remake.utils.glob import resolve_patterns
+from datalad_remake.utils.glob import (
+    PatternMatcher,
+    resolve_patterns,
+)
 from datalad_remake.utils.read_list import read_list
 from datalad_remake.utils.remake_remote import add_remake_remote
 from datalad_remake.utils.verify import verify_file
 
 if TYPE_CHECKING:
     from collections.abc import (
+        Callable,
         Generator,
         Iterable,
     )
-    from typing import ClassVar
+    from typing import (
+        Any,
+        ClassVar,
+    )
 
 lgr = logging.getLogger('datalad.remake.make_cmd')
 
@@ -184,7 +197,9 @@ class Make(ValidatedInterface):
             ),
             action='append',
             doc='Input parameter in the form <name>=<value> (repeat for '
-            'multiple parameters).',
+            'multiple parameters). If a name is given more than once, all its '
+            'values are passed to the template as a list, this requires that '
+            'the parameter is declared in `list_parameters` of the template.',
         ),
         'parameter_list': Parameter(
             args=(
@@ -211,6 +226,20 @@ class Make(ValidatedInterface):
             'output tends to differ between runs, for example due to time '
             'stamps or other non-deterministic factors.',
         ),
+        'in_place': Parameter(
+            args=('--in-place',),
+            action='store_true',
+            default=False,
+            doc='Execute the computation directly in the dataset, instead of '
+            'in a temporary worktree. This is only done, if the computation '
+            'should be performed on HEAD, and if the dataset, including its '
+            'installed subdatasets, is clean. Otherwise a temporary worktree '
+            'is used. All changes are rolled back, if the computation fails, '
+            'or if it changes files that match no output pattern. Files that '
+            'are ignored by git and were modified by the computation cannot be '
+            'restored. This option has no effect when combined with '
+            '`--prospective-execution`.',
+        ),
         'allow_untrusted_execution': Parameter(
             args=('--allow-untrusted-execution',),
             action='store_true',
@@ -244,6 +273,7 @@ class Make(ValidatedInterface):
         parameter: list[str] | None = None,
         parameter_list: Path | None = None,
         stdout: str | None = None,
+        in_place: bool = False,
         allow_untrusted_execution: bool = False,
     ) -> Generator:
         ds: Dataset = dataset.ds if dataset else Dataset('.')
@@ -252,13 +282,11 @@ class Make(ValidatedInterface):
         output_pattern = list(map(PatternPath, (output or []) + read_list(output_list)))
         stdout_path = None if stdout is None else PatternPath(stdout)
 
-        parameter_dict = dict(
-            [p.split('=', 1) for p in (parameter or []) + read_list(parameter_list)]
-        )
+        parameter_dict = parse_parameters((parameter or []) + read_list(parameter_list))
 
         # We have to get the URL first, because saving the specification to
         # the dataset will change the version.
-        url_base, reset_commit = get_url(
+        url_base, _ = get_url(
             ds,
             branch,
             template,
@@ -270,21 +298,44 @@ class Make(ValidatedInterface):
         )
 
         if not prospective_execution:
-            with provide_context(
-                ds,
-                branch,
-                input_pattern,
-            ) as worktree:
-                execute(
-                    worktree,
+            trusted_key_ids = None if allow_untrusted_execution else get_trusted_keys()
+            if in_place and can_execute_in_place(ds, branch):
+                resolved_output = execute_in_place(
+                    ds,
                     template,
                     parameter_dict,
+                    input_pattern,
                     output_pattern,
                     stdout_path,
-                    None if allow_untrusted_execution else get_trusted_keys(),
+                    trusted_key_ids,
+                    output_discovery=ds.config.get(output_discovery_config_key, 'glob'),
                 )
-                resolved_output = collect(worktree, ds, output_pattern, stdout_path)
+            else:
+                with provide_context(
+                    ds,
+                    branch,
+                    input_pattern,
+                    output_pattern,
+                ) as worktree:
+                    changed_output = execute(
+                        worktree,
+                        template,
+                        parameter_dict,
+                        output_pattern,
+                        stdout_path,
+                        trusted_key_ids,
+                        output_discovery=ds.config.get(
+                            output_discovery_config_key, 'glob'
+                        ),
+                    )
+                    resolved_output = collect(
+                        worktree, ds, output_pattern, stdout_path, changed_output
+                    )
         else:
+            if in_place:
+                lgr.warning(
+                    '--in-place has no effect if --prospective-execution is provided.'
+                )
             if allow_untrusted_execution:
                 lgr.warning(
                     '--allow-untrusted-execution has no effect if '
@@ -304,11 +355,31 @@ class Make(ValidatedInterface):
             )
 
 
+def parse_parameters(parameters: Iterable[str]) -> dict[str, str | list[str]]:
+    """Convert `<name>=<value>` strings into a parameter dictionary
+
+    The values of names that occur more than once are collected in a list,
+    in the given order.
+    """
+    result: dict[str, str | list[str]] = {}
+    for parameter in parameters:
+        name, value = parameter.split('=', 1)
+        if name not in result:
+            result[name] = value
+        else:
+            existing = result[name]
+            if isinstance(existing, str):
+                result[name] = [existing, value]
+            else:
+                existing.append(value)
+    return result
+
+
 def get_url(
     dataset: Dataset,
     branch: str | None,
     template_name: str,
-    parameters: dict[str, str],
+    parameters: dict[str, str | list[str]],
     input_pattern: list[PatternPath],
     output_pattern: list[PatternPath],
     stdout: PatternPath | None,
@@ -337,7 +408,7 @@ def write_spec(
     input_pattern: list[PatternPath],
     output_pattern: list[PatternPath],
     stdout: PatternPath | None,
-    parameters: dict[str, str],
+    parameters: dict[str, str | list[str]],
 ) -> str:
     # create the specification and hash it
     spec = build_json(method, input_pattern, output_pattern, stdout, parameters)
@@ -349,8 +420,11 @@ def write_spec(
     spec_dir = dataset.pathobj / specification_dir
     spec_dir.mkdir(parents=True, exist_ok=True)
     spec_file = spec_dir / digest
-    with chdir(dataset.pathobj):
-        call_git_success(['annex', 'unlock', str(spec_file)], capture_output=True)
+    call_git_success(
+        ['annex', 'unlock', str(spec_file)],
+        cwd=dataset.pathobj,
+        capture_output=True,
+    )
     spec_file.write_text(spec)
     dataset.save(
         message=f'[DATALAD] saving computation spec\n\nfile name: {digest}',
@@ -365,7 +439,7 @@ def build_json(
     inputs: list[PatternPath],
     outputs: list[PatternPath],
     stdout: PatternPath | None,
-    parameters: dict[str, str],
+    parameters: dict[str, str | list[str]],
 ) -> str:
     return json.dumps(
         {
@@ -438,18 +512,22 @@ def provide(
     dataset: Dataset,
     branch: str | None,
     input_patterns: list[PatternPath],
+    output_patterns: list[PatternPath] | None = None,
 ) -> Path:
     lgr.debug(
-        'provide: called with %s %s %s',
+        'provide: called with %s %s %s %s',
         dataset,
         branch,
         input_patterns,
+        output_patterns,
     )
     result = list(
         provision_cmd.provide(
             dataset=dataset,
             input_patterns=input_patterns,
             source_branch=branch,
+            output_patterns=output_patterns,
+            transient=True,
         )
     )
     return Path(result[0]['path'])
@@ -460,16 +538,23 @@ def provide_context(
     dataset: Dataset,
     branch: str | None,
     input_patterns: list[PatternPath],
+    output_patterns: list[PatternPath] | None = None,
 ) -> Generator:
 
     lgr.debug(
-        'provide_context: called with: %s %s %s',
+        'provide_context: called with: %s %s %s %s',
         dataset,
         branch,
-        input_patterns
+        input_patterns,
+        output_patterns,
     )
 
-    worktree = provide(dataset, branch=branch, input_patterns=input_patterns)
+    worktree = provide(
+        dataset,
+        branch=branch,
+        input_patterns=input_patterns,
+        output_patterns=output_patterns,
+    )
     try:
         lgr.debug('provide_context: created worktree: %s', worktree)
         yield worktree
@@ -478,33 +563,68 @@ def provide_context(
             lgr.debug(
                 'provide_context: un-provide: DATALAD_REMAKE_KEEP_TEMP set: keeping: %s %s',
                 dataset,
-                str(worktree)
+                str(worktree),
             )
         else:
-            lgr.debug(
-                'provide_context: un-provide: %s %s',
+            lgr.debug('provide_context: un-provide: %s %s', dataset, str(worktree))
+            provision_cmd.remove(
                 dataset,
-                str(worktree)
+                Dataset(worktree),
+                background=dataset.config.getbool(
+                    *background_cleanup_config_key.rsplit('.', 1), default=True
+                ),
             )
-            dataset.provision(delete=worktree, result_renderer='disabled')
 
 
 def execute(
     worktree: Path,
     template_name: str,
-    parameter: dict[str, str],
+    parameter: dict[str, str | list[str]],
     output_pattern: list[PatternPath],
     stdout: PatternPath | None,
     trusted_key_ids: list[str] | None,
-) -> None:
+    output_discovery: str = 'glob',
+    notify: Callable[[str], Any] | None = None,
+    progress: Callable[[float], Any] | None = None,
+    requested: Iterable[PatternPath] | None = None,
+    capture_stderr: bool = False,
+) -> set[PatternPath] | None:
+    """Execute the template `template_name` in `worktree`
+
+    If `output_discovery` is `'changes'`, the worktree state is recorded before
+    the computation, and all files that were created or modified by the
+    computation and match `output_pattern` are returned. Changed files that
+    do not match `output_pattern` are reported in a warning. If
+    `output_discovery` is `'glob'`, `None` is returned, and outputs have to be
+    determined by globbing `output_pattern` in the worktree.
+
+    `notify` is called with a message, if the computation has to wait for
+    admission. `progress` is called with the progress of the computation, if
+    the template declares a progress expression.
+
+    If the template maps over a list parameter, `requested` outputs restrict
+    the computation to the chunks that compute them, see
+    `datalad_remake.utils.compute.compute`. Then the existing outputs of these
+    chunks are returned, also if `output_discovery` is `'glob'`.
+
+    If `capture_stderr` is set, errors of failing commands carry the tail of
+    their stderr.
+    """
     lgr.debug(
-        'execute: %s %s %s %s %s',
+        'execute: %s %s %s %s %s %s',
         str(worktree),
         template_name,
         repr(parameter),
         repr(output_pattern),
         repr(stdout),
+        output_discovery,
     )
+    if output_discovery not in ('glob', 'changes'):
+        msg = (
+            f'Invalid value for {output_discovery_config_key}: '
+            f'{output_discovery!r}, expected "glob" or "changes"'
+        )
+        raise ValueError(msg)
 
     worktree_ds = Dataset(worktree)
 
@@ -523,12 +643,187 @@ def execute(
         verify_file(worktree_ds.pathobj, template_path, trusted_key_ids)
 
     worktree_ds.get(template_path, result_renderer='disabled')
-    compute(
+    # Existing outputs are recorded, because a computation might rewrite them
+    # with identical content, which git would not consider a change.
+    snapshot = (
+        take_snapshot(worktree, existing_outputs)
+        if output_discovery == 'changes'
+        else None
+    )
+    executed_outputs = compute(
         worktree,
         worktree / template_path,
         parameter,
         None if stdout is None else worktree / stdout,
+        output_pattern,
+        notify,
+        progress,
+        requested,
+        capture_stderr,
+    )
+    matcher = PatternMatcher(output_pattern)
+    if snapshot is None:
+        if executed_outputs is None:
+            return None
+        return {
+            path
+            for path in map(PatternPath, executed_outputs)
+            if matcher.match(path) and (worktree / path).exists()
+        }
+
+    changes = get_changes(worktree, snapshot)
+    changes.discard(stdout)
+    outputs = {path for path in changes if matcher.match(path)}
+    undeclared = changes - outputs
+    if undeclared:
+        lgr.warning(
+            'template %s wrote files that match no output pattern: %s',
+            template_name,
+            ', '.join(sorted(map(str, undeclared))),
+        )
+    return outputs
+
+
+def can_execute_in_place(dataset: Dataset, branch: str | None) -> bool:
+    """Check whether a computation on `branch` can be executed in `dataset`
+
+    This requires that `branch` is HEAD, and that `dataset` and its installed
+    subdatasets are clean.
+    """
+    if branch is not None:
+        head = call_git_oneline(['rev-parse', 'HEAD'], cwd=dataset.pathobj)
+        commit = call_git_oneline(
+            ['rev-parse', '--verify', f'{branch}^{{commit}}'], cwd=dataset.pathobj
+        )
+        if commit != head:
+            lgr.info('%s is not HEAD, executing in a worktree', branch)
+            return False
+    if call_git_lines(['status', '--porcelain'], cwd=dataset.pathobj):
+        lgr.info('%s is not clean, executing in a worktree', dataset.pathobj)
+        return False
+    return True
+
+
+def execute_in_place(
+    dataset: Dataset,
+    template_name: str,
+    parameter: dict[str, str | list[str]],
+    input_pattern: list[PatternPath],
+    output_pattern: list[PatternPath],
+    stdout: PatternPath | None,
+    trusted_key_ids: list[str] | None,
+    output_discovery: str = 'glob',
+) -> set[PatternPath]:
+    """Execute the template `template_name` in the clean dataset `dataset`
+
+    Subdatasets that contain outputs are installed, and existing outputs are
+    unlocked, before the template is executed. All changes are rolled back,
+    if the computation fails, or if it changes paths that match no output
+    pattern. Otherwise, the outputs are saved and returned. Outputs are
+    determined like in `execute`. With `output_discovery` `'changes'`,
+    existing outputs that the template did not modify are locked again.
+    """
+    for path in provision_cmd.resolve_patterns(dataset, dataset, input_pattern):
+        dataset.get(str(dataset.pathobj / path), result_renderer='disabled')
+
+    # The dataset is clean, the snapshot only contains ignored paths
+    snapshot = take_snapshot(dataset.pathobj, include_deleted=True)
+    try:
+        existing_outputs = provision_cmd.resolve_patterns(
+            dataset, dataset, output_pattern
+        )
+        install_containing_subdatasets(dataset, output_pattern)
+        unlock_files(dataset, existing_outputs)
+        executed_outputs = execute(
+            dataset.pathobj,
+            template_name,
+            parameter,
+            output_pattern,
+            stdout,
+            trusted_key_ids,
+            output_discovery=output_discovery,
+        )
+    except BaseException:
+        rollback(
+            dataset,
+            get_changes(dataset.pathobj, snapshot, include_deleted=True),
+            snapshot,
+        )
+        raise
+
+    changes = get_changes(dataset.pathobj, snapshot, include_deleted=True)
+    matcher = PatternMatcher(output_pattern)
+    changed_outputs = {path for path in changes if matcher.match(path)}
+    undeclared = changes - changed_outputs - {stdout}
+    deleted = {
+        path for path in changed_outputs if not (dataset.pathobj / path).exists()
+    }
+    if undeclared or deleted:
+        rollback(dataset, changes, snapshot)
+        msg = (
+            f'template {template_name} changed paths that are not outputs, or '
+            f'deleted outputs, all changes were rolled back: '
+            f'{", ".join(sorted(map(str, undeclared | deleted)))}'
+        )
+        raise RuntimeError(msg)
+
+    outputs = (
+        resolve_patterns(root_dir=dataset.pathobj, patterns=output_pattern)
+        if executed_outputs is None
+        else set(executed_outputs)
     )
+    if output_discovery == 'changes':
+        # Unlocked outputs, that were not modified, are restored
+        rollback(dataset, changed_outputs - outputs, snapshot)
+    if stdout is not None:
+        outputs.add(stdout)
+    dataset.save(recursive=True, result_renderer='disabled')
+    return outputs
+
+
+def rollback(
+    dataset: Dataset,
+    paths: Iterable[PatternPath],
+    snapshot: dict[PatternPath, tuple[int, int, int]],
+) -> None:
+    """Restore `paths` in `dataset` to their state in HEAD
+
+    Tracked paths are checked out, untracked paths are removed. Paths in
+    `snapshot` existed before the computation and were not tracked, i.e.
+    they were ignored. They cannot be restored and are reported in a warning.
+    """
+    unrestorable = []
+    for path in sorted(paths):
+        if path in snapshot:
+            unrestorable.append(str(path))
+            continue
+        file = dataset.pathobj / path
+        # The parent directory might have been deleted, use the closest
+        # existing directory to find the containing (sub)dataset.
+        directory = file.parent
+        while not directory.exists():
+            directory = directory.parent
+        top_level = Path(
+            call_git_oneline(['rev-parse', '--show-toplevel'], cwd=directory)
+        )
+        relative_path = file.relative_to(top_level).as_posix()
+        if call_git_success(
+            ['cat-file', '-e', f'HEAD:{relative_path}'],
+            cwd=top_level,
+            capture_output=True,
+        ):
+            call_git_success(
+                ['checkout', 'HEAD', '--', relative_path],
+                cwd=top_level,
+                capture_output=True,
+            )
+        else:
+            file.unlink(missing_ok=True)
+    if unrestorable:
+        lgr.warning(
+            'could not restore ignored files: %s',
+            ', '.join(unrestorable),
+        )
 
 
 def collect(
@@ -536,17 +831,28 @@ def collect(
     dataset: Dataset,
     output_pattern: Iterable[PatternPath],
     stdout: PatternPath | None,
+    outputs: Iterable[PatternPath] | None = None,
 ) -> set[PatternPath]:
+    """Copy outputs from `worktree` to `dataset` and save `dataset`
+
+    If `outputs` is `None`, the outputs are determined by globbing
+    `output_pattern` in `worktree`.
+    """
 
     output_pattern = tuple(output_pattern)
     lgr.debug(
-        'collect: called with: %s %s %s',
+        'collect: called with: %s %s %s %s',
         worktree,
         dataset,
         output_pattern,
+        outputs,
     )
 
-    output = resolve_patterns(root_dir=worktree, patterns=output_pattern)
+    output = (
+        resolve_patterns(root_dir=worktree, patterns=output_pattern)
+        if outputs is None
+        else set(outputs)
+    )
     if stdout is not None:
         output.add(stdout)
 
@@ -637,20 +943,19 @@ def unlock_files(
     files: Iterable[PatternPath],
 ) -> None:
     """Use datalad to resolve subdatasets and unlock files in the dataset."""
-    # TODO: for some reason `dataset unlock` does not operate in the
-    #  context of `dataset.pathobj`, so we need to change the working
-    #  directory manually here.
-    with chdir(dataset.pathobj):
-        for f in files:
-            file = dataset.pathobj / f
-            if not file.exists() and file.is_symlink():
-                # `datalad unlock` does not "unlock" dangling symlinks, so we
-                # mimic the behavior of `git annex unlock` here:
-                link = os.readlink(file)
-                file.unlink()
-                file.write_text('/annex/objects/' + link.split('/')[-1] + '\n')
-            elif file.is_symlink():
-                dataset.unlock(file, result_renderer='disabled')
+    # Files are given as absolute paths, because the working directory of the
+    # process must not be changed. It is shared by concurrent computations of
+    # the special remote.
+    for f in files:
+        file = dataset.pathobj / f
+        if not file.exists() and file.is_symlink():
+            # `datalad unlock` does not "unlock" dangling symlinks, so we
+            # mimic the behavior of `git annex unlock` here:
+            link = os.readlink(file)
+            file.unlink()
+            file.write_text('/annex/objects/' + link.split('/')[-1] + '\n')
+        elif file.is_symlink():
+            dataset.unlock(str(file), result_renderer='disabled')
 
 
 def create_output_space(
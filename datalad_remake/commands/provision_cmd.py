@@ -11,7 +11,6 @@ import re
 from contextlib import suppress
 from pathlib import Path
 from re import Match
-from tempfile import TemporaryDirectory
 from typing import (
     TYPE_CHECKING,
     ClassVar,
@@ -43,10 +42,14 @@ from datalad_remake import (
     PatternPath,
     worktree_source_config_key,
 )
-from datalad_remake.utils.chdir import chdir
 from datalad_remake.utils.glob import glob
 from datalad_remake.utils.platform import on_windows
 from datalad_remake.utils.read_list import read_list
+from datalad_remake.utils.reaper import start_reaper
+from datalad_remake.utils.scratch import (
+    get_worktree_dir,
+    remove_lease,
+)
 
 if TYPE_CHECKING:
     from collections.abc import Generator, Iterable
@@ -133,7 +136,9 @@ class Provision(ValidatedInterface):
                 '--worktree-dir',
             ),
             doc='Path of the directory that should become the temporary '
-            'worktree, defaults to `tempfile.TemporaryDirectory().name`.',
+            'worktree. If not given, a directory is chosen from the scratch '
+            'directories configured in `datalad.make.scratch-dirs`, or in the '
+            'system temporary directory if none is configured.',
         ),
     }
 
@@ -166,22 +171,37 @@ class Provision(ValidatedInterface):
             )
             return
 
-        resolved_worktree_dir: Path = Path(worktree_dir or TemporaryDirectory().name)
         inputs = input or [*read_list(input_list)]
         yield from provide(
             dataset=ds,
             input_patterns=[PatternPath(inp) for inp in inputs],
             source_branch=branch,
-            worktree_dir=resolved_worktree_dir,
+            worktree_dir=worktree_dir,
         )
 
 
-def remove(dataset: Dataset, worktree: Dataset) -> None:
+def remove(dataset: Dataset, worktree: Dataset, *, background: bool = False) -> None:
+    """Remove a provisioned worktree
+
+    If `background` is `True`, the worktree is removed by a background
+    process, see `datalad_remake.utils.reaper`, and this function returns
+    immediately. If the background process cannot be started, the worktree
+    is removed in the foreground.
+    """
+    if background:
+        try:
+            start_reaper(dataset.pathobj, worktree.pathobj)
+        except OSError as e:
+            lgr.debug('Could not start reaper for %s: %s', worktree.pathobj, e)
+        else:
+            return
+
     worktree.drop(
         what='all', reckless='kill', recursive=True, result_renderer='disabled'
     )
     prune_worktrees(dataset)
     call_git_success(['branch', '-d', worktree.pathobj.name], cwd=dataset.pathobj)
+    remove_lease(worktree.pathobj)
 
 
 def prune_worktrees(dataset: Dataset) -> None:
@@ -193,6 +213,9 @@ def provide(
     input_patterns: list[PatternPath],
     source_branch: str | None = None,
     worktree_dir: str | Path | None = None,
+    output_patterns: list[PatternPath] | None = None,
+    *,
+    transient: bool = False,
 ) -> Generator:
     """Provide paths defined by input_patterns in a temporary worktree
 
@@ -206,7 +229,15 @@ def provide(
         Branch that should be provisioned, if `None` HEAD will be used.
     worktree_dir: Path | None
         Path to a directory that should contain the provisioned worktree or
-        `None`. If `None` a temporary directory will be created.
+        `None`. If `None` a directory in a configured scratch location, or in
+        the system temporary directory, will be used.
+    output_patterns: list[PatternPath] | None
+        List of patterns that describe the output files. They are only used
+        to estimate the space that is required in the scratch location.
+    transient: bool
+        If `True`, the worktree is owned by the calling process and may be
+        garbage collected if the process terminates without removing it.
+        Only used if `worktree_dir` is `None`.
 
     Returns
     -------
@@ -215,25 +246,39 @@ def provide(
         which the dataset was provisioned, or one or more error-results.
     """
     resolved_worktree_dir: Path = Path(
-        worktree_dir or TemporaryDirectory().name
+        worktree_dir
+        or get_worktree_dir(
+            dataset, input_patterns, output_patterns or [], transient=transient
+        )
     ).absolute()
 
     lgr.debug('Provisioning dataset %s at %s', dataset, resolved_worktree_dir)
 
-    if on_windows:
-        # `git worktree` does not work with `git annex` on Windows, create a
-        # cloned worktree instead.
-        create_cloned_worktree(dataset, source_branch, resolved_worktree_dir)
-    else:
-        # Create a worktree via `git worktree`
-        create_git_worktree(dataset, source_branch, resolved_worktree_dir)
+    try:
+        if on_windows:
+            # `git worktree` does not work with `git annex` on Windows, create
+            # a cloned worktree instead.
+            create_cloned_worktree(dataset, source_branch, resolved_worktree_dir)
+        else:
+            # Create a worktree via `git worktree`
+            create_git_worktree(dataset, source_branch, resolved_worktree_dir)
 
-    worktree_dataset = Dataset(resolved_worktree_dir)
+        worktree_dataset = Dataset(resolved_worktree_dir)
 
-    # Get all input files in the worktree
-    with chdir(worktree_dataset.path):
+        # Get all input files in the worktree
         for path in resolve_patterns(dataset, worktree_dataset, input_patterns):
-            worktree_dataset.get(path, result_renderer='disabled')
+            worktree_dataset.get(
+                str(worktree_dataset.pathobj / path), result_renderer='disabled'
+            )
+    except BaseException:
+        # The worktree is not handed to the caller, release its lease and
+        # remove it, if it was created in a scratch directory.
+        if worktree_dir is None:
+            if resolved_worktree_dir.exists():
+                with suppress(Exception):
+                    remove(dataset, Dataset(resolved_worktree_dir))
+            remove_lease(resolved_worktree_dir)
+        raise
 
     yield get_status_dict(
         action='provision',
@@ -390,7 +435,7 @@ def glob_pattern(
         root_dir=root.pathobj / position,
     ):
         match = position / PatternPath(*Path(rec_match).parts)
-        system_match = Path(*position.parts) / rec_match
+        system_match = root.pathobj / Path(*position.parts) / rec_match
 
         # If the match is a directory that is in uninstalled subdatasets,
         # install the dataset and updated uninstalled datasets before proceeding
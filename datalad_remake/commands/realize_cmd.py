@@ -0,0 +1,356 @@
+"""DataLad make-realize command
+
+Retrieving prospectively registered files with `datalad get` performs one
+computation per file, each in its own worktree. This command groups the
+requested files by the fingerprint of the computation of their selected
+compute instruction, see `datalad_remake.utils.fingerprint`. Every group is
+provisioned and executed once, and all of its requested outputs are collected
+from the same worktree. Missing inputs that are outputs of other computations
+are realized first, see `datalad_remake.utils.planner`. Independent groups are
+processed concurrently.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import json
+import logging
+import subprocess
+from pathlib import Path
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    ClassVar,
+)
+
+from datalad.distribution.dataset import resolve_path
+from datalad_next.commands import (
+    EnsureCommandParameterization,
+    Parameter,
+    ValidatedInterface,
+    build_doc,
+    datasetmethod,
+    eval_results,
+    get_status_dict,
+)
+from datalad_next.constraints import (
+    DatasetParameter,
+    EnsureDataset,
+    EnsureInt,
+    EnsureListOf,
+    EnsureStr,
+)
+from datalad_next.datasets import Dataset
+from datalad_next.runners import call_git_success
+
+from datalad_remake import (
+    PatternPath,
+    output_discovery_config_key,
+    priority_config_key,
+    template_dir,
+    url_scheme,
+)
+from datalad_remake.commands.make_cmd import (
+    execute,
+    provide_context,
+)
+from datalad_remake.utils.config_snapshot import get_config_snapshot
+from datalad_remake.utils.getconfig import (
+    get_allow_untrusted_execution,
+    get_trusted_keys,
+)
+from datalad_remake.utils.instructions import (
+    get_compute_info,
+    select_instruction,
+)
+from datalad_remake.utils.pipeline import (
+    Pipeline,
+    Stage,
+)
+from datalad_remake.utils.planner import (
+    Node,
+    Plan,
+    Request,
+    plan,
+)
+
+if TYPE_CHECKING:
+    from collections.abc import (
+        Generator,
+        Iterable,
+    )
+
+lgr = logging.getLogger('datalad.remake.realize_cmd')
+
+
+# Number of paths that are passed to a single `git annex whereis` call
+whereis_chunk_size = 500
+
+default_jobs = 4
+
+
+# decoration auto-generates standard help
+@build_doc
+# all commands must be derived from Interface
+class Realize(ValidatedInterface):
+    # first docstring line is used a short description in the cmdline help
+    # the rest is put in the verbose help and manpage
+    """Compute prospectively registered files in groups
+
+    Files that are not present and have a compute instruction are grouped by
+    the computation of the compute instruction that is selected for them,
+    honoring `datalad.make.priority`. Instructions of different commits are
+    the same computation, if their specifications, method templates, and
+    inputs are equal. Every group is provisioned and executed once, and all
+    of its requested files are collected from the results. Inputs that are
+    not present, but can be computed themselves, are computed first.
+    Independent groups are computed concurrently.
+
+    Commit signatures are verified with the keys in `datalad.make.trusted-keys`,
+    unless untrusted execution is allowed for the dataset, just like for
+    `datalad get`. Only files of the dataset itself are realized, not files
+    in subdatasets.
+    """
+
+    _validator_ = EnsureCommandParameterization(
+        {
+            'dataset': EnsureDataset(installed=True),
+            'path': EnsureListOf(EnsureStr(min_len=1), min_len=1),
+            'jobs': EnsureInt(),
+        }
+    )
+
+    # parameters of the command, must be exhaustive
+    _params_: ClassVar[dict[str, Parameter]] = {
+        'dataset': Parameter(
+            args=('-d', '--dataset'),
+            doc='Dataset that contains the files.',
+        ),
+        'path': Parameter(
+            args=('path',),
+            nargs='+',
+            doc='Files or directories that should be realized.',
+        ),
+        'jobs': Parameter(
+            args=('-J', '--jobs'),
+            doc='Number of groups that are computed concurrently.',
+        ),
+    }
+
+    @staticmethod
+    @datasetmethod(name='make_realize')
+    @eval_results
+    def __call__(
+        path: list[str],
+        *,
+        dataset: DatasetParameter | None = None,
+        jobs: int | None = None,
+    ) -> Generator:
+        ds: Dataset = dataset.ds if dataset else Dataset('.')
+
+        paths = [
+            str(resolve_path(p, dataset.original if dataset else None)) for p in path
+        ]
+        priorities = get_priorities(ds)
+        requests = []
+        for file, key, urls, present in get_annex_locations(ds, paths):
+            if present:
+                yield get_status_dict(
+                    action='make-realize',
+                    path=str(file),
+                    status='notneeded',
+                    message='file is present',
+                )
+            elif not urls:
+                yield get_status_dict(
+                    action='make-realize',
+                    path=str(file),
+                    status='impossible',
+                    message='no compute instruction registered',
+                )
+            else:
+                requests.append(
+                    Request(file, key, select_instruction(urls, priorities))
+                )
+
+        trusted_key_ids = (
+            None if get_allow_untrusted_execution(ds.id) else get_trusted_keys()
+        )
+        # Missing inputs that can be computed are added to the plan, and are
+        # realized before the computations that need them.
+        execution_plan = plan(ds, requests, priorities, trusted_key_ids)
+        lgr.debug(
+            'realizing %d files in %d computations', len(requests), len(execution_plan)
+        )
+        for node, results, error in realize_plan(
+            ds, execution_plan, trusted_key_ids, jobs or default_jobs
+        ):
+            if error is None:
+                yield from results
+                continue
+            for request in node.requests:
+                yield get_status_dict(
+                    action='make-realize',
+                    path=str(request.path),
+                    status='error',
+                    message=f'computation failed: {error}',
+                )
+
+
+def get_priorities(dataset: Dataset) -> list[str]:
+    """Get the configured priorities of compute instruction labels"""
+    setting = get_config_snapshot(dataset.pathobj).get(priority_config_key)
+    return setting.split(',') if setting else []
+
+
+def get_annex_locations(
+    dataset: Dataset,
+    paths: Iterable[str],
+) -> Generator[tuple[Path, str, list[str], bool]]:
+    """Yield path, key, compute instruction URLs, and presence of annexed files
+
+    Paths that are not annexed are skipped. Errors, e.g. about unknown paths,
+    are logged.
+    """
+    paths = list(paths)
+    for start in range(0, len(paths), whereis_chunk_size):
+        result = subprocess.run(
+            [
+                'git',
+                'annex',
+                'whereis',
+                '--json',
+                '--',
+                *paths[start : start + whereis_chunk_size],
+            ],
+            cwd=dataset.pathobj,
+            capture_output=True,
+            text=True,
+            check=False,
+        )
+        if result.returncode != 0:
+            lgr.warning('git annex whereis: %s', result.stderr.strip())
+        for line in result.stdout.splitlines():
+            record = json.loads(line)
+            urls = [
+                url
+                for location in record['whereis']
+                for url in location['urls']
+                if url.startswith(f'{url_scheme}:')
+            ]
+            present = any(location['here'] for location in record['whereis'])
+            yield dataset.pathobj / record['file'], record['key'], urls, present
+
+
+class NodeJob:
+    """State of a node while it passes through the stages of a pipeline"""
+
+    def __init__(
+        self,
+        dataset: Dataset,
+        node: Node,
+        trusted_key_ids: list[str] | None,
+    ):
+        self.dataset = dataset
+        self.node = node
+        self.trusted_key_ids = trusted_key_ids
+        self.compute_info = get_compute_info(node.instruction, node.spec)
+        self.stack = contextlib.ExitStack()
+        self.worktree: Path
+        self.results: list[dict[str, Any]] = []
+
+    def provision(self) -> None:
+        compute_info = self.compute_info
+        self.worktree = self.stack.enter_context(
+            provide_context(
+                self.dataset,
+                compute_info['root_version'],
+                compute_info['input'],
+                compute_info['output'],
+            )
+        )
+        # Ensure that the method template is present, in case it is annexed.
+        Dataset(self.worktree).get(
+            PatternPath(template_dir) / compute_info['method'],
+            result_renderer='disabled',
+        )
+
+    def execute(self) -> None:
+        compute_info = self.compute_info
+        execute(
+            self.worktree,
+            compute_info['method'],
+            compute_info['parameter'],
+            compute_info['output'],
+            compute_info['stdout'],
+            self.trusted_key_ids,
+            output_discovery=get_config_snapshot(self.dataset.pathobj).get(
+                output_discovery_config_key
+            )
+            or 'glob',
+            requested=[
+                PatternPath(request.instruction.this) for request in self.node.requests
+            ],
+        )
+
+    def collect(self) -> None:
+        self.results = [
+            collect_file(self.dataset, self.worktree, request)
+            for request in self.node.requests
+        ]
+
+    def close(self) -> None:
+        self.stack.close()
+
+
+def realize_plan(
+    dataset: Dataset,
+    execution_plan: Plan,
+    trusted_key_ids: list[str] | None,
+    jobs: int = default_jobs,
+) -> Generator[tuple[Node, list[dict[str, Any]], BaseException | None]]:
+    """Execute the nodes of a plan in a pipeline
+
+    Provisioning, execution, and collection of different nodes overlap. Up
+    to `jobs` nodes are provisioned and executed concurrently, collection is
+    serialized, because it writes to the annex of `dataset`. Yields the same
+    triples as `Plan.execute`, with the results of the `collect` stage of every
+    node, see `NodeJob`.
+    """
+    stages = [
+        Stage('provision', NodeJob.provision, jobs),
+        Stage('execute', NodeJob.execute, jobs),
+        Stage('collect', NodeJob.collect, 1),
+    ]
+    pipeline = Pipeline(stages, queue_size=jobs, finalize=NodeJob.close)
+    pipeline.start()
+    try:
+        for node, job, error in execution_plan.schedule(
+            lambda node: pipeline.submit(NodeJob(dataset, node, trusted_key_ids))
+        ):
+            yield node, ([] if job is None else job.results), error
+    finally:
+        pipeline.stop()
+
+
+def collect_file(dataset: Dataset, worktree: Path, request: Request) -> dict[str, Any]:
+    """Store the computed content of a requested file in the annex
+
+    Raises `RuntimeError`, if the content was not computed or does not match
+    the key of the file.
+    """
+    source = worktree / request.instruction.this
+    if not source.exists():
+        msg = f'computation did not create {request.instruction.this!r}'
+        raise RuntimeError(msg)
+    # `setkey` verifies the content against the key, and moves it into the
+    # annex. The key of an intermediate input might differ from the key of
+    # the file with the same name in the current version of the dataset.
+    if not call_git_success(
+        ['annex', 'setkey', request.key, str(source)],
+        cwd=dataset.pathobj,
+        capture_output=True,
+    ):
+        msg = f'computed content of {request.path} does not match its key'
+        raise RuntimeError(msg)
+    return get_status_dict(action='make-realize', path=str(request.path), status='ok')
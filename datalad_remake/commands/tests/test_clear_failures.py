@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+import pytest
+from datalad_core.config import ConfigItem
+
+from datalad_remake import allow_untrusted_execution_key
+from datalad_remake.commands.tests.create_datasets import (
+    create_simple_computation_dataset,
+)
+from datalad_remake.utils.platform import on_windows
+
+# Every execution appends a line to `{log}` and fails
+test_method = """
+parameters = ['log']
+command = ["bash", "-c", "echo run >> {log}; echo broken >&2; exit 1"]
+"""
+
+
+@pytest.mark.skipif(on_windows, reason='template uses bash')
+def test_failures_are_remembered(tmp_path, cfgman):
+    root_dataset = create_simple_computation_dataset(
+        tmp_path, 'ds1', 0, test_method, 'failing'
+    )
+    log = tmp_path / 'executions.log'
+    root_dataset.make(
+        template='failing',
+        parameter=[f'log={log}'],
+        output=['out.txt'],
+        prospective_execution=True,
+        result_renderer='disabled',
+    )
+
+    def get():
+        return root_dataset.get(
+            'out.txt', on_failure='ignore', result_renderer='disabled'
+        )
+
+    with cfgman.overrides(
+        {allow_untrusted_execution_key + root_dataset.id: ConfigItem('true')}
+    ):
+        assert {r['status'] for r in get()} == {'error'}
+        assert log.read_text() == 'run\n'
+
+        # The failure is remembered, the computation is not started again
+        results = get()
+        assert {r['status'] for r in results} == {'error'}
+        assert '(last line of stderr: broken)' in str(results)
+        assert log.read_text() == 'run\n'
+
+        results = root_dataset.make_clear_failures(
+            ['out.txt'], result_renderer='disabled'
+        )
+        assert [r['status'] for r in results] == ['ok']
+        assert {r['status'] for r in get()} == {'error'}
+        assert log.read_text() == 'run\nrun\n'
+
+    results = root_dataset.make_clear_failures(result_renderer='disabled')
+    assert [r['status'] for r in results] == ['ok']
+    results = root_dataset.make_clear_failures(result_renderer='disabled')
+    assert [r['status'] for r in results] == ['notneeded']
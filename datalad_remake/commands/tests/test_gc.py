@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import pytest
+from datalad_core.config import ConfigItem
+
+from datalad_remake import allow_untrusted_execution_key
+from datalad_remake.commands.gc_cmd import (
+    Candidate,
+    get_present_files,
+)
+from datalad_remake.commands.tests.create_datasets import (
+    create_simple_computation_dataset,
+)
+from datalad_remake.utils.costs import (
+    CostRecords,
+    get_costs_dir,
+)
+from datalad_remake.utils.platform import on_windows
+
+test_method = """
+parameters = ['name']
+command = ["bash", "-c", "echo {name} > out-{name}.txt"]
+"""
+
+
+def test_ranking():
+    stored = Candidate(Path('s'), 's', 10, None, stored=True)
+    cheap = Candidate(Path('c'), 'c', 1000, 1.0, stored=False)
+    expensive = Candidate(Path('e'), 'e', 1000, 100.0, stored=False)
+    free = Candidate(Path('f'), 'f', 10, 0.0, stored=False)
+    assert sorted(
+        [expensive, free, cheap, stored],
+        key=lambda candidate: candidate.rank,
+        reverse=True,
+    ) == [stored, free, cheap, expensive]
+
+
+@pytest.mark.skipif(on_windows, reason='template uses bash')
+def test_gc(tmp_path, cfgman):
+    root_dataset = create_simple_computation_dataset(
+        tmp_path, 'ds1', 0, test_method, 'echo'
+    )
+    for name in ('a', 'b'):
+        root_dataset.make(
+            template='echo',
+            parameter=[f'name={name}'],
+            output=[f'out-{name}.txt'],
+            prospective_execution=True,
+            result_renderer='disabled',
+        )
+
+    costs_dir = get_costs_dir(Path(root_dataset.repo.dot_git))
+    fingerprints = {}
+    with cfgman.overrides(
+        {allow_untrusted_execution_key + root_dataset.id: ConfigItem('true')}
+    ):
+        for name in ('a', 'b'):
+            root_dataset.get(f'out-{name}.txt', result_renderer='disabled')
+            (fingerprints[name],) = {
+                path.stem for path in costs_dir.glob('*.json')
+            } - set(fingerprints.values())
+
+    # Make the computation of `out-b.txt` cheaper than that of `out-a.txt`
+    costs = CostRecords(costs_dir)
+    assert costs.get(fingerprints['a']) is not None
+    costs.record(fingerprints['a'], 100.0)
+    costs.record(fingerprints['b'], 0.1)
+
+    present = get_present_files(root_dataset, [root_dataset.path])
+    budget = sum(size for _, _, size in present) - 1
+
+    results = root_dataset.make_gc(
+        budget=str(budget), dry_run=True, result_renderer='disabled'
+    )
+    assert [(r['status'], Path(r['path']).name) for r in results] == [
+        ('ok', 'out-b.txt')
+    ]
+    assert 'would drop' in results[0]['message']
+    assert (root_dataset.pathobj / 'out-b.txt').exists()
+
+    results = root_dataset.make_gc(budget=str(budget), result_renderer='disabled')
+    assert [(r['status'], Path(r['path']).name) for r in results] == [
+        ('ok', 'out-b.txt')
+    ]
+    assert not (root_dataset.pathobj / 'out-b.txt').exists()
+    assert (root_dataset.pathobj / 'out-a.txt').exists()
+
+    results = root_dataset.make_gc(budget=str(budget), result_renderer='disabled')
+    assert [r['status'] for r in results] == ['notneeded']
+
+    # Nothing more can be dropped, the inputs are not computed
+    results = root_dataset.make_gc(
+        budget='0', on_failure='ignore', result_renderer='disabled'
+    )
+    assert [r['status'] for r in results] == ['ok', 'impossible']
@@ -4,6 +4,7 @@ from pathlib import Path
 from hypothesis import given
 from hypothesis.strategies import lists, text
 
+from datalad_remake.commands.make_cmd import parse_parameters
 from datalad_remake.utils.read_list import read_list
 
 
@@ -43,3 +44,11 @@ def _write_list(
     list_file = tmp_path / 'list.txt'
     list_file.write_text('\n'.join(word_list))
     return list_file
+
+
+def test_parse_parameters():
+    assert parse_parameters(['a=1', 'files=x', 'b=c=d', 'files=y', 'files=z']) == {
+        'a': '1',
+        'b': 'c=d',
+        'files': ['x', 'y', 'z'],
+    }
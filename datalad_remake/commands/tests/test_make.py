@@ -1,6 +1,8 @@
+from pathlib import Path
 from unittest.mock import MagicMock
 from urllib.parse import urlparse
 
+import pytest
 from datalad_core.config import ConfigItem
 from datalad_next.datasets import Dataset
 
@@ -8,6 +10,7 @@ import datalad_remake.commands.make_cmd
 from datalad_remake import (
     PatternPath,
     allow_untrusted_execution_key,
+    output_discovery_config_key,
 )
 from datalad_remake.commands.make_cmd import get_url
 from datalad_remake.commands.tests.create_datasets import (
@@ -92,3 +95,122 @@ def test_label_url(monkeypatch):
     )
     parts = urlparse(url).query.split('&')
     assert 'label=label1' in parts
+
+
+def test_output_discovery_by_changes(tmp_path):
+    root_dataset = create_simple_computation_dataset(tmp_path, 'ds1', 0, test_method)
+    root_dataset.config.set(output_discovery_config_key, 'changes', scope='local')
+    results = root_dataset.make(
+        template='test_method',
+        parameter=['name=Robert', 'file=b.txt'],
+        output=['*.txt'],
+        result_renderer='disabled',
+        allow_untrusted_execution=True,
+    )
+    # Only the file that was written by the computation is an output, although
+    # other files in the dataset match the output pattern.
+    assert [Path(r['path']).name for r in results] == ['b.txt']
+    assert (root_dataset.pathobj / 'b.txt').read_text() == 'Hello Robert\n'
+
+
+@pytest.mark.skipif(on_windows, reason='template uses bash')
+def test_list_parameters(tmp_path, cfgman):
+    list_method = """
+    parameters = ['output']
+    list_parameters = ['files']
+    command = ["bash", "-c", "cat \\"$@\\" > {output}", "bash", "{files}"]
+    """
+    root_dataset = create_simple_computation_dataset(
+        tmp_path, 'ds1', 0, list_method, 'concatenate'
+    )
+    root_dataset.make(
+        template='concatenate',
+        parameter=['files=b.txt', 'files=a.txt', 'output=c.txt'],
+        input=['a.txt', 'b.txt'],
+        output=['c.txt'],
+        result_renderer='disabled',
+        allow_untrusted_execution=True,
+    )
+    assert (root_dataset.pathobj / 'c.txt').read_text() == 'b\na\n'
+
+    # Recompute the output with the list parameters from the specification
+    root_dataset.drop('c.txt', result_renderer='disabled')
+    with cfgman.overrides(
+        {
+            allow_untrusted_execution_key + root_dataset.id: ConfigItem('true'),
+        }
+    ):
+        root_dataset.get('c.txt', result_renderer='disabled')
+    assert (root_dataset.pathobj / 'c.txt').read_text() == 'b\na\n'
+
+
+@pytest.mark.skipif(on_windows, reason='template uses bash')
+def test_in_place_execution(tmp_path, monkeypatch):
+    root_dataset = create_simple_computation_dataset(tmp_path, 'ds1', 0, test_method)
+
+    def fail(*_, **__):
+        msg = 'a worktree was provisioned'
+        raise AssertionError(msg)
+
+    monkeypatch.setattr(datalad_remake.commands.make_cmd, 'provide_context', fail)
+    results = root_dataset.make(
+        template='test_method',
+        parameter=['name=Robert', 'file=in-place.txt'],
+        output=['in-place.txt'],
+        in_place=True,
+        result_renderer='disabled',
+        allow_untrusted_execution=True,
+    )
+    assert [Path(r['path']).name for r in results] == ['in-place.txt']
+    assert (root_dataset.pathobj / 'in-place.txt').read_text() == 'Hello Robert\n'
+    assert root_dataset.repo.call_git(['status', '--porcelain']) == ''
+
+
+@pytest.mark.skipif(on_windows, reason='template uses bash')
+def test_in_place_existing_outputs(tmp_path):
+    root_dataset = create_simple_computation_dataset(tmp_path, 'ds1', 2, test_method)
+    root_dataset.drop(
+        'ds1_subds0/ds1_subds1',
+        what='all',
+        reckless='kill',
+        recursive=True,
+        result_renderer='disabled',
+    )
+
+    # Existing annexed outputs are regenerated, also in subdatasets that are
+    # not installed.
+    for file in ('a.txt', 'ds1_subds0/ds1_subds1/a1.txt'):
+        results = root_dataset.make(
+            template='test_method',
+            parameter=['name=Robert', f'file={file}'],
+            output=[file],
+            in_place=True,
+            result_renderer='disabled',
+            allow_untrusted_execution=True,
+        )
+        assert [r['path'] for r in results] == [str(root_dataset.pathobj / file)]
+        assert (root_dataset.pathobj / file).read_text() == 'Hello Robert\n'
+    assert root_dataset.repo.call_git(['status', '--porcelain']) == ''
+
+
+@pytest.mark.skipif(on_windows, reason='template uses bash')
+def test_in_place_rollback(tmp_path):
+    stray_method = """
+    parameters = []
+    command = ["bash", "-c", "echo out > out.txt; echo stray > stray.txt; rm a.txt"]
+    """
+    root_dataset = create_simple_computation_dataset(
+        tmp_path, 'ds1', 0, stray_method, 'stray'
+    )
+    with pytest.raises(RuntimeError, match='a.txt, stray.txt'):
+        root_dataset.make(
+            template='stray',
+            output=['out.txt'],
+            in_place=True,
+            result_renderer='disabled',
+            allow_untrusted_execution=True,
+        )
+    # All changes were rolled back
+    assert root_dataset.repo.call_git(['status', '--porcelain']) == ''
+    assert not (root_dataset.pathobj / 'out.txt').exists()
+    assert (root_dataset.pathobj / 'a.txt').read_text() == 'a\n'
@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+import os
+import subprocess
+
+import pytest
+from datalad_core.config import ConfigItem
+
+from datalad_remake import (
+    allow_untrusted_execution_key,
+    queue_dir_config_key,
+)
+from datalad_remake.commands.tests.create_datasets import (
+    create_simple_computation_dataset,
+)
+from datalad_remake.utils.platform import on_windows
+
+# The output records, whether the computation was executed by a worker
+test_method = """
+parameters = ['name']
+command = ["bash", "-c", "echo ${REMAKE_TEST_EXECUTOR:-remote} {name} > out-{name}.txt"]
+"""
+
+
+@pytest.mark.skipif(on_windows, reason='template uses bash')
+def test_queued_computations(tmp_path, cfgman):
+    root_dataset = create_simple_computation_dataset(
+        tmp_path, 'ds1', 0, test_method, 'executor'
+    )
+    names = ['a', 'b']
+    for name in names:
+        root_dataset.make(
+            template='executor',
+            parameter=[f'name={name}'],
+            output=[f'out-{name}.txt'],
+            prospective_execution=True,
+            result_renderer='disabled',
+        )
+
+    queue_dir = tmp_path / 'queue'
+    # Overrides are nested, because restoring more than one override at once
+    # leaves all but the first in the environment, which would queue the
+    # computations of later tests.
+    untrusted = {allow_untrusted_execution_key + root_dataset.id: ConfigItem('true')}
+    queue = {queue_dir_config_key: ConfigItem(str(queue_dir))}
+    with cfgman.overrides(untrusted), cfgman.overrides(queue):
+        workers = [
+            subprocess.Popen(
+                ['datalad', 'make-worker', '--idle-timeout', '120'],
+                env={**os.environ, 'REMAKE_TEST_EXECUTOR': 'worker'},
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+            )
+            for _ in range(2)
+        ]
+        try:
+            root_dataset.get([f'out-{name}.txt' for name in names])
+        finally:
+            for worker in workers:
+                worker.terminate()
+                worker.wait()
+
+    for name in names:
+        assert (
+            root_dataset.pathobj / f'out-{name}.txt'
+        ).read_text() == f'worker {name}\n'
+    # Results of collected jobs are removed from the queue
+    for directory in ('pending', 'claimed', 'done', 'results'):
+        assert not any((queue_dir / directory).glob('*'))
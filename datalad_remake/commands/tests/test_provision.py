@@ -1,16 +1,24 @@
 from __future__ import annotations
 
+import time
 from pathlib import Path
 from typing import TYPE_CHECKING
 
+import pytest
 from datalad.core.distributed.clone import Clone
+from datalad.runner.exception import CommandError
 from datalad_next.datasets import Dataset
 from datalad_next.runners import call_git_lines
 
 from datalad_remake.utils.chdir import chdir
+from datalad_remake.utils.scratch import lock_name
 
-from ... import PatternPath
+from ... import (
+    PatternPath,
+    scratch_dirs_config_key,
+)
 from ..make_cmd import provide_context
+from ..provision_cmd import remove
 from .create_datasets import create_ds_hierarchy
 
 if TYPE_CHECKING:
@@ -32,6 +40,22 @@ all_paths = [
 b_paths = [path.format(file='b') for path in file_path_templates]
 
 
+def wait_for_removal(dataset: Dataset, worktree_dir: Path) -> None:
+    """Wait until a background reaper removed `worktree_dir` and its branch"""
+    deadline = time.monotonic() + 60
+    while worktree_dir.exists() and time.monotonic() < deadline:
+        time.sleep(0.1)
+    assert not worktree_dir.exists()
+    while time.monotonic() < deadline:
+        branches = call_git_lines(
+            ['branch', '--list', worktree_dir.name], cwd=dataset.pathobj
+        )
+        if not branches:
+            return
+        time.sleep(0.1)
+    pytest.fail(f'branch {worktree_dir.name} was not removed')
+
+
 def test_worktree_basic(tmp_path):
     dataset = create_ds_hierarchy(tmp_path, 'ds1', 3)[0][2]
     inputs = [
@@ -68,6 +92,33 @@ def test_worktree_basic(tmp_path):
     )
 
 
+def test_background_removal(tmp_path):
+    dataset = create_ds_hierarchy(tmp_path, 'ds1', 1)[0][2]
+    worktree_dir = tmp_path / 'ds1_worktree'
+    dataset.provision(
+        worktree_dir=worktree_dir,
+        input=['a.txt', 'ds1_subds0/a0.txt'],
+        result_renderer='disabled',
+    )
+    remove(dataset, Dataset(worktree_dir), background=True)
+
+    # The reaper drops the worktree and removes its branch
+    wait_for_removal(dataset, worktree_dir)
+    worktrees = call_git_lines(['worktree', 'list'], cwd=dataset.pathobj)
+    assert [Path(line.split()[0]) for line in worktrees] == [dataset.pathobj]
+
+
+def test_failed_provision_releases_lease(tmp_path):
+    dataset = create_ds_hierarchy(tmp_path, 'ds1', 0)[0][2]
+    scratch = tmp_path / 'scratch'
+    dataset.config.set(scratch_dirs_config_key, str(scratch), scope='local')
+    with pytest.raises(CommandError, match='does-not-exist'):
+        dataset.provision(
+            branch='does-not-exist', input=['a.txt'], result_renderer='disabled'
+        )
+    assert list(scratch.iterdir()) == [scratch / lock_name]
+
+
 def test_worktree_globbing(tmp_path):
     dataset = create_ds_hierarchy(tmp_path, 'ds1', 3)[0][2]
     result = dataset.provision(
@@ -127,7 +178,8 @@ def test_provision_context(tmp_path):
     ) as worktree:
         files = set(get_file_list(worktree))
         assert files
-    assert not worktree.exists()
+    # Worktrees are removed in the background by default
+    wait_for_removal(dataset, worktree)
 
 
 def test_branch_deletion_after_provision(tmp_path):
@@ -136,7 +188,7 @@ def test_branch_deletion_after_provision(tmp_path):
         dataset=dataset, branch=None, input_patterns=[PatternPath('a.txt')]
     ) as worktree:
         assert worktree.exists()
-    assert not worktree.exists()
+    wait_for_removal(dataset, worktree)
     with chdir(dataset.path):
         branches = [line.strip() for line in call_git_lines(['branch'])]
     assert worktree.name not in branches
@@ -0,0 +1,238 @@
+from __future__ import annotations
+
+import pytest
+from datalad_core.config import ConfigItem
+
+from datalad_remake import (
+    PatternPath,
+    allow_untrusted_execution_key,
+)
+from datalad_remake.commands.tests.create_datasets import (
+    create_simple_computation_dataset,
+)
+from datalad_remake.utils.instructions import select_instruction
+from datalad_remake.utils.planner import (
+    Request,
+    get_key_locations,
+    plan,
+)
+from datalad_remake.utils.platform import on_windows
+from datalad_remake.utils.trees import get_annexed_keys
+
+# Every execution appends a line to `{log}`, which is outside of the dataset
+test_method = """
+parameters = ['name', 'log']
+command = [
+    "bash",
+    "-c",
+    "echo {name} >> {log}; echo x {name} > x-{name}.txt; echo y {name} > y-{name}.txt",
+]
+"""
+
+
+@pytest.mark.skipif(on_windows, reason='template uses bash')
+def test_realize_groups(tmp_path, cfgman):
+    root_dataset = create_simple_computation_dataset(tmp_path, 'ds1', 0, test_method)
+    log = tmp_path / 'executions.log'
+    for name in ('a', 'b'):
+        root_dataset.make(
+            template='test_method',
+            parameter=[f'name={name}', f'log={log}'],
+            output=[f'x-{name}.txt', f'y-{name}.txt'],
+            prospective_execution=True,
+            result_renderer='disabled',
+        )
+
+    files = ['x-a.txt', 'y-a.txt', 'x-b.txt', 'y-b.txt']
+    with cfgman.overrides(
+        {
+            allow_untrusted_execution_key + root_dataset.id: ConfigItem('true'),
+        }
+    ):
+        results = root_dataset.make_realize(files, jobs=2, result_renderer='disabled')
+    assert sorted((r['path'], r['status']) for r in results) == sorted(
+        (str(root_dataset.pathobj / file), 'ok') for file in files
+    )
+    for file in files:
+        prefix, name = file[:-4].split('-')
+        assert (root_dataset.pathobj / file).read_text() == f'{prefix} {name}\n'
+
+    # Every specification was executed once
+    assert sorted(log.read_text().split()) == ['a', 'b']
+
+    # Present files are not computed again
+    results = root_dataset.make_realize(files, result_renderer='disabled')
+    assert {r['status'] for r in results} == {'notneeded'}
+
+
+def test_equivalent_commits_share_node(tmp_path):
+    root_dataset = create_simple_computation_dataset(tmp_path, 'ds1', 0, test_method)
+    log = tmp_path / 'executions.log'
+    root_dataset.make(
+        template='test_method',
+        parameter=['name=a', f'log={log}'],
+        input=['a.txt'],
+        output=['x-a.txt', 'y-a.txt'],
+        prospective_execution=True,
+        result_renderer='disabled',
+    )
+    root_dataset.save(result_renderer='disabled')
+    keys = get_annexed_keys(root_dataset.pathobj, root_dataset.repo.get_hexsha())
+    requests = []
+    for name in ('x-a.txt', 'y-a.txt'):
+        key = keys[PatternPath(name)]
+        location = get_key_locations(root_dataset.pathobj, [key])[key]
+        requests.append(
+            Request(
+                root_dataset.pathobj / name,
+                key,
+                select_instruction(location.urls, []),
+            )
+        )
+
+    # A commit that does not modify the inputs does not change the
+    # computation
+    (root_dataset.pathobj / 'unrelated.txt').write_text('unrelated\n')
+    root_dataset.save(result_renderer='disabled')
+    requests[1] = requests[1]._replace(
+        instruction=requests[1].instruction._replace(
+            root_version=root_dataset.repo.get_hexsha()
+        )
+    )
+    execution_plan = plan(root_dataset, requests, [], None)
+    assert len(execution_plan) == 1
+    (node,) = execution_plan.nodes.values()
+    assert sorted(request.path.name for request in node.requests) == [
+        'x-a.txt',
+        'y-a.txt',
+    ]
+
+    # A commit that modifies an input does
+    root_dataset.unlock('a.txt', result_renderer='disabled')
+    (root_dataset.pathobj / 'a.txt').write_text('changed\n')
+    root_dataset.save(result_renderer='disabled')
+    requests[1] = requests[1]._replace(
+        instruction=requests[1].instruction._replace(
+            root_version=root_dataset.repo.get_hexsha()
+        )
+    )
+    assert len(plan(root_dataset, requests, [], None)) == 2
+
+
+chain_method = """
+parameters = ['source', 'target', 'log']
+command = ["bash", "-c", "echo {target} >> {log}; (cat {source}; echo {target}) > {target}"]
+"""
+
+
+def _create_chain(tmp_path):
+    root_dataset = create_simple_computation_dataset(
+        tmp_path, 'ds1', 0, chain_method, 'chain'
+    )
+    log = tmp_path / 'executions.log'
+    for source, target in (('a.txt', 'c1.txt'), ('c1.txt', 'c2.txt')):
+        root_dataset.make(
+            template='chain',
+            parameter=[f'source={source}', f'target={target}', f'log={log}'],
+            input=[source],
+            output=[target],
+            prospective_execution=True,
+            result_renderer='disabled',
+        )
+    return root_dataset, log
+
+
+@pytest.mark.skipif(on_windows, reason='template uses bash')
+def test_realize_chain(tmp_path, cfgman):
+    root_dataset, log = _create_chain(tmp_path)
+    with cfgman.overrides(
+        {
+            allow_untrusted_execution_key + root_dataset.id: ConfigItem('true'),
+        }
+    ):
+        results = root_dataset.make_realize(['c2.txt'], result_renderer='disabled')
+    # The intermediate result is realized as well
+    assert [(r['path'], r['status']) for r in results] == [
+        (str(root_dataset.pathobj / 'c1.txt'), 'ok'),
+        (str(root_dataset.pathobj / 'c2.txt'), 'ok'),
+    ]
+    assert log.read_text().split() == ['c1.txt', 'c2.txt']
+    assert (root_dataset.pathobj / 'c2.txt').read_text() == 'a\nc1.txt\nc2.txt\n'
+
+
+@pytest.mark.skipif(on_windows, reason='template uses bash')
+def test_get_chain(tmp_path, cfgman):
+    root_dataset, log = _create_chain(tmp_path)
+    with cfgman.overrides(
+        {
+            allow_untrusted_execution_key + root_dataset.id: ConfigItem('true'),
+        }
+    ):
+        root_dataset.get('c2.txt', result_renderer='disabled')
+    # The special remote computed the missing input before provisioning
+    assert log.read_text().split() == ['c1.txt', 'c2.txt']
+    assert (root_dataset.pathobj / 'c1.txt').read_text() == 'a\nc1.txt\n'
+    assert (root_dataset.pathobj / 'c2.txt').read_text() == 'a\nc1.txt\nc2.txt\n'
+
+
+@pytest.mark.skipif(on_windows, reason='template uses bash')
+def test_get_chain_stored_input(tmp_path, cfgman):
+    root_dataset, log = _create_chain(tmp_path)
+    (tmp_path / 'store').mkdir()
+    root_dataset.repo.call_annex(
+        [
+            'initremote',
+            'store',
+            'type=directory',
+            f'directory={tmp_path / "store"}',
+            'encryption=none',
+        ]
+    )
+    with cfgman.overrides(
+        {
+            allow_untrusted_execution_key + root_dataset.id: ConfigItem('true'),
+        }
+    ):
+        root_dataset.get('c1.txt', result_renderer='disabled')
+        root_dataset.repo.call_annex(['copy', '--to', 'store', 'c1.txt'])
+        root_dataset.drop('c1.txt', result_renderer='disabled')
+        root_dataset.get('c2.txt', result_renderer='disabled')
+    # The missing input was retrieved from the other remote, not computed
+    assert log.read_text().split() == ['c1.txt', 'c2.txt']
+    assert (root_dataset.pathobj / 'c2.txt').read_text() == 'a\nc1.txt\nc2.txt\n'
+
+
+map_method = """
+parameters = ['log']
+list_parameters = ['names']
+command = ["bash", "-c", "echo {names} >> {log}; echo {names} > out-{names}.txt"]
+
+[map]
+parameter = 'names'
+output = 'out-{item}.txt'
+"""
+
+
+@pytest.mark.skipif(on_windows, reason='template uses bash')
+def test_get_mapped_output(tmp_path, cfgman):
+    root_dataset = create_simple_computation_dataset(
+        tmp_path, 'ds1', 0, map_method, 'map'
+    )
+    log = tmp_path / 'executions.log'
+    names = ['a', 'b', 'c']
+    root_dataset.make(
+        template='map',
+        parameter=[f'log={log}', *(f'names={name}' for name in names)],
+        output=[f'out-{name}.txt' for name in names],
+        prospective_execution=True,
+        result_renderer='disabled',
+    )
+    with cfgman.overrides(
+        {
+            allow_untrusted_execution_key + root_dataset.id: ConfigItem('true'),
+        }
+    ):
+        root_dataset.get('out-b.txt', result_renderer='disabled')
+    # Only the chunk that computes the requested file was executed
+    assert log.read_text().split() == ['b']
+    assert (root_dataset.pathobj / 'out-b.txt').read_text() == 'b\n'
@@ -0,0 +1,225 @@
+"""DataLad make-worker command
+
+A worker executes computations from a file-system work queue, see
+`datalad_remake.utils.work_queue`. Workers on several hosts can serve the same
+queue, if the queue directory and the datasets are on shared storage.
+"""
+
+from __future__ import annotations
+
+import logging
+import shutil
+import time
+from pathlib import Path
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    ClassVar,
+)
+
+from datalad_next.commands import (
+    EnsureCommandParameterization,
+    Parameter,
+    ValidatedInterface,
+    build_doc,
+    eval_results,
+    get_status_dict,
+)
+from datalad_next.constraints import (
+    EnsureFloat,
+    EnsureInt,
+    EnsurePath,
+)
+from datalad_next.datasets import Dataset
+
+from datalad_remake import (
+    PatternPath,
+    output_discovery_config_key,
+    queue_dir_config_key,
+    template_dir,
+)
+from datalad_remake.commands.make_cmd import (
+    execute,
+    provide_context,
+)
+from datalad_remake.utils.config_snapshot import get_config_snapshot
+from datalad_remake.utils.getconfig import (
+    get_allow_untrusted_execution,
+    get_config,
+    get_trusted_keys,
+)
+from datalad_remake.utils.glob import resolve_patterns
+from datalad_remake.utils.instructions import (
+    Instruction,
+    get_compute_info,
+    read_specification,
+)
+from datalad_remake.utils.work_queue import (
+    WorkQueue,
+    poll_interval,
+)
+
+if TYPE_CHECKING:
+    from collections.abc import Generator
+
+lgr = logging.getLogger('datalad.remake.worker_cmd')
+
+
+# decoration auto-generates standard help
+@build_doc
+# all commands must be derived from Interface
+class MakeWorker(ValidatedInterface):
+    # first docstring line is used a short description in the cmdline help
+    # the rest is put in the verbose help and manpage
+    """Execute computations from a work queue
+
+    The worker claims computations from the queue directory, provisions and
+    executes them, and publishes their outputs in the queue directory, where
+    the special remote that queued the computation collects them. The
+    datasets of the computations must be accessible at the same paths as on
+    the host that queued them.
+
+    Specifications and method templates are verified with the keys in
+    `datalad.make.trusted-keys` of the worker, unless untrusted execution is
+    allowed for the dataset in the configuration of the worker.
+    """
+
+    _validator_ = EnsureCommandParameterization(
+        {
+            'queue': EnsurePath(),
+            'max_jobs': EnsureInt(),
+            'idle_timeout': EnsureFloat(),
+        }
+    )
+
+    # parameters of the command, must be exhaustive
+    _params_: ClassVar[dict[str, Parameter]] = {
+        'queue': Parameter(
+            args=('-q', '--queue'),
+            doc=f'Queue directory, defaults to the value of {queue_dir_config_key}.',
+        ),
+        'max_jobs': Parameter(
+            args=('--max-jobs',),
+            doc='Exit after executing this number of jobs.',
+        ),
+        'idle_timeout': Parameter(
+            args=('--idle-timeout',),
+            doc='Exit, if no job was queued for this number of seconds.',
+        ),
+    }
+
+    @staticmethod
+    @eval_results
+    def __call__(
+        queue: Path | None = None,
+        *,
+        max_jobs: int | None = None,
+        idle_timeout: float | None = None,
+    ) -> Generator:
+        if queue is None:
+            directory = get_config(queue_dir_config_key)
+            if not directory:
+                yield get_status_dict(
+                    action='make-worker',
+                    status='error',
+                    message=f'no queue given and {queue_dir_config_key} is not set',
+                )
+                return
+            queue = Path(directory)
+
+        work_queue = WorkQueue(queue)
+        executed = 0
+        idle_since = time.monotonic()
+        while max_jobs is None or executed < max_jobs:
+            claimed = work_queue.claim()
+            if claimed is None:
+                if (
+                    idle_timeout is not None
+                    and time.monotonic() - idle_since > idle_timeout
+                ):
+                    return
+                time.sleep(poll_interval)
+                continue
+
+            job_id, job = claimed
+            with work_queue.leased(job_id):
+                status = run_job(work_queue, job_id, job)
+            work_queue.finish(job_id, status)
+            executed += 1
+            idle_since = time.monotonic()
+            yield get_status_dict(
+                action='make-worker',
+                path=job['dataset'],
+                status=status['status'],
+                message=status.get('message', f'executed job {job_id}'),
+            )
+
+
+def run_job(work_queue: WorkQueue, job_id: str, job: dict[str, Any]) -> dict[str, Any]:
+    """Execute a job and publish its outputs, return the status of the job
+
+    The status of a successful job contains the duration of the computation
+    in seconds, which the remote records as cost of the outputs.
+    """
+    start = time.monotonic()
+    try:
+        outputs = _run_job(work_queue, job_id, job)
+    except Exception as e:  # noqa: BLE001
+        lgr.debug('job %s failed', job_id, exc_info=True)
+        return {'status': 'error', 'message': f'job {job_id} failed: {e}'}
+    return {
+        'status': 'ok',
+        'outputs': sorted(map(str, outputs)),
+        'seconds': time.monotonic() - start,
+    }
+
+
+def _run_job(
+    work_queue: WorkQueue,
+    job_id: str,
+    job: dict[str, Any],
+) -> set[PatternPath]:
+    dataset = Dataset(job['dataset'])
+    trusted_key_ids = (
+        None if get_allow_untrusted_execution(dataset.id) else get_trusted_keys()
+    )
+    instruction = Instruction(**job['instruction'])
+    spec = read_specification(dataset, instruction.spec_name, trusted_key_ids)
+    compute_info = get_compute_info(instruction, spec)
+    with provide_context(
+        dataset,
+        compute_info['root_version'],
+        compute_info['input'],
+        compute_info['output'],
+    ) as worktree:
+        # Ensure that the method template is present, in case it is annexed.
+        Dataset(worktree).get(
+            PatternPath(template_dir) / compute_info['method'],
+            result_renderer='disabled',
+        )
+        outputs = execute(
+            worktree,
+            compute_info['method'],
+            compute_info['parameter'],
+            compute_info['output'],
+            compute_info['stdout'],
+            trusted_key_ids,
+            output_discovery=get_config_snapshot(dataset.pathobj).get(
+                output_discovery_config_key
+            )
+            or 'glob',
+            requested=[compute_info['this']],
+        )
+        if outputs is None:
+            outputs = resolve_patterns(
+                root_dir=worktree, patterns=compute_info['output']
+            )
+
+        # Publish the outputs and the captured stdout
+        results_dir = work_queue.get_results_dir(job_id)
+        stdout = compute_info['stdout']
+        for path in outputs | ({stdout} if stdout is not None else set()):
+            destination = results_dir / path
+            destination.parent.mkdir(parents=True, exist_ok=True)
+            shutil.copyfile(worktree / path, destination)
+    return outputs
@@ -0,0 +1,268 @@
+"""Host-wide admission control for computations
+
+Computations of all `datalad make` and special remote processes on a host
+are admitted against a CPU budget and a memory budget. The budgets are read
+from the configuration variables `datalad.make.cpu-budget` and
+`datalad.make.memory-budget` in the global or system git configuration, or
+the environment. Admission control is only active if at least one budget is
+configured.
+
+The state of the admission controller is kept in a JSON file in the
+admission directory, which is guarded by an `fcntl`-lock. Every computation
+draws a ticket. Tickets are admitted in order, i.e. a computation only starts
+if all earlier computations were admitted, and if its CPUs and memory fit
+into the remaining budget. A computation is always admitted, if no other
+computation is running, even if it exceeds the budget. Entries of processes
+that do not exist anymore are removed.
+
+The CPUs and memory of a computation are taken from the resources that are
+declared in its template. If no memory is declared, the peak memory usage of
+earlier runs of the same template is used.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import json
+import logging
+import os
+import socket
+import tempfile
+import time
+from getpass import getuser
+from pathlib import Path
+from typing import (
+    TYPE_CHECKING,
+    Any,
+)
+
+from datalad_remake import (
+    admission_dir_config_key,
+    cpu_budget_config_key,
+    memory_budget_config_key,
+)
+from datalad_remake.utils.getconfig import get_config
+from datalad_remake.utils.platform import (
+    is_process_alive,
+    make_private_dir,
+)
+from datalad_remake.utils.size import parse_size
+
+if TYPE_CHECKING:
+    from collections.abc import (
+        Callable,
+        Generator,
+    )
+
+    from datalad_remake.utils.resources import Resources
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None  # type: ignore[assignment]
+
+lgr = logging.getLogger('datalad.remake.utils.admission')
+
+
+# Seconds between two admission attempts of a queued computation
+poll_interval = 0.5
+
+
+class AdmissionController:
+    """Admit computations against host-wide CPU and memory budgets"""
+
+    def __init__(
+        self,
+        directory: Path,
+        cpu_budget: int | None = None,
+        memory_budget: int | None = None,
+    ):
+        self.directory = directory
+        self.cpu_budget = cpu_budget
+        self.memory_budget = memory_budget
+        self.lock_file = directory / 'lock'
+        self.state_file = directory / 'state.json'
+        self.usage_dir = directory / 'usage'
+
+    @classmethod
+    def from_config(cls) -> AdmissionController | None:
+        """Create a controller from the configuration
+
+        Returns `None`, if no budget is configured, or if file locking is not
+        supported on this platform.
+        """
+        cpu_budget = get_config(cpu_budget_config_key)
+        memory_budget = get_config(memory_budget_config_key)
+        if cpu_budget is None and memory_budget is None:
+            return None
+        if fcntl is None:
+            lgr.warning('admission control is not supported on this platform')
+            return None
+        configured_directory = get_config(admission_dir_config_key)
+        if configured_directory:
+            directory = Path(configured_directory)
+        else:
+            # A configured directory might be shared between users on
+            # purpose, the default directory is private.
+            directory = get_default_admission_dir()
+            if not make_private_dir(directory):
+                lgr.warning(
+                    'admission directory %s belongs to another user, '
+                    'admission control is disabled',
+                    directory,
+                )
+                return None
+        return cls(
+            directory,
+            None if cpu_budget is None else int(cpu_budget),
+            None if memory_budget is None else parse_size(memory_budget),
+        )
+
+    @contextlib.contextmanager
+    def admitted(
+        self,
+        cpus: int,
+        memory: int,
+        notify: Callable[[str], Any] | None = None,
+    ) -> Generator[None, None, None]:
+        """Wait until the computation is admitted, release it on exit
+
+        `notify` is called with a message, if the computation is queued.
+        """
+        ticket = self._enqueue(cpus, memory)
+        try:
+            self._wait(ticket, notify)
+            yield
+        finally:
+            self._remove(ticket)
+
+    def estimate_memory(self, template_id: str, resources: Resources) -> int:
+        """Get the declared or the historical memory usage of a template"""
+        if resources.memory is not None:
+            return resources.memory
+        usage = self._read_json(self.usage_dir / f'{template_id}.json')
+        return int(usage.get('memory', 0))
+
+    def record_usage(self, template_id: str, memory: int | None) -> None:
+        """Record the peak memory usage of a run of a template"""
+        if memory is None:
+            return
+        usage_file = self.usage_dir / f'{template_id}.json'
+        with self._locked():
+            usage = self._read_json(usage_file)
+            usage['memory'] = max(memory, int(usage.get('memory', 0)))
+            self._write_json(usage_file, usage)
+
+    def _enqueue(self, cpus: int, memory: int) -> int:
+        with self._locked():
+            state = self._read_state()
+            ticket = state['next_ticket']
+            state['next_ticket'] += 1
+            state['jobs'][str(ticket)] = {
+                'host': socket.gethostname(),
+                'pid': os.getpid(),
+                'cpus': cpus,
+                'memory': memory,
+                'running': False,
+            }
+            self._write_json(self.state_file, state)
+        return ticket
+
+    def _wait(self, ticket: int, notify: Callable[[str], Any] | None) -> None:
+        reported_position = None
+        while True:
+            with self._locked():
+                state = self._read_state()
+                position = self._admit(state, ticket)
+                self._write_json(self.state_file, state)
+            if position == 0:
+                return
+            if position != reported_position:
+                message = (
+                    f'queued for admission, position {position}, waiting for '
+                    'CPU and memory budget'
+                )
+                lgr.info(message)
+                if notify is not None:
+                    notify(message)
+                reported_position = position
+            time.sleep(poll_interval)
+
+    def _admit(self, state: dict[str, Any], ticket: int) -> int:
+        """Admit `ticket`, if possible, and return its queue position
+
+        A position of `0` means that the ticket is admitted.
+        """
+        jobs = state['jobs']
+        for key in [key for key, job in jobs.items() if not _is_alive(job)]:
+            del jobs[key]
+
+        job = jobs[str(ticket)]
+        if job['running']:
+            return 0
+
+        waiting = sorted(int(key) for key, job in jobs.items() if not job['running'])
+        position = waiting.index(ticket) + 1
+        if position > 1:
+            return position
+
+        running = [job for job in jobs.values() if job['running']]
+        used_cpus = sum(job['cpus'] for job in running)
+        used_memory = sum(job['memory'] for job in running)
+        fits = (
+            self.cpu_budget is None or used_cpus + job['cpus'] <= self.cpu_budget
+        ) and (
+            self.memory_budget is None
+            or used_memory + job['memory'] <= self.memory_budget
+        )
+        if fits or not running:
+            job['running'] = True
+            return 0
+        return position
+
+    def _remove(self, ticket: int) -> None:
+        with self._locked():
+            state = self._read_state()
+            state['jobs'].pop(str(ticket), None)
+            self._write_json(self.state_file, state)
+
+    @contextlib.contextmanager
+    def _locked(self) -> Generator[None, None, None]:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with self.lock_file.open('a') as lock:
+            fcntl.flock(lock.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock.fileno(), fcntl.LOCK_UN)
+
+    def _read_state(self) -> dict[str, Any]:
+        state = self._read_json(self.state_file)
+        state.setdefault('next_ticket', 1)
+        state.setdefault('jobs', {})
+        return state
+
+    @staticmethod
+    def _read_json(path: Path) -> dict[str, Any]:
+        try:
+            return json.loads(path.read_text())
+        except (OSError, ValueError):
+            return {}
+
+    @staticmethod
+    def _write_json(path: Path, content: dict[str, Any]) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temporary_path = path.with_name(path.name + '.tmp')
+        temporary_path.write_text(json.dumps(content))
+        temporary_path.replace(path)
+
+
+def get_default_admission_dir() -> Path:
+    """Get the default admission directory, which is private to the user"""
+    return Path(tempfile.gettempdir()) / f'datalad-remake-admission-{getuser()}'
+
+
+def _is_alive(job: dict[str, Any]) -> bool:
+    # Processes of other hosts, e.g. on a shared file system, cannot be
+    # checked.
+    return job['host'] != socket.gethostname() or is_process_alive(job['pid'])
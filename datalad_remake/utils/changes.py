@@ -0,0 +1,134 @@
+"""Discover the files that a computation created or modified in a worktree
+
+Before the computation, the state of all paths that git considers dirty is
+recorded. Git uses the stat information in its index to find dirty paths, so
+unchanged parts of the worktree are not read. After the computation, the
+dirty paths are determined again and compared with the recorded state.
+
+A file that is rewritten with identical content is not dirty, because git
+compares the content, if the stat information differs. Paths that are
+expected to be rewritten, e.g. existing outputs, can therefore be recorded
+explicitly. All recorded paths are checked again after the computation.
+"""
+
+from __future__ import annotations
+
+import os
+import subprocess
+from typing import TYPE_CHECKING
+
+from datalad_remake import PatternPath
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+    from pathlib import Path
+
+    Snapshot = dict[PatternPath, tuple[int, int, int]]
+
+
+# State of deleted paths, if deletions are recorded
+deleted_state = (-1, -1, -1)
+
+
+def take_snapshot(
+    root: Path,
+    paths: Iterable[PatternPath] = (),
+    *,
+    include_deleted: bool = False,
+) -> Snapshot:
+    """Record inode, size, and mtime of all dirty paths in `root`, and `paths`
+
+    Subdatasets with modifications are included recursively. Deleted paths
+    are recorded with `deleted_state`, if `include_deleted` is `True`.
+    """
+    snapshot: Snapshot = {}
+    _record_dirty_paths(root, PatternPath(), snapshot, include_deleted)
+    for path in paths:
+        _record_path(root, path, snapshot, include_deleted)
+    return snapshot
+
+
+def get_changes(
+    root: Path,
+    before: Snapshot,
+    *,
+    include_deleted: bool = False,
+) -> set[PatternPath]:
+    """Get all paths that were created or modified since `before` was taken
+
+    Deleted paths are only included, if `include_deleted` is `True`.
+    """
+    after = take_snapshot(root, before, include_deleted=include_deleted)
+    return {path for path, state in after.items() if before.get(path) != state}
+
+
+def _record_dirty_paths(
+    root: Path,
+    prefix: PatternPath,
+    snapshot: Snapshot,
+    include_deleted: bool,
+) -> None:
+    result = subprocess.run(
+        [  # noqa: S607
+            'git',
+            'status',
+            '--porcelain=v2',
+            '-z',
+            '--untracked-files=all',
+            '--ignored=matching',
+        ],
+        cwd=root / prefix,
+        capture_output=True,
+        check=True,
+    )
+    records = iter(result.stdout.decode().split('\0'))
+    for record in records:
+        if not record:
+            continue
+        kind = record[0]
+        if kind in ('1', '2'):
+            fields = record.split(' ', 9 if kind == '2' else 8)
+            path, submodule_state = fields[-1], fields[2]
+            if kind == '2':
+                # Skip the original path of a rename
+                next(records, None)
+            if submodule_state.startswith('S'):
+                _record_dirty_paths(root, prefix / path, snapshot, include_deleted)
+                continue
+        elif kind == 'u':
+            path = record.split(' ', 10)[-1]
+        elif kind in ('?', '!'):
+            path = record[2:]
+        else:
+            continue
+
+        if path.endswith('/'):
+            # An untracked or ignored directory, e.g. a new repository.
+            _record_tree(root, prefix / path, snapshot)
+        else:
+            _record_path(root, prefix / path, snapshot, include_deleted)
+
+
+def _record_tree(root: Path, directory: PatternPath, snapshot: Snapshot) -> None:
+    for dir_path, dir_names, file_names in os.walk(root / directory):
+        if '.git' in dir_names:
+            dir_names.remove('.git')
+        relative_dir = PatternPath(os.path.relpath(dir_path, root).replace(os.sep, '/'))
+        for name in file_names:
+            _record_path(root, relative_dir / name, snapshot)
+
+
+def _record_path(
+    root: Path,
+    path: PatternPath,
+    snapshot: Snapshot,
+    include_deleted: bool = False,
+) -> None:
+    try:
+        stat = os.lstat(root / path)
+    except OSError:
+        # Deleted paths are not outputs
+        if include_deleted:
+            snapshot[path] = deleted_state
+        return
+    snapshot[path] = (stat.st_ino, stat.st_size, stat.st_mtime_ns)
@@ -1,30 +1,71 @@
 from __future__ import annotations
 
+import contextlib
+import hashlib
 import logging
+import os
+import re
+import shutil
 import subprocess
+import tempfile
+from concurrent.futures import (
+    ThreadPoolExecutor,
+    as_completed,
+)
+from pathlib import (
+    Path,
+    PurePosixPath,
+)
 from typing import (
+    IO,
     TYPE_CHECKING,
     Any,
+    NamedTuple,
 )
 
-from datalad_remake.utils.chdir import chdir
-from datalad_remake.utils.toml import toml_load
+from datalad_remake.utils.admission import AdmissionController
+from datalad_remake.utils.progress import (
+    ProgressParser,
+    follow_output,
+)
+from datalad_remake.utils.resources import (
+    Resources,
+    run_command,
+)
+from datalad_remake.utils.toml import toml_loads
+from datalad_remake.utils.worker import get_worker
 
 if TYPE_CHECKING:
-    from pathlib import Path
+    from collections.abc import (
+        Callable,
+        Iterable,
+    )
+    from pathlib import PurePath
 
 lgr = logging.getLogger('datalad.remake')
 
 
+# A placeholder is a name in curly braces, e.g. `{input_file}`
+_placeholder = re.compile(r'\{([^{}]*)\}')
+
+# Prefix of placeholders that are replaced by the path of an argument file,
+# e.g. `{@input_files}`
+argument_file_prefix = '@'
+
+# Compiled templates, keyed by the git blob ID of the template file
+_compiled_templates: dict[str, CompiledTemplate] = {}
+
+
 def substitute_string(
     format_str: str,
     replacements: dict[str, str],
 ) -> str:
-    for variable_name, replacement in replacements.items():
-        place_holder = '{' + variable_name + '}'
-        if place_holder in format_str:
-            format_str = format_str.replace(place_holder, replacement)
-    return format_str
+    # Substitute all placeholders in a single pass. Placeholders without
+    # a replacement are kept verbatim.
+    return _placeholder.sub(
+        lambda match: replacements.get(match[1], match[0]),
+        format_str,
+    )
 
 
 def substitute_arguments(
@@ -40,10 +81,11 @@ def substitute_arguments(
 
 def get_substitutions(
     template: dict[str, Any],
-    arguments: dict[str, str],
-) -> dict[str, str]:
+    arguments: dict[str, str | list[str]],
+) -> dict[str, str | list[str]]:
     # Check the user specified parameters
-    parameters = template['parameters']
+    list_parameters = template.get('list_parameters', [])
+    parameters = template['parameters'] + list_parameters
     if len(parameters) != len(arguments.keys()):
         msg = 'Method template parameters and arguments have different lengths'
         raise ValueError(msg)
@@ -58,26 +100,537 @@ def get_substitutions(
         msg = f'Method template parameters contain duplicates: {parameters}'
         raise ValueError(msg)
 
-    return {param_name: arguments[param_name] for param_name in parameters}
+    substitutions: dict[str, str | list[str]] = {}
+    for param_name in parameters:
+        argument = arguments[param_name]
+        if param_name in list_parameters:
+            substitutions[param_name] = (
+                [argument] if isinstance(argument, str) else list(argument)
+            )
+        elif isinstance(argument, str):
+            substitutions[param_name] = argument
+        else:
+            msg = (
+                f'Method template parameter {param_name!r} is not a list '
+                f'parameter, but received multiple values: {argument}'
+            )
+            raise ValueError(msg)
+    return substitutions
+
+
+class MapOptions(NamedTuple):
+    """Options of a template that maps its command over a list parameter
+
+    The values of the list parameter `parameter` are partitioned into chunks
+    of `chunk_size` values, and the command is executed once per chunk, with
+    up to `jobs` chunks executed concurrently. If `output` is given, it is the
+    path of the output that is computed from a single value, with the
+    placeholder `{item}` for the value.
+    """
+
+    parameter: str
+    chunk_size: int
+    jobs: int
+    output: str | None
+
+    @classmethod
+    def from_template(cls, template: dict[str, Any]) -> MapOptions:
+        options = template['map']
+        parameter = options.get('parameter')
+        if parameter not in template.get('list_parameters', []):
+            msg = f'Mapped parameter {parameter!r} is not a list parameter'
+            raise ValueError(msg)
+        chunk_size = int(options.get('chunk_size', 1))
+        if chunk_size < 1:
+            msg = f'Invalid chunk size: {chunk_size}'
+            raise ValueError(msg)
+        jobs = int(
+            options.get('jobs')
+            or max(1, (os.cpu_count() or 1) // int(template.get('cpus', 1)))
+        )
+        output = options.get('output')
+        return cls(parameter, chunk_size, jobs, None if output is None else str(output))
+
+    def get_chunks(
+        self,
+        substitutions: dict[str, str | list[str]],
+        requested: Iterable[str | PurePath] | None = None,
+    ) -> tuple[list[list[str]], set[str] | None]:
+        """Partition the values of the mapped parameter into chunks
+
+        If `requested` is given, and the template declares the output of a
+        single value, only chunks that compute a requested output are
+        returned, together with the outputs of all values in these chunks.
+        If no chunk computes a requested output, all chunks are returned.
+        """
+        values = list(substitutions[self.parameter])
+        chunks = [
+            values[start : start + self.chunk_size]
+            for start in range(0, len(values), self.chunk_size)
+        ]
+        if requested is None or self.output is None:
+            return chunks, None
+
+        replacements = {
+            name: value
+            for name, value in substitutions.items()
+            if isinstance(value, str)
+        }
+
+        def get_output(item: str) -> str:
+            return substitute_string(self.output or '', {**replacements, 'item': item})
+
+        wanted = {PurePosixPath(path) for path in requested}
+        selected = [
+            chunk
+            for chunk in chunks
+            if any(PurePosixPath(get_output(item)) in wanted for item in chunk)
+        ]
+        if not selected:
+            # The requested outputs are not computed from single values
+            return chunks, None
+        return selected, {get_output(item) for chunk in selected for item in chunk}
+
+
+class CompiledTemplate:
+    """A parsed method template that builds command lines
+
+    Every argument of the template command is split into literal text and
+    placeholders once. Building a command line joins the literal text and the
+    replacements, i.e. its cost is linear in the length of the result,
+    independent of the number of parameters.
+
+    Parameters that are listed in `list_parameters` take a list of values.
+    An argument that contains a list placeholder, e.g. `{files}` or
+    `--input={files}`, is repeated for every value. A placeholder of the form
+    `{@files}` is replaced by the path of a file that contains one value per
+    line.
+
+    Instead of a single `command`, a template can declare an ordered list of
+    `steps`, each with its own `command`. All steps are executed in the same
+    root directory, later steps can read the files that earlier steps wrote.
+    Paths in `intermediate` are removed after the last step, such that they
+    are neither collected nor reported as undeclared outputs.
+
+    A template with a `map` table executes its command, or its steps, once
+    per chunk of the values of a list parameter, see `MapOptions`.
+
+    Templates of type `worker` declare a long-running `worker` command instead
+    of `command`, see `datalad_remake.utils.worker`. Resources that the
+    command may use are declared in `cpus`, `memory`, and `walltime`, see
+    `datalad_remake.utils.resources`. A regular expression that extracts the
+    progress from the output of the command can be declared in `progress`, see
+    `datalad_remake.utils.progress`.
+    """
+
+    def __init__(self, template: dict[str, Any], blob_id: str = ''):
+        self.template = template
+        self.blob_id = blob_id
+        self.type = template.get('type', 'command')
+        if self.type not in ('command', 'worker'):
+            msg = f'Unknown method template type: {self.type!r}'
+            raise ValueError(msg)
+        self.list_parameters = frozenset(template.get('list_parameters', []))
+        if 'steps' in template and 'command' in template:
+            msg = 'Method template declares both "command" and "steps"'
+            raise ValueError(msg)
+        if 'steps' in template:
+            if not template['steps'] or not all(
+                'command' in step for step in template['steps']
+            ):
+                msg = 'Every step of a method template must declare a "command"'
+                raise ValueError(msg)
+            commands = [step['command'] for step in template['steps']]
+        else:
+            commands = [template.get('command', [])]
+        self.steps = [
+            [self._split(str(argument)) for argument in command] for command in commands
+        ]
+        self.intermediate = [str(path) for path in template.get('intermediate', [])]
+        self.map = MapOptions.from_template(template) if 'map' in template else None
+        self.worker = [str(argument) for argument in template.get('worker', [])]
+        self.resources = Resources.from_template(template)
+        self.progress = (
+            ProgressParser(template['progress']) if 'progress' in template else None
+        )
+        if self.type == 'worker' and not self.worker:
+            msg = 'Method template of type "worker" does not declare a worker'
+            raise ValueError(msg)
+        if self.type == 'worker' and ('steps' in template or 'map' in template):
+            msg = 'Method template of type "worker" cannot declare steps or a map'
+            raise ValueError(msg)
+
+    def _split(self, argument: str) -> tuple[str | None, tuple[str, ...]]:
+        # Even indices contain literal text, odd indices contain placeholder
+        # names.
+        parts = tuple(_placeholder.split(argument))
+        list_names = {name for name in parts[1::2] if name in self.list_parameters}
+        if len(list_names) > 1:
+            msg = (
+                f'Method template argument {argument!r} contains more than one '
+                f'list parameter: {sorted(list_names)}'
+            )
+            raise ValueError(msg)
+        return (list_names.pop() if list_names else None), parts
+
+    def build_command(
+        self,
+        arguments: dict[str, str | list[str]],
+        root_directory: Path,
+        argument_file_dir: Path | None = None,
+        step: int = 0,
+    ) -> list[str]:
+        """Build the command line of `step`
+
+        Argument files are created in `argument_file_dir`, which is required
+        if the template uses argument files.
+        """
+        substitutions = get_substitutions(self.template, arguments)
+        substitutions['root_directory'] = str(root_directory)
+
+        def replace(name: str) -> str:
+            if name.startswith(argument_file_prefix):
+                return self._write_argument_file(
+                    argument_file_dir,
+                    name[len(argument_file_prefix) :],
+                    substitutions,
+                )
+            replacement = substitutions.get(name, '{' + name + '}')
+            return replacement if isinstance(replacement, str) else ''
+
+        command = []
+        for list_name, parts in self.steps[step]:
+            # List values are substituted by repeating the argument
+            values = [''] if list_name is None else substitutions[list_name]
+            for value in values:
+                command.append(
+                    ''.join(
+                        part
+                        if index % 2 == 0
+                        else (value if part == list_name else replace(part))
+                        for index, part in enumerate(parts)
+                    )
+                )
+        return command
+
+    def build_commands(
+        self,
+        arguments: dict[str, str | list[str]],
+        root_directory: Path,
+        argument_file_dir: Path | None = None,
+    ) -> list[list[str]]:
+        """Build the command lines of all steps"""
+        return [
+            self.build_command(arguments, root_directory, argument_file_dir, step)
+            for step in range(len(self.steps))
+        ]
+
+    def get_intermediate(self, arguments: dict[str, str | list[str]]) -> list[str]:
+        """Get the paths of intermediate files, relative to the root directory"""
+        substitutions = {
+            name: value
+            for name, value in get_substitutions(self.template, arguments).items()
+            if isinstance(value, str)
+        }
+        return [substitute_string(path, substitutions) for path in self.intermediate]
+
+    def _write_argument_file(
+        self,
+        argument_file_dir: Path | None,
+        name: str,
+        substitutions: dict[str, str | list[str]],
+    ) -> str:
+        if name not in self.list_parameters:
+            msg = f'Argument files are only supported for list parameters: {name!r}'
+            raise ValueError(msg)
+        if argument_file_dir is None:
+            msg = 'No directory for argument files given'
+            raise ValueError(msg)
+        argument_file = argument_file_dir / name
+        if not argument_file.exists():
+            write_argument_file(argument_file, substitutions[name])
+        return str(argument_file)
+
+
+def write_argument_file(path: Path, values: Iterable[str]) -> None:
+    """Write `values` to `path`, one value per line"""
+    with path.open('w') as file:
+        for value in values:
+            file.write(value + '\n')
+
+
+def get_blob_id(content: bytes) -> str:
+    """Get the git blob ID of `content` without invoking git"""
+    hasher = hashlib.sha1()  # noqa: S324
+    hasher.update(b'blob %d\0' % len(content))
+    hasher.update(content)
+    return hasher.hexdigest()
+
+
+def load_template(template_path: Path) -> CompiledTemplate:
+    """Load and compile the template in `template_path`
+
+    Templates are only parsed and compiled if their content was not seen
+    before in this process.
+    """
+    content = template_path.read_bytes()
+    blob_id = get_blob_id(content)
+    compiled_template = _compiled_templates.get(blob_id)
+    if compiled_template is None:
+        compiled_template = CompiledTemplate(toml_loads(content.decode()), blob_id)
+        _compiled_templates[blob_id] = compiled_template
+    return compiled_template
 
 
 def compute(
     root_directory: Path,
     template_path: Path,
-    compute_arguments: dict[str, str],
+    compute_arguments: dict[str, str | list[str]],
+    stdout: Path | None,
+    output_patterns: Iterable[str | PurePath] = (),
+    notify: Callable[[str], Any] | None = None,
+    progress: Callable[[float], Any] | None = None,
+    requested: Iterable[str | PurePath] | None = None,
+    capture_stderr: bool = False,
+) -> set[str] | None:
+    """Execute the template in `template_path` in `root_directory`
+
+    If admission control is configured, the computation waits for admission
+    first, and `notify` is called with a message, if it is queued.
+
+    If the template declares a progress expression, `progress` is called with
+    the progress of the computation as a fraction between `0.0` and `1.0`.
+
+    If `requested` outputs are given, and the template maps over a list
+    parameter and declares the output of a single value, only the chunks that
+    compute the requested outputs are executed. In this case the outputs of
+    the executed chunks are returned, otherwise `None` is returned.
+
+    If `capture_stderr` is set, the tail of stderr of a failing command is
+    attached to the raised `subprocess.CalledProcessError`, see
+    `datalad_remake.utils.resources.run_command`.
+    """
+    template = load_template(template_path)
+
+    controller = AdmissionController.from_config()
+    if controller is None:
+        _, outputs = _run_template(
+            template,
+            root_directory,
+            compute_arguments,
+            stdout,
+            output_patterns,
+            progress,
+            requested,
+            capture_stderr,
+        )
+        return outputs
+
+    cpus = (template.resources.cpus or 1) * (template.map.jobs if template.map else 1)
+    with controller.admitted(
+        cpus,
+        controller.estimate_memory(template.blob_id, template.resources),
+        notify,
+    ):
+        peak_memory, outputs = _run_template(
+            template,
+            root_directory,
+            compute_arguments,
+            stdout,
+            output_patterns,
+            progress,
+            requested,
+            capture_stderr,
+        )
+    controller.record_usage(template.blob_id, peak_memory)
+    return outputs
+
+
+def _run_template(
+    template: CompiledTemplate,
+    root_directory: Path,
+    compute_arguments: dict[str, str | list[str]],
     stdout: Path | None,
-) -> None:
-    template = toml_load(template_path)
+    output_patterns: Iterable[str | PurePath],
+    progress: Callable[[float], Any] | None = None,
+    requested: Iterable[str | PurePath] | None = None,
+    capture_stderr: bool = False,
+) -> tuple[int | None, set[str] | None]:
+    if template.type == 'worker':
+        lgr.debug(f'compute: SENDING JOB TO WORKER: {template.worker}')
+        get_worker(template.blob_id, template.worker, template.resources).run_job(
+            root_directory,
+            get_substitutions(template.template, compute_arguments),
+            list(map(str, output_patterns)),
+            stdout,
+        )
+        return None, None
+
+    # Argument files are kept outside of the worktree, to keep them out of
+    # the outputs.
+    outputs = None
+    with contextlib.ExitStack() as stack:
+        tmp_dir = stack.enter_context(
+            tempfile.TemporaryDirectory(prefix='datalad-remake-arguments-')
+        )
+        stdout_file = stack.enter_context(stdout.open('wb')) if stdout else None
+        if template.map is None:
+            peak_memory = _run_steps(
+                template,
+                compute_arguments,
+                root_directory,
+                Path(tmp_dir),
+                stdout_file,
+                progress,
+                capture_stderr,
+            )
+        else:
+            peak_memory, outputs = _run_chunks(
+                template,
+                template.map,
+                compute_arguments,
+                root_directory,
+                Path(tmp_dir),
+                stdout_file,
+                progress,
+                requested,
+                capture_stderr,
+            )
+
+    for path in template.get_intermediate(compute_arguments):
+        if Path(path).is_absolute() or '..' in Path(path).parts:
+            msg = f'Intermediate path {path!r} is outside of the root directory'
+            raise ValueError(msg)
+        intermediate = root_directory / path
+        if intermediate.is_dir() and not intermediate.is_symlink():
+            shutil.rmtree(intermediate)
+        else:
+            intermediate.unlink(missing_ok=True)
+    return peak_memory, outputs
+
+
+def _run_steps(
+    template: CompiledTemplate,
+    arguments: dict[str, str | list[str]],
+    root_directory: Path,
+    argument_file_dir: Path,
+    stdout_file: IO[bytes] | None,
+    progress: Callable[[float], Any] | None,
+    capture_stderr: bool = False,
+) -> int | None:
+    commands = template.build_commands(arguments, root_directory, argument_file_dir)
+    peak_memory = None
+    for step, command in enumerate(commands):
+        lgr.debug(f'compute: RUNNING step {step}: {command}')
+        step_memory = _run_command(
+            template,
+            command,
+            root_directory,
+            stdout_file,
+            _get_step_progress(progress, step, len(commands)),
+            capture_stderr,
+        )
+        if step_memory is not None:
+            peak_memory = max(peak_memory or 0, step_memory)
+    return peak_memory
+
+
+def _run_chunks(
+    template: CompiledTemplate,
+    options: MapOptions,
+    arguments: dict[str, str | list[str]],
+    root_directory: Path,
+    argument_file_dir: Path,
+    stdout_file: IO[bytes] | None,
+    progress: Callable[[float], Any] | None,
+    requested: Iterable[str | PurePath] | None,
+    capture_stderr: bool = False,
+) -> tuple[int | None, set[str] | None]:
+    chunks, outputs = options.get_chunks(
+        get_substitutions(template.template, arguments), requested
+    )
+    lgr.debug(
+        'compute: RUNNING %d chunks of %r with %d jobs',
+        len(chunks),
+        options.parameter,
+        options.jobs,
+    )
+
+    def run_chunk(index: int, chunk: list[str]) -> int | None:
+        # Every chunk has its own argument files
+        chunk_dir = argument_file_dir / str(index)
+        chunk_dir.mkdir()
+        return _run_steps(
+            template,
+            {**arguments, options.parameter: chunk},
+            root_directory,
+            chunk_dir,
+            stdout_file,
+            None,
+            capture_stderr,
+        )
+
+    # The progress of a mapped computation is the fraction of finished chunks,
+    # the output of concurrent chunks is not parsed.
+    jobs = max(1, min(options.jobs, len(chunks)))
+    peak_memory = None
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        futures = [
+            executor.submit(run_chunk, index, chunk)
+            for index, chunk in enumerate(chunks)
+        ]
+        try:
+            for finished, future in enumerate(as_completed(futures), 1):
+                chunk_memory = future.result()
+                if chunk_memory is not None:
+                    peak_memory = max(peak_memory or 0, chunk_memory)
+                if progress is not None:
+                    progress(finished / len(chunks))
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            raise
+    # Chunks run concurrently, estimate the peak memory of all of them
+    return (None if peak_memory is None else peak_memory * jobs), outputs
 
-    substitutions = get_substitutions(template, compute_arguments)
-    substitutions['root_directory'] = str(root_directory)
 
-    substituted_command = substitute_arguments(template, substitutions, 'command')
+def _get_step_progress(
+    progress: Callable[[float], Any] | None,
+    step: int,
+    steps: int,
+) -> Callable[[float], Any] | None:
+    # The progress of a step is scaled to its share of all steps
+    if progress is None or steps == 1:
+        return progress
+    return lambda fraction: progress((step + fraction) / steps)
 
-    with chdir(root_directory):
-        lgr.debug(f'compute: RUNNING: {substituted_command}')
-        subprocess.run(
-            substituted_command,
-            check=True,
-            stdout=stdout.open('wb') if stdout else subprocess.DEVNULL,
+
+def _run_command(
+    template: CompiledTemplate,
+    command: list[str],
+    root_directory: Path,
+    stdout_file: IO[bytes] | None,
+    progress: Callable[[float], Any] | None,
+    capture_stderr: bool = False,
+) -> int | None:
+    parser = template.progress
+    if parser is None or progress is None:
+        return run_command(
+            command,
+            template.resources,
+            cwd=root_directory,
+            stdout=stdout_file or subprocess.DEVNULL,
+            capture_stderr=capture_stderr,
         )
+
+    # Pipe the output through the progress parser
+    def handle_output(output: IO[bytes]) -> None:
+        follow_output(output, parser, progress, stdout_file)
+
+    return run_command(
+        command,
+        template.resources,
+        output_handler=handle_output,
+        cwd=root_directory,
+        capture_stderr=capture_stderr,
+    )
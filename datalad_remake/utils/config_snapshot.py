@@ -0,0 +1,198 @@
+"""Memoized configuration of a dataset
+
+The special remote reads the same configuration values, e.g.
+`datalad.dataset.id`, `datalad.make.priority`, or the trusted keys, for every
+key that it computes. A `ConfigSnapshot` memoizes these values, and values
+derived from them, for the lifetime of the process. Snapshots are shared by
+all special remote instances of a process, e.g. in the remake daemon.
+
+A snapshot is invalidated, if one of the configuration files that affect the
+dataset changes, i.e. its modification time, size, or inode changes, or if one
+of the environment variables `GIT_CONFIG*` or `DATALAD_*` changes. Files that
+are only referenced by `include.path` are not tracked.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import (
+    TYPE_CHECKING,
+    Any,
+)
+
+from datalad_core.config import (
+    ConfigManager,
+    DataladBranchConfig,
+    GitEnvironment,
+    GlobalGitConfig,
+    ImplementationDefaults,
+    LocalGitConfig,
+    get_manager,
+)
+from datalad_core.config.git import GitConfig
+
+from datalad_remake.utils.getconfig import config_lock
+
+if TYPE_CHECKING:
+    from collections.abc import (
+        Callable,
+        Hashable,
+    )
+
+lgr = logging.getLogger('datalad.remake.utils.config_snapshot')
+
+
+environment_prefixes = ('GIT_CONFIG', 'DATALAD_')
+
+_snapshots: dict[Path, ConfigSnapshot] = {}
+_snapshots_lock = threading.Lock()
+
+
+def get_config_snapshot(dataset_dir: Path) -> ConfigSnapshot:
+    """Get the process-wide snapshot of the configuration of a dataset"""
+    with _snapshots_lock:
+        snapshot = _snapshots.get(dataset_dir)
+        if snapshot is None:
+            snapshot = ConfigSnapshot(dataset_dir)
+            _snapshots[dataset_dir] = snapshot
+        return snapshot
+
+
+def get_git_dir(dataset_dir: Path) -> Path:
+    """Get the git directory of a dataset, which might be given by a gitfile"""
+    dot_git = dataset_dir / '.git'
+    if dot_git.is_file():
+        content = dot_git.read_text().strip()
+        if content.startswith('gitdir:'):
+            return (dataset_dir / content[len('gitdir:') :].strip()).resolve()
+    return dot_git
+
+
+def get_global_config_files() -> list[Path]:
+    """Get the paths of the global and system git configuration files"""
+    home = Path.home()
+    global_files = (
+        [Path(os.environ['GIT_CONFIG_GLOBAL'])]
+        if 'GIT_CONFIG_GLOBAL' in os.environ
+        else [
+            home / '.gitconfig',
+            Path(os.environ.get('XDG_CONFIG_HOME', home / '.config'))
+            / 'git'
+            / 'config',
+        ]
+    )
+    system_file = Path(os.environ.get('GIT_CONFIG_SYSTEM', '/etc/gitconfig'))
+    return [*global_files, system_file]
+
+
+class ConfigSnapshot:
+    """Memoized configuration values of a dataset
+
+    Configuration values are read from a config manager with the sources
+    `git-command`, `git` (local), `git-global`, and `datalad-branch`.
+    """
+
+    def __init__(self, dataset_dir: Path):
+        self.dataset_dir = dataset_dir
+        self.config_files = [
+            get_git_dir(dataset_dir) / 'config',
+            dataset_dir / '.datalad' / 'config',
+        ]
+        # Config managers are not thread-safe
+        self.lock = threading.RLock()
+        self._manager: ConfigManager | None = None
+        self._values: dict[Hashable, Any] = {}
+        self._state: tuple | None = None
+        self._generation = 0
+
+    @property
+    def manager(self) -> ConfigManager:
+        """The config manager of the dataset, as of the current snapshot"""
+        with self.lock:
+            self._validate()
+            if self._manager is None:
+                self._manager = ConfigManager(
+                    defaults=ImplementationDefaults(),
+                    sources={
+                        'git-command': GitEnvironment(),
+                        'git': LocalGitConfig(self.dataset_dir),
+                        'git-global': GlobalGitConfig(),
+                        'datalad-branch': DataladBranchConfig(self.dataset_dir),
+                    },
+                )
+            return self._manager
+
+    def get(self, key: str) -> Any:
+        """Get the value of the configuration variable `key`"""
+
+        def read() -> Any:
+            with self.lock:
+                return self.manager.get(key).value
+
+        return self.memoize(('config', key), read)
+
+    def memoize(self, name: Hashable, compute: Callable[[], Any]) -> Any:
+        """Get a value that is derived from the configuration
+
+        `compute` is called, if `name` is not known in the current snapshot.
+        It is called without holding the lock of the snapshot, concurrent
+        callers might therefore compute the same value.
+        """
+        with self.lock:
+            self._validate()
+            if name in self._values:
+                return self._values[name]
+            generation = self._generation
+        value = compute()
+        with self.lock:
+            if generation == self._generation:
+                self._values[name] = value
+        return value
+
+    def invalidate(self) -> None:
+        """Forget all memoized values and reload the configuration"""
+        with self.lock:
+            self._values.clear()
+            self._manager = None
+            self._generation += 1
+        # The global config manager caches the global and system
+        # configuration, which are used for protected values like
+        # trusted keys.
+        with config_lock:
+            for source in get_manager().sources.values():
+                if isinstance(source, GitConfig):
+                    source.reinit().load()
+
+    def _validate(self) -> None:
+        state = self._get_state()
+        if state != self._state:
+            if self._state is not None:
+                lgr.debug('configuration of %s changed', self.dataset_dir)
+                self.invalidate()
+            self._state = state
+
+    def _get_state(self) -> tuple:
+        return (
+            tuple(
+                _get_file_state(path)
+                for path in [*self.config_files, *get_global_config_files()]
+            ),
+            tuple(
+                sorted(
+                    (name, value)
+                    for name, value in os.environ.items()
+                    if name.startswith(environment_prefixes)
+                )
+            ),
+        )
+
+
+def _get_file_state(path: Path) -> tuple[int, int, int] | None:
+    try:
+        stat = path.stat()
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size, stat.st_ino
@@ -0,0 +1,65 @@
+"""Records of the costs of computations
+
+After a successful computation, the special remote records how long it took,
+in the directory `datalad-remake/costs` in the git directory of the dataset,
+keyed by the fingerprint of the computation, see
+`datalad_remake.utils.fingerprint`. The duration covers the provisioning of
+the worktree, the retrieval of the inputs, and the execution of the template,
+i.e. everything that has to be repeated, if the outputs are dropped and
+retrieved again.
+
+`datalad make-gc` uses these records to decide which outputs are cheap to
+recompute.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import time
+from typing import (
+    TYPE_CHECKING,
+    Any,
+)
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+lgr = logging.getLogger('datalad.remake.utils.costs')
+
+
+class CostRecords:
+    """A directory of computation costs, keyed by fingerprints"""
+
+    def __init__(self, directory: Path):
+        self.directory = directory
+
+    def get(self, fingerprint: str) -> float | None:
+        """Get the recorded duration of the computation `fingerprint`"""
+        try:
+            record = json.loads((self.directory / f'{fingerprint}.json').read_text())
+        except (OSError, ValueError):
+            return None
+        return record['seconds']
+
+    def record(self, fingerprint: str, seconds: float) -> None:
+        """Record that the computation `fingerprint` took `seconds`"""
+        path = self.directory / f'{fingerprint}.json'
+        record: dict[str, Any] = {
+            'fingerprint': fingerprint,
+            'seconds': seconds,
+            'time': time.time(),
+        }
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            temporary_path = path.with_name(f'{path.name}.{os.getpid()}.tmp')
+            temporary_path.write_text(json.dumps(record))
+            temporary_path.replace(path)
+        except OSError as e:
+            lgr.debug('could not record cost of %s: %s', fingerprint, e)
+
+
+def get_costs_dir(git_dir: Path) -> Path:
+    """Get the directory of the cost records of the repository `git_dir`"""
+    return git_dir / 'datalad-remake' / 'costs'
@@ -0,0 +1,140 @@
+"""Records of failed computations
+
+If a computation fails, e.g. because its command exits with an error, or
+because a signature cannot be verified, the special remote records the
+failure in the directory `datalad-remake/failures` in the git directory of
+the dataset, keyed by the fingerprint of the computation, see
+`datalad_remake.utils.fingerprint`. Requests for the same computation then
+fail immediately, until the back-off period `datalad.make.failure-backoff`
+has passed. This prevents repeated retrievals, e.g. by retrying orchestration
+tools or by concurrent `git annex get -J` jobs, from starting the same failing
+computation over and over.
+
+Only failures that recur, if the computation is repeated, are recorded, i.e.
+failed commands of the method template, and failed signature verifications.
+Concurrent requests for the same computation hold a lock on the fingerprint,
+such that they wait for a running computation, and then find its failure
+record.
+
+Records are removed with `datalad make-clear-failures`, and replaced, if the
+computation fails again after the back-off period.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import json
+import logging
+import os
+import time
+from typing import (
+    TYPE_CHECKING,
+    Any,
+)
+
+from datalad_remake.utils.locking import file_lock
+
+if TYPE_CHECKING:
+    from collections.abc import (
+        Callable,
+        Generator,
+        Iterable,
+    )
+    from pathlib import Path
+
+lgr = logging.getLogger('datalad.remake.utils.failures')
+
+
+# Default back-off period in seconds
+default_backoff = 300.0
+
+
+class FailureCache:
+    """A directory of failure records, keyed by fingerprints"""
+
+    def __init__(self, directory: Path, backoff: float = default_backoff):
+        self.directory = directory
+        self.backoff = backoff
+
+    def get(self, fingerprint: str) -> dict[str, Any] | None:
+        """Get the record of a failure of `fingerprint` within the back-off"""
+        record = self._read(self.directory / f'{fingerprint}.json')
+        if record is None or time.time() - record['time'] >= self.backoff:
+            return None
+        return record
+
+    def locked(
+        self,
+        fingerprint: str,
+        notify: Callable[[str], Any] | None = None,
+    ) -> contextlib.AbstractContextManager[None]:
+        """Hold the lock of the computation `fingerprint`"""
+        return file_lock(
+            self.directory / f'{fingerprint}.lock',
+            f'waiting for a concurrent computation of {fingerprint}',
+            notify,
+        )
+
+    def record(self, fingerprint: str, key: str, error: BaseException) -> None:
+        """Record that the computation `fingerprint` of `key` failed"""
+        path = self.directory / f'{fingerprint}.json'
+        previous = self._read(path)
+        keys = set(previous['keys']) if previous is not None else set()
+        stderr = getattr(error, 'stderr', None)
+        if isinstance(stderr, bytes):
+            stderr = stderr.decode(errors='replace')
+        record = {
+            'fingerprint': fingerprint,
+            'keys': sorted(keys | {key}),
+            'error': str(error) or type(error).__name__,
+            'stderr': stderr or None,
+            'time': time.time(),
+        }
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            temporary_path = path.with_name(f'{path.name}.{os.getpid()}.tmp')
+            temporary_path.write_text(json.dumps(record))
+            temporary_path.replace(path)
+        except OSError as e:
+            lgr.debug('could not record failure of %s: %s', fingerprint, e)
+
+    def clear(self, keys: Iterable[str] | None = None) -> Generator[dict[str, Any]]:
+        """Remove records and yield them
+
+        If `keys` are given, only records of computations of these keys are
+        removed.
+        """
+        selected = None if keys is None else set(keys)
+        for path in sorted(self.directory.glob('*.json')):
+            record = self._read(path)
+            if record is None:
+                continue
+            if selected is None or selected & set(record['keys']):
+                path.unlink(missing_ok=True)
+                yield record
+
+    @staticmethod
+    def _read(path: Path) -> dict[str, Any] | None:
+        try:
+            return json.loads(path.read_text())
+        except (OSError, ValueError):
+            return None
+
+
+def get_failures_dir(git_dir: Path) -> Path:
+    """Get the directory of the failure records of the repository `git_dir`"""
+    return git_dir / 'datalad-remake' / 'failures'
+
+
+def describe_failure(record: dict[str, Any], backoff: float) -> str:
+    """Describe a failure record in a single line, e.g. for an error message"""
+    age = time.time() - record['time']
+    message = (
+        f'computation failed {age:.0f}s ago, not retrying for '
+        f'{backoff - age:.0f}s (run `datalad make-clear-failures` to retry '
+        f'now): {record["error"]}'
+    )
+    stderr_lines = (record['stderr'] or '').strip().splitlines()
+    if stderr_lines:
+        message += f' (last line of stderr: {stderr_lines[-1]})'
+    return message
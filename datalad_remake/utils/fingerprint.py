@@ -0,0 +1,73 @@
+"""Fingerprints of computations
+
+A fingerprint identifies the outputs of a computation independently of the
+clone and of the commit in which it is performed. It is the SHA256-hash of
+the specification, i.e. method, parameters, and input and output patterns,
+the blob id of the method template, and the identities of all inputs:
+
+- annexed inputs are identified by their annex keys
+- other inputs are identified by their blob ids
+- subdatasets that contain inputs, or might contain inputs, are identified by
+  their commit ids
+
+Computations with equal fingerprints are interchangeable, even if they were
+registered on different commits, because all files that they read are equal.
+Files that a computation reads, but that are not declared as inputs, are not
+part of the fingerprint.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+from typing import (
+    TYPE_CHECKING,
+    Any,
+)
+
+from datalad_remake import (
+    PatternPath,
+    template_dir,
+)
+from datalad_remake.utils.glob import PatternMatcher
+from datalad_remake.utils.trees import (
+    get_annexed_keys,
+    get_tree_entries,
+)
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+
+# Version of the fingerprint scheme, it is changed if the scheme changes
+fingerprint_version = 2
+
+
+def get_fingerprint(dataset_dir: Path, compute_info: dict[str, Any]) -> str:
+    """Get the fingerprint of the computation described by `compute_info`"""
+    root_version = compute_info['root_version']
+    entries = get_tree_entries(dataset_dir, root_version)
+    annexed_keys = get_annexed_keys(dataset_dir, root_version)
+    matcher = PatternMatcher(compute_info['input'])
+
+    template = entries.get(PatternPath(template_dir) / compute_info['method'])
+    inputs = {}
+    for path, entry in entries.items():
+        if entry.type == 'commit':
+            if matcher.match(path) or matcher.match_prefix(path):
+                inputs[str(path)] = entry.object
+        elif matcher.match(path):
+            inputs[str(path)] = annexed_keys.get(path, entry.object)
+
+    stdout = compute_info['stdout']
+    description = {
+        'version': fingerprint_version,
+        'method': str(compute_info['method']),
+        'template': None if template is None else template.object,
+        'parameter': compute_info['parameter'],
+        'input': [str(pattern) for pattern in compute_info['input']],
+        'output': [str(pattern) for pattern in compute_info['output']],
+        'stdout': None if stdout is None else str(stdout),
+        'inputs': inputs,
+    }
+    return hashlib.sha256(json.dumps(description, sort_keys=True).encode()).hexdigest()
@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+import threading
+
 from datalad_core.config import (
     ConfigManager,
     get_manager,
@@ -10,6 +12,10 @@ from datalad_remake import (
     trusted_keys_config_key,
 )
 
+# Config managers are not thread-safe, but the special remote reads
+# configuration from concurrent requests.
+config_lock = threading.RLock()
+
 
 def get_trusted_keys(config_manager: ConfigManager | None = None) -> list[str]:
     value = get_protected_config(trusted_keys_config_key, config_manager)
@@ -34,4 +40,11 @@ def get_protected_config(
 ) -> str:
     if config_manager is None:
         config_manager = get_manager()
-    return config_manager.get_from_protected_sources(config_key).value
+    with config_lock:
+        return config_manager.get_from_protected_sources(config_key).value
+
+
+def get_config(config_key: str) -> str | None:
+    """Get a value from the global config manager"""
+    with config_lock:
+        return get_manager().get(config_key).value
@@ -1,8 +1,11 @@
 from __future__ import annotations
 
+import os
+import re
 import sys
+from fnmatch import translate
 from glob import glob as system_glob
-from itertools import chain
+from glob import has_magic
 from pathlib import Path
 from typing import TYPE_CHECKING
 
@@ -20,26 +23,181 @@ def resolve_patterns(
     *,
     recursive: bool = True,
 ) -> set[PatternPath]:
-    return {
-        PatternPath(Path(p))
-        for p in filter(
-            # This expression works because a `PatternPath` instance can be
-            # safely appended to a system path via `/`. The result is a system
-            # path where the last parts are the parts of the `PatternPath`
-            # instance.
-            lambda p: not (Path(root_dir) / p).is_dir(),
-            chain.from_iterable(
-                glob(
-                    # Convert `PatternPath` instance to a platform path and then
-                    # to a string, which is required by the `glob` function.
-                    str(Path(pattern)),
-                    root_dir=root_dir,
-                    recursive=recursive,
-                )
-                for pattern in patterns
-            ),
-        )
-    }
+    """Get all non-directory paths in `root_dir` that match any of `patterns`
+
+    The result is identical to globbing every pattern individually with
+    `glob.glob` and removing all directories and non-existing paths from the
+    matches. But all patterns are compiled into a single matcher, and
+    `root_dir` is walked only once.
+    """
+    return PatternMatcher(patterns, recursive=recursive).resolve(root_dir)
+
+
+# `glob` matches case-insensitive on platforms with case-insensitive file
+# systems.
+_regex_flags = re.IGNORECASE if os.path.normcase('A') == 'a' else 0
+
+
+class _Node:
+    """A node in a trie of pattern segments"""
+
+    __slots__ = ('_closure', 'literals', 'loop', 'recursive', 'terminal', 'wildcards')
+
+    def __init__(self, *, loop: bool = False):
+        # Children that are reached by segments without wildcards
+        self.literals: dict[str, _Node] = {}
+        # Children that are reached by segments with wildcards, keyed by the
+        # segment.
+        self.wildcards: dict[str, tuple[re.Pattern, _Node]] = {}
+        # The child that is reached by a `**`-segment
+        self.recursive: _Node | None = None
+        # `True` if the node was reached by a `**`-segment, i.e. it matches
+        # zero or more directories.
+        self.loop = loop
+        # `True` if a pattern ends in this node
+        self.terminal = False
+        self._closure: frozenset[_Node] | None = None
+
+    @property
+    def closure(self) -> frozenset[_Node]:
+        """The node and all nodes that are reachable via `**` matching zero
+        directories"""
+        if self._closure is None:
+            self._closure = frozenset(
+                {self} | (self.recursive.closure if self.recursive else set())
+            )
+        return self._closure
+
+    @property
+    def needs_listing(self) -> bool:
+        return bool(self.wildcards) or self.loop
+
+
+class PatternMatcher:
+    """Match many glob-patterns in a single walk of a directory tree
+
+    The patterns are compiled into a trie of path segments. A `**`-segment
+    matches zero or more directories, other segments are matched like in
+    `glob.glob`. In particular, wildcards do not match names that start with a
+    `.`, unless the segment itself starts with a `.`.
+    """
+
+    def __init__(self, patterns: Iterable[PatternPath], *, recursive: bool = True):
+        self.root = _Node()
+        for pattern in patterns:
+            self._add(pattern.parts, recursive=recursive)
+
+    def _add(self, parts: tuple[str, ...], *, recursive: bool) -> None:
+        node = self.root
+        for part in parts:
+            if part == '**' and recursive:
+                if node.recursive is None:
+                    node.recursive = _Node(loop=True)
+                node = node.recursive
+            elif has_magic(part):
+                if part not in node.wildcards:
+                    node.wildcards[part] = (
+                        re.compile(translate(part), _regex_flags),
+                        _Node(),
+                    )
+                node = node.wildcards[part][1]
+            else:
+                node = node.literals.setdefault(part, _Node())
+        node.terminal = True
+
+    @staticmethod
+    def _step(states: Iterable[_Node], name: str) -> set[_Node]:
+        """Get the states that are reached by matching `name` in `states`"""
+        hidden = name.startswith('.')
+        result: set[_Node] = set()
+        for state in states:
+            child = state.literals.get(name)
+            if child is not None:
+                result.update(child.closure)
+            for segment, (regex, wildcard_child) in state.wildcards.items():
+                if (not hidden or segment.startswith('.')) and regex.match(name):
+                    result.update(wildcard_child.closure)
+            if state.loop and not hidden:
+                result.update(state.closure)
+        return result
+
+    def match(self, path: PatternPath) -> bool:
+        """Check whether `path` matches any pattern
+
+        This does not access the file system, all leading path elements are
+        assumed to be directories.
+        """
+        states: set[_Node] = set(self.root.closure)
+        for part in path.parts:
+            states = self._step(states, part)
+            if not states:
+                return False
+        return any(state.terminal for state in states)
+
+    def match_prefix(self, path: PatternPath) -> bool:
+        """Check whether paths below the directory `path` might match a pattern"""
+        states: set[_Node] = set(self.root.closure)
+        for part in path.parts:
+            states = self._step(states, part)
+            if not states:
+                return False
+        return any(state.literals or state.needs_listing for state in states)
+
+    def resolve(self, root_dir: str | Path) -> set[PatternPath]:
+        """Get all non-directory paths in `root_dir` that match any pattern"""
+        matches: set[PatternPath] = set()
+        if not Path(root_dir).is_dir():
+            return matches
+
+        stack: list[tuple[str, tuple[str, ...], frozenset[_Node]]] = [
+            (str(root_dir), (), self.root.closure)
+        ]
+        while stack:
+            directory, parts, states = stack.pop()
+            for name, is_dir in self._list(directory, states):
+                next_states = self._step(states, name)
+                if not next_states:
+                    continue
+                if is_dir:
+                    if any(
+                        state.literals or state.needs_listing for state in next_states
+                    ):
+                        stack.append(
+                            (
+                                os.path.join(directory, name),
+                                (*parts, name),
+                                frozenset(next_states),
+                            )
+                        )
+                elif any(state.terminal for state in next_states):
+                    matches.add(PatternPath(*parts, name))
+        return matches
+
+    @staticmethod
+    def _list(directory: str, states: frozenset[_Node]) -> Iterable[tuple[str, bool]]:
+        """Yield candidate names in `directory` and whether they are directories
+
+        The directory is only listed if a wildcard or a `**`-segment has to be
+        matched. Names of literal segments are checked individually.
+        """
+        literals = {name for state in states for name in state.literals}
+        if any(state.needs_listing for state in states):
+            try:
+                with os.scandir(directory) as entries:
+                    for entry in entries:
+                        literals.discard(entry.name)
+                        try:
+                            is_dir = entry.is_dir()
+                        except OSError:
+                            is_dir = False
+                        yield entry.name, is_dir
+            except OSError:
+                return
+
+        for name in literals:
+            path = os.path.join(directory, name)
+            if os.path.lexists(path):
+                yield name, os.path.isdir(path)
 
 
 # Support kwarg `root_dir` in `glob` in python version < 3.10. If the minimal
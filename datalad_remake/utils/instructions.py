@@ -0,0 +1,100 @@
+"""Compute instructions that are registered for annexed files
+
+A compute instruction is a `datalad-remake:` URL that names a label, the
+commit on which the computation should be performed (`root_version`), the
+specification of the computation, and the output that the URL belongs to
+(`this`). If more than one instruction is registered for a file, the
+instruction with the highest priority is selected.
+"""
+
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    NamedTuple,
+)
+from urllib.parse import (
+    unquote,
+    urlparse,
+)
+
+from datalad_remake import (
+    PatternPath,
+    specification_dir,
+    template_dir,
+)
+from datalad_remake.utils.verify import verify_file
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+
+    from datalad_next.datasets import Dataset
+
+
+class Instruction(NamedTuple):
+    label: str
+    root_version: str
+    spec_name: str
+    this: str
+
+
+def parse_url(url: str) -> Instruction:
+    """Get the compute instruction from a `datalad-remake:` URL"""
+    parts = urlparse(url).query.split('&', 3)
+    return Instruction(*(unquote(part.split('=', 1)[1]) for part in parts))
+
+
+def select_instruction(urls: Iterable[str], priorities: list[str]) -> Instruction:
+    """Select the compute instruction with the highest priority
+
+    If no priority is configured for the labels of the instructions, the
+    first instruction is selected.
+    """
+    instructions = {}
+    for url in urls:
+        instruction = parse_url(url)
+        instructions[instruction.label] = instruction
+    for label in priorities:
+        if label in instructions:
+            return instructions[label]
+    return next(iter(instructions.values()))
+
+
+def read_specification(
+    dataset: Dataset,
+    spec_name: str,
+    trusted_key_ids: list[str] | None,
+) -> dict[str, Any]:
+    """Verify and read a specification, and get its method template
+
+    If `trusted_key_ids` is `None`, the specification is not verified.
+    """
+    spec_path = dataset.pathobj / specification_dir / spec_name
+    if trusted_key_ids is not None:
+        verify_file(dataset.pathobj, spec_path, trusted_key_ids)
+
+    # Ensure that the spec is actually present and read it
+    dataset.get(spec_path, result_renderer='disabled')
+    with open(spec_path, 'rb') as f:
+        spec = json.load(f)
+
+    method_path = dataset.pathobj / template_dir / spec['method']
+    dataset.get(method_path, result_renderer='disabled')
+    return spec
+
+
+def get_compute_info(instruction: Instruction, spec: dict[str, Any]) -> dict[str, Any]:
+    """Combine an instruction and its specification"""
+    stdout = spec.get('stdout', None)
+    return {
+        'root_version': instruction.root_version,
+        'this': PatternPath(instruction.this),
+        'method': Path(spec['method']),
+        'input': [PatternPath(path) for path in spec['input']],
+        'output': [PatternPath(path) for path in spec['output']],
+        'stdout': PatternPath(stdout) if stdout else None,
+        'parameter': spec['parameter'],
+    }
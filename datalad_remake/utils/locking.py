@@ -0,0 +1,61 @@
+"""Exclusive file locks between processes
+
+Locks are `fcntl`-locks on lock files. On platforms that do not support
+`fcntl`, e.g. Windows, locks are not acquired, and concurrent processes do not
+wait for each other.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import logging
+from typing import (
+    TYPE_CHECKING,
+    Any,
+)
+
+if TYPE_CHECKING:
+    from collections.abc import (
+        Callable,
+        Generator,
+    )
+    from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None  # type: ignore[assignment]
+
+lgr = logging.getLogger('datalad.remake.utils.locking')
+
+locking_supported = fcntl is not None
+
+
+@contextlib.contextmanager
+def file_lock(
+    lock_file: Path,
+    message: str | None = None,
+    notify: Callable[[str], Any] | None = None,
+) -> Generator[None]:
+    """Hold an exclusive lock on `lock_file`
+
+    If the lock is held by another process, `message` is logged, and `notify`
+    is called with it, before waiting for the lock.
+    """
+    if fcntl is None:
+        yield
+        return
+    lock_file.parent.mkdir(parents=True, exist_ok=True)
+    with lock_file.open('a') as lock:
+        try:
+            fcntl.flock(lock.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            if message is not None:
+                lgr.info(message)
+                if notify is not None:
+                    notify(message)
+            fcntl.flock(lock.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock.fileno(), fcntl.LOCK_UN)
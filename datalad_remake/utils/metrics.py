@@ -0,0 +1,76 @@
+"""Durations and throughput of the phases of a computation
+
+Every measured phase, e.g. provisioning, execution, or collection, is logged
+on level `INFO`. If the configuration variable `datalad.make.metrics-file` is
+set, a JSON record of every phase is appended to the given file, e.g.::
+
+    {"phase": "collection", "key": "MD5E-s4--...", "seconds": 0.01,
+     "bytes": 4, "bytes_per_second": 400.0, "time": 1700000000.0}
+"""
+
+from __future__ import annotations
+
+import contextlib
+import json
+import logging
+import threading
+import time
+from typing import (
+    TYPE_CHECKING,
+    Any,
+)
+
+from datalad_remake import metrics_file_config_key
+from datalad_remake.utils.getconfig import get_config
+
+if TYPE_CHECKING:
+    from collections.abc import Generator
+
+lgr = logging.getLogger('datalad.remake.utils.metrics')
+
+_metrics_file_lock = threading.Lock()
+
+
+@contextlib.contextmanager
+def measure(phase: str, **fields: Any) -> Generator[dict[str, Any], None, None]:
+    """Measure the duration of `phase`
+
+    The context yields the record of the phase. If the number of processed
+    bytes is stored in its `bytes` field, the throughput is computed, too.
+    Phases that fail are recorded with `"failed": true`.
+    """
+    record: dict[str, Any] = {'phase': phase, **fields}
+    start = time.monotonic()
+    try:
+        yield record
+    except BaseException:
+        record['failed'] = True
+        raise
+    finally:
+        record['seconds'] = time.monotonic() - start
+        if 'bytes' in record and record['seconds'] > 0:
+            record['bytes_per_second'] = record['bytes'] / record['seconds']
+        record['time'] = time.time()
+        _report(record)
+
+
+def _report(record: dict[str, Any]) -> None:
+    lgr.info(
+        'phase %s took %.3f seconds%s',
+        record['phase'],
+        record['seconds'],
+        (
+            f', {record["bytes_per_second"]:.0f} bytes per second'
+            if 'bytes_per_second' in record
+            else ''
+        ),
+    )
+    metrics_file = get_config(metrics_file_config_key)
+    if not metrics_file:
+        return
+    line = json.dumps(record) + '\n'
+    try:
+        with _metrics_file_lock, open(metrics_file, 'a') as file:
+            file.write(line)
+    except OSError as e:
+        lgr.warning('could not write metrics to %s: %s', metrics_file, e)
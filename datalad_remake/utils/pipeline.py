@@ -0,0 +1,124 @@
+"""Staged execution of many computations
+
+Every computation goes through provisioning, execution, and collection. If
+computations are executed one after the other, or each by a single worker,
+CPUs are idle while inputs are fetched, and disks are idle while templates
+run. A `Pipeline` executes every stage in its own pool of worker threads,
+such that stages of different jobs overlap. Stages are connected by bounded
+queues. If a stage is slower than its predecessor, the predecessor blocks
+instead of accumulating finished work, e.g. provisioned worktrees.
+"""
+
+from __future__ import annotations
+
+import logging
+import queue
+import threading
+from concurrent.futures import Future
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    NamedTuple,
+)
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+lgr = logging.getLogger('datalad.remake.utils.pipeline')
+
+
+class Stage(NamedTuple):
+    """A stage of a pipeline
+
+    `function` is called with the job. Its return value is ignored, stages
+    communicate by modifying the job.
+    """
+
+    name: str
+    function: Callable[[Any], Any]
+    workers: int = 1
+
+
+class Pipeline:
+    """Pass jobs through stages with separate pools of worker threads
+
+    Workers are started with `start`, jobs are submitted with `submit`, which
+    returns a future that is resolved with the job after its last stage, or
+    with the exception of the stage that failed. A job that fails is not
+    passed to the following stages. `finalize` is called with every job after
+    it left the pipeline, e.g. to release resources that an earlier stage
+    acquired.
+    """
+
+    def __init__(
+        self,
+        stages: list[Stage],
+        queue_size: int = 1,
+        finalize: Callable[[Any], None] | None = None,
+    ):
+        self.stages = stages
+        self.finalize = finalize
+        self._queues: list[queue.Queue] = [
+            queue.Queue(maxsize=max(1, queue_size)) for _ in stages
+        ]
+        self._threads: list[threading.Thread] = []
+
+    def start(self) -> None:
+        """Start the workers of all stages"""
+        for index, stage in enumerate(self.stages):
+            for number in range(max(1, stage.workers)):
+                thread = threading.Thread(
+                    target=self._work,
+                    args=(index,),
+                    name=f'remake-{stage.name}-{number}',
+                    daemon=True,
+                )
+                thread.start()
+                self._threads.append(thread)
+
+    def stop(self) -> None:
+        """Process all submitted jobs and stop the workers"""
+        # Stop the stages in order, such that every stage finishes its
+        # queued jobs before its workers stop.
+        for index, stage in enumerate(self.stages):
+            for _ in range(max(1, stage.workers)):
+                self._queues[index].put(None)
+            for thread in self._threads:
+                if thread.name.startswith(f'remake-{stage.name}-'):
+                    thread.join()
+
+    def submit(self, job: Any) -> Future:
+        """Add `job` to the pipeline, block if the first stage is busy"""
+        future: Future = Future()
+        self._queues[0].put((job, future))
+        return future
+
+    def _work(self, index: int) -> None:
+        stage = self.stages[index]
+        while True:
+            item = self._queues[index].get()
+            if item is None:
+                return
+            job, future = item
+            try:
+                stage.function(job)
+            except BaseException as e:  # noqa: BLE001
+                lgr.debug('stage %s failed', stage.name, exc_info=True)
+                self._leave(job, future, e)
+                continue
+            if index + 1 < len(self.stages):
+                self._queues[index + 1].put(item)
+            else:
+                self._leave(job, future, None)
+
+    def _leave(self, job: Any, future: Future, error: BaseException | None) -> None:
+        try:
+            if self.finalize is not None:
+                self.finalize(job)
+        except Exception as e:  # noqa: BLE001
+            lgr.debug('finalizing job failed', exc_info=True)
+            error = error or e
+        if error is None:
+            future.set_result(job)
+        else:
+            future.set_exception(error)
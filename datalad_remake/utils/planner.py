@@ -0,0 +1,319 @@
+"""Plan chained computations as a dependency graph
+
+The inputs of a computation might be outputs of other computations, which are
+not present yet. Without planning, provisioning a worktree would retrieve them
+with `datalad get`, which starts another special remote in the worktree, that
+provisions another worktree, and so on, one input after the other.
+
+The planner resolves the dependency graph up front. Nodes of the graph are
+computations, identified by their fingerprints. Instructions that were
+registered on different commits, but read equal inputs, therefore share a
+node. For every node, the input patterns of the specification are
+matched against the annexed files of the root version. Inputs that are not
+present, and that are not stored on any other remote, but have a compute
+instruction, add a dependency on the node of the selected instruction. Inputs
+that are stored on another remote are retrieved from there during
+provisioning. Nodes are then executed in topological order, and
+independent nodes are executed concurrently. Results of intermediate nodes are
+stored in the annex, where later nodes find them.
+
+Inputs in subdatasets are not planned, they are retrieved during provisioning.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import subprocess
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Future,
+    ThreadPoolExecutor,
+    wait,
+)
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    NamedTuple,
+)
+
+from datalad_remake import (
+    PatternPath,
+    url_scheme,
+)
+from datalad_remake.utils.fingerprint import get_fingerprint
+from datalad_remake.utils.glob import PatternMatcher
+from datalad_remake.utils.instructions import (
+    Instruction,
+    get_compute_info,
+    read_specification,
+    select_instruction,
+)
+from datalad_remake.utils.trees import get_annexed_keys
+
+if TYPE_CHECKING:
+    from collections.abc import (
+        Callable,
+        Generator,
+        Iterable,
+    )
+    from pathlib import Path
+
+    from datalad_next.datasets import Dataset
+
+lgr = logging.getLogger('datalad.remake.utils.planner')
+
+
+class Request(NamedTuple):
+    """An annexed file that should be computed"""
+
+    path: Path
+    key: str
+    instruction: Instruction
+
+
+class Location(NamedTuple):
+    """Compute instructions and copies of an annex key
+
+    `stored` tells whether a copy exists on a remote other than the special
+    remote, i.e. whether the key can be retrieved without computation.
+    """
+
+    urls: list[str]
+    present: bool
+    stored: bool
+
+
+class Node:
+    """A computation in the dependency graph
+
+    Nodes are identified by the fingerprint of their computation, see
+    `datalad_remake.utils.fingerprint`. Instructions of different commits,
+    or of different specifications, with equal fingerprints share a node,
+    i.e. a single worktree and a single execution. `requests` are the files
+    that should be collected from the outputs of the computation,
+    `dependencies` are the ids of nodes that compute missing inputs.
+    """
+
+    def __init__(self, node_id: str, instruction: Instruction, spec: dict[str, Any]):
+        self.id = node_id
+        self.instruction = instruction
+        self.spec = spec
+        self.requests: list[Request] = []
+        self.dependencies: set[str] = set()
+
+
+class CyclicDependencyError(ValueError):
+    """The dependency graph contains a cycle"""
+
+
+class Plan:
+    """A dependency graph of computations"""
+
+    def __init__(self):
+        self.nodes: dict[str, Node] = {}
+
+    def __len__(self) -> int:
+        return len(self.nodes)
+
+    def execute(
+        self,
+        run_node: Callable[[Node], Any],
+        jobs: int = 1,
+    ) -> Generator[tuple[Node, Any, BaseException | None]]:
+        """Execute all nodes in topological order
+
+        `run_node` is called with every node, after all its dependencies
+        succeeded. Up to `jobs` nodes are executed concurrently. Yields
+        every node with the result of `run_node`, or with the exception that
+        it raised. Nodes with a failed dependency are not executed, they are
+        yielded with the exception of the dependency.
+        """
+        with ThreadPoolExecutor(max_workers=max(1, jobs)) as executor:
+            yield from self.schedule(lambda node: executor.submit(run_node, node))
+
+    def schedule(
+        self,
+        submit: Callable[[Node], Future],
+    ) -> Generator[tuple[Node, Any, BaseException | None]]:
+        """Submit all nodes in topological order
+
+        Like `execute`, but `submit` is called with every node that is ready,
+        and returns a future of its result. This allows executing nodes with
+        other executors, e.g. a `datalad_remake.utils.pipeline.Pipeline`.
+        """
+        remaining = dict(self.nodes)
+        done: set[str] = set()
+        failed: dict[str, BaseException] = {}
+        running: dict[Future, Node] = {}
+        while remaining or running:
+            for node_id, node in list(remaining.items()):
+                failures = [failed[d] for d in node.dependencies if d in failed]
+                if failures:
+                    del remaining[node_id]
+                    failed[node_id] = failures[0]
+                    yield node, None, failures[0]
+                elif node.dependencies <= done:
+                    del remaining[node_id]
+                    running[submit(node)] = node
+            if not running:
+                if remaining:
+                    msg = f'cyclic dependencies between {sorted(remaining)}'
+                    raise CyclicDependencyError(msg)
+                break
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                node = running.pop(future)
+                error = future.exception()
+                if error is None:
+                    done.add(node.id)
+                    yield node, future.result(), None
+                else:
+                    failed[node.id] = error
+                    yield node, None, error
+
+
+def plan(
+    dataset: Dataset,
+    requests: Iterable[Request],
+    priorities: list[str],
+    trusted_key_ids: list[str] | None,
+) -> Plan:
+    """Resolve the dependency graph of the computations of `requests`"""
+    result = Plan()
+    requested_keys: set[str] = set()
+    # Node ids of instructions, i.e. of root versions and specification names
+    node_ids: dict[tuple[str, str], str] = {}
+    # Instructions of the missing inputs of every node
+    dependency_instructions: dict[str, set[tuple[str, str]]] = {}
+    pending = list(requests)
+    while pending:
+        request = pending.pop()
+        instruction_id = request.instruction.root_version, request.instruction.spec_name
+        node_id = node_ids.get(instruction_id)
+        if node_id is None:
+            spec = read_specification(
+                dataset, request.instruction.spec_name, trusted_key_ids
+            )
+            node_id = get_fingerprint(
+                dataset.pathobj, get_compute_info(request.instruction, spec)
+            )
+            node_ids[instruction_id] = node_id
+            if node_id not in result.nodes:
+                result.nodes[node_id] = Node(node_id, request.instruction, spec)
+                missing_inputs = get_missing_inputs(
+                    dataset,
+                    request.instruction.root_version,
+                    [PatternPath(pattern) for pattern in spec['input']],
+                    priorities,
+                )
+                dependency_instructions[node_id] = {
+                    (
+                        dependency.instruction.root_version,
+                        dependency.instruction.spec_name,
+                    )
+                    for dependency in missing_inputs
+                }
+                pending.extend(
+                    dependency
+                    for dependency in missing_inputs
+                    if dependency.key not in requested_keys
+                )
+            else:
+                lgr.debug(
+                    'computation %s is equivalent to %s',
+                    instruction_id,
+                    result.nodes[node_id].instruction,
+                )
+        node = result.nodes[node_id]
+        if request.key not in requested_keys:
+            requested_keys.add(request.key)
+            node.requests.append(request)
+
+    # Dependencies are resolved at the end, because the node ids of
+    # instructions are only known after their specifications were read.
+    for node_id, instructions in dependency_instructions.items():
+        node = result.nodes[node_id]
+        node.dependencies = {node_ids[i] for i in instructions} - {node_id}
+    lgr.debug('planned %d computations', len(result))
+    return result
+
+
+def get_missing_inputs(
+    dataset: Dataset,
+    root_version: str,
+    input_patterns: Iterable[PatternPath],
+    priorities: list[str],
+) -> list[Request]:
+    """Get inputs of a computation that are not present but can be computed
+
+    Inputs that are stored on another remote are not included, retrieving
+    them is usually cheaper than computing them.
+    """
+    matcher = PatternMatcher(input_patterns)
+    inputs = {
+        key: path
+        for path, key in get_annexed_keys(dataset.pathobj, root_version).items()
+        if matcher.match(path)
+    }
+    missing = []
+    for key, location in get_key_locations(dataset.pathobj, inputs).items():
+        if not location.present and not location.stored and location.urls:
+            missing.append(
+                Request(
+                    dataset.pathobj / inputs[key],
+                    key,
+                    select_instruction(location.urls, priorities),
+                )
+            )
+    return missing
+
+
+def get_key_locations(
+    dataset_dir: Path,
+    keys: Iterable[str],
+) -> dict[str, Location]:
+    """Get the compute instructions and the copies of annex keys
+
+    Copies on untrusted remotes are not taken into account, `git annex
+    whereis` lists them separately.
+    """
+    keys = set(keys)
+    if not keys:
+        return {}
+    # `whereis` fails for keys without copies, errors are detected by keys
+    # without records.
+    command = ['git', 'annex', 'whereis', '--batch-keys', '--json']
+    result = subprocess.run(
+        command,
+        cwd=dataset_dir,
+        input=''.join(f'{key}\n' for key in keys),
+        capture_output=True,
+        text=True,
+        check=False,
+    )
+    locations = {}
+    for line in result.stdout.splitlines():
+        record = json.loads(line)
+        whereis = record.get('whereis', [])
+        urls = {
+            location['uuid']: [
+                url for url in location['urls'] if url.startswith(f'{url_scheme}:')
+            ]
+            for location in whereis
+        }
+        locations[record['key']] = Location(
+            [url for location_urls in urls.values() for url in location_urls],
+            any(location['here'] for location in whereis),
+            # The special remote is the remote that holds the compute
+            # instruction URLs.
+            any(
+                not location['here'] and not urls[location['uuid']]
+                for location in whereis
+            ),
+        )
+    if keys - locations.keys():
+        raise subprocess.CalledProcessError(
+            result.returncode, command, result.stdout, result.stderr
+        )
+    return locations
@@ -1,3 +1,34 @@
+from __future__ import annotations
+
+import os
 import platform
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from pathlib import Path
 
 on_windows = platform.system().lower() == 'windows'
+
+
+def is_process_alive(pid: int) -> bool:
+    """Check whether a process with the given PID exists on this host"""
+    if on_windows:
+        # `os.kill` would terminate the process on Windows, assume it is alive.
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def make_private_dir(directory: Path) -> bool:
+    """Create a directory that is only accessible by the current user
+
+    Returns `False`, if the directory already exists and belongs to another
+    user.
+    """
+    directory.mkdir(mode=0o700, parents=True, exist_ok=True)
+    return not hasattr(os, 'getuid') or directory.stat().st_uid == os.getuid()
@@ -0,0 +1,104 @@
+"""Progress of computations and of the collection of their results
+
+A method template can declare a regular expression in `progress`. Every line
+that the command writes to stdout is matched against it. The expression must
+either contain a group named `percent`, e.g.::
+
+    progress = '^(?P<percent>[0-9.]+)% done'
+
+or two groups named `done` and `total`, e.g.::
+
+    progress = '^step (?P<done>\\d+) of (?P<total>\\d+)'
+
+Matching lines are reported as a fraction between `0.0` and `1.0`.
+"""
+
+from __future__ import annotations
+
+import logging
+import re
+from typing import (
+    IO,
+    TYPE_CHECKING,
+    Any,
+)
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+    from pathlib import Path
+
+lgr = logging.getLogger('datalad.remake.utils.progress')
+
+
+# Size of the chunks in which results are copied
+copy_chunk_size = 1024 * 1024
+
+
+class ProgressParser:
+    """Extract the progress of a command from its output lines"""
+
+    def __init__(self, pattern: str):
+        self.pattern = re.compile(pattern)
+        groups = set(self.pattern.groupindex)
+        if 'percent' not in groups and not {'done', 'total'} <= groups:
+            msg = (
+                f'Progress expression {pattern!r} must contain a group named '
+                '"percent", or groups named "done" and "total"'
+            )
+            raise ValueError(msg)
+
+    def parse(self, line: str) -> float | None:
+        """Get the progress in `line` as fraction, `None` if there is none"""
+        match = self.pattern.search(line)
+        if match is None:
+            return None
+        try:
+            if 'percent' in self.pattern.groupindex:
+                fraction = float(match['percent']) / 100
+            else:
+                fraction = float(match['done']) / float(match['total'])
+        except (TypeError, ValueError, ZeroDivisionError):
+            return None
+        return min(max(fraction, 0.0), 1.0)
+
+
+def follow_output(
+    output: IO[bytes],
+    parser: ProgressParser,
+    progress: Callable[[float], Any],
+    copy_to: IO[bytes] | None = None,
+) -> None:
+    """Report the progress in the lines of `output`, optionally copy them
+
+    `progress` is only called, if the progress changed.
+    """
+    last_fraction = None
+    for line in output:
+        if copy_to is not None:
+            copy_to.write(line)
+        fraction = parser.parse(line.decode(errors='replace'))
+        if fraction is not None and fraction != last_fraction:
+            last_fraction = fraction
+            progress(fraction)
+
+
+def copy_with_progress(
+    source: Path,
+    destination: Path | str,
+    progress: Callable[[int], Any] | None = None,
+) -> int:
+    """Copy `source` to `destination`, report the number of copied bytes
+
+    Returns the number of copied bytes.
+    """
+    copied = 0
+    with open(source, 'rb') as reader, open(destination, 'wb') as writer:
+        while True:
+            chunk = reader.read(copy_chunk_size)
+            if not chunk:
+                break
+            writer.write(chunk)
+            copied += len(chunk)
+            if progress is not None:
+                progress(copied)
+    return copied
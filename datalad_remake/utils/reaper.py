@@ -0,0 +1,143 @@
+"""Background removal of provisioned worktrees
+
+Removing a large worktree can take a long time. To avoid blocking `datalad
+make` and the special remote, the worktree is removed by a detached reaper
+process, i.e. by running this module as a script. The reaper performs the
+same steps as a removal in the foreground: it drops the worktree, removes its
+git metadata and its branch from the dataset, and releases its lease. The
+space of the worktree therefore stays reserved until it is deleted.
+
+The reaper also collects garbage that was left behind by crashed runs in the
+scratch directories it visits: worktrees whose lease names a process on this
+host that does not exist anymore. A provisioned worktree is private: its root
+either shares the annex of the source dataset via `git worktree`, in which
+case it only contains symlinks, or it is a fresh clone. All subdatasets are
+fresh clones. Therefore, orphaned trees are deleted directly without
+involving git-annex.
+"""
+
+from __future__ import annotations
+
+import logging
+import shutil
+import socket
+import stat
+import subprocess
+import sys
+from pathlib import Path
+
+from datalad_remake.utils.platform import (
+    is_process_alive,
+    on_windows,
+)
+from datalad_remake.utils.scratch import (
+    lease_suffix,
+    read_lease,
+    remove_lease,
+    worktree_prefix,
+    write_lease,
+)
+
+lgr = logging.getLogger('datalad.remake.utils.reaper')
+
+
+def start_reaper(dataset: Path, worktree: Path) -> None:
+    """Remove `worktree` of `dataset` in a detached background process"""
+    kwargs: dict = (
+        {'creationflags': subprocess.DETACHED_PROCESS}  # type: ignore[attr-defined]
+        if on_windows
+        else {'start_new_session': True}
+    )
+    process = subprocess.Popen(  # noqa: S603
+        [
+            sys.executable,
+            '-m',
+            'datalad_remake.utils.reaper',
+            str(dataset),
+            str(worktree),
+        ],
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        **kwargs,
+    )
+    # The reaper owns the worktree now. It must not be collected as an orphan,
+    # when the calling process exits before the reaper finished.
+    lease = read_lease(worktree)
+    if lease is not None and lease.get('pid') is not None:
+        write_lease(worktree, lease.get('size', 0), process.pid)
+
+
+def reap(dataset: Path, worktree: Path) -> None:
+    """Remove `worktree` of `dataset`, and collect garbage next to it"""
+    # Imported here, because `provision_cmd` starts the reaper
+    from datalad_next.datasets import Dataset
+
+    from datalad_remake.commands.provision_cmd import remove
+
+    try:
+        remove(Dataset(dataset), Dataset(worktree))
+    finally:
+        collect_garbage(worktree.parent)
+
+
+def collect_garbage(scratch_dir: Path) -> None:
+    """Remove orphaned worktrees of crashed runs from `scratch_dir`"""
+    for lease_file in scratch_dir.glob(f'{worktree_prefix}*{lease_suffix}'):
+        worktree = lease_file.with_suffix('')
+        lease = read_lease(worktree)
+        if (
+            lease is None
+            or lease.get('pid') is None
+            or lease.get('host') != socket.gethostname()
+            or is_process_alive(lease['pid'])
+        ):
+            continue
+        lgr.debug('Removing orphaned worktree %s', worktree)
+        git_dir = _get_common_git_dir(worktree)
+        force_rmtree(worktree)
+        remove_lease(worktree)
+        if git_dir is not None:
+            # Remove the worktree metadata and the branch in the dataset
+            # from which the worktree was provisioned.
+            for args in (['worktree', 'prune'], ['branch', '-d', worktree.name]):
+                subprocess.run(  # noqa: S603
+                    ['git', f'--git-dir={git_dir}', *args],  # noqa: S607
+                    capture_output=True,
+                    check=False,
+                )
+
+
+def force_rmtree(path: Path) -> None:
+    """Remove a directory tree, including write-protected annex objects"""
+
+    def make_writable_and_retry(function, failed_path, *_):
+        # Only directories are made writable, removing a file depends on the
+        # permissions of its directory, not on the permissions of the file.
+        for p in (Path(failed_path).parent, Path(failed_path)):
+            if p.is_dir() and not p.is_symlink():
+                p.chmod(p.stat().st_mode | stat.S_IWUSR | stat.S_IXUSR)
+        function(failed_path)
+
+    if not path.exists():
+        return
+    if sys.version_info >= (3, 12):
+        shutil.rmtree(path, onexc=make_writable_and_retry)
+    else:
+        shutil.rmtree(path, onerror=make_writable_and_retry)
+
+
+def _get_common_git_dir(worktree: Path) -> Path | None:
+    """Get the git directory of the dataset from which `worktree` was created"""
+    git_file = worktree / '.git'
+    if not git_file.is_file():
+        return None
+    content = git_file.read_text().strip()
+    if not content.startswith('gitdir:'):
+        return None
+    # The worktree git dir is `<common git dir>/worktrees/<name>`
+    return Path(content[len('gitdir:') :].strip()).parent.parent
+
+
+if __name__ == '__main__':
+    reap(Path(sys.argv[1]), Path(sys.argv[2]))
@@ -0,0 +1,339 @@
+"""Enforce resources that are declared in method templates
+
+A method template can declare the following resources:
+
+- `cpus`: the number of CPUs. The command is pinned to this number of CPUs,
+  where supported, and thread pools of common numeric libraries are limited
+  to the same number of threads, e.g. via `OMP_NUM_THREADS`.
+- `memory`: the maximum size of the address space of the command, either in
+  bytes or with a suffix, e.g. `'4G'`. This is enforced with `RLIMIT_AS`,
+  where supported.
+- `walltime`: the maximum runtime of the command, either in seconds, or with
+  one of the suffixes `s`, `m`, `h`, or `d`, e.g. `'2h'`. If the runtime is
+  exceeded, the process group of the command is killed.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import logging
+import os
+import re
+import signal
+import subprocess
+import sys
+import threading
+import time
+from typing import (
+    IO,
+    TYPE_CHECKING,
+    Any,
+)
+
+from datalad_remake.utils.size import parse_size
+
+if TYPE_CHECKING:
+    from collections.abc import (
+        Callable,
+        Generator,
+    )
+
+lgr = logging.getLogger('datalad.remake.utils.resources')
+
+
+# Environment variables that limit the number of threads of common numeric
+# libraries.
+thread_variables = (
+    'OMP_NUM_THREADS',
+    'MKL_NUM_THREADS',
+    'OPENBLAS_NUM_THREADS',
+    'BLIS_NUM_THREADS',
+    'NUMEXPR_NUM_THREADS',
+    'VECLIB_MAXIMUM_THREADS',
+)
+
+# Seconds between SIGTERM and SIGKILL, when a command exceeds its walltime
+kill_grace_period = 10
+
+# Number of trailing bytes of stderr that are attached to errors of commands
+stderr_tail_size = 4096
+
+# Seconds to wait for the end of stderr after a command exited. Processes
+# that the command started in the background might keep stderr open.
+stderr_drain_timeout = 5
+
+_duration_matcher = re.compile(r'^\s*(\d+(?:\.\d+)?)\s*([smhd]?)\s*$', re.IGNORECASE)
+
+_duration_multipliers = {
+    '': 1,
+    's': 1,
+    'm': 60,
+    'h': 3600,
+    'd': 86400,
+}
+
+# CPUs that are assigned to running commands of this process
+_assigned_cpus: dict[int, int] = {}
+_assigned_cpus_lock = threading.Lock()
+
+
+def parse_duration(duration: str | float) -> float:
+    """Convert a duration specification like `'90'` or `'2h'` into seconds"""
+    if isinstance(duration, (int, float)):
+        return float(duration)
+    match = _duration_matcher.match(duration)
+    if match is None:
+        msg = f'Invalid duration specification: {duration!r}'
+        raise ValueError(msg)
+    return float(match[1]) * _duration_multipliers[match[2].lower()]
+
+
+class Resources:
+    """Resources that a command may use"""
+
+    def __init__(
+        self,
+        cpus: int | None = None,
+        memory: int | None = None,
+        walltime: float | None = None,
+    ):
+        if cpus is not None and cpus < 1:
+            msg = f'Invalid number of cpus: {cpus}'
+            raise ValueError(msg)
+        self.cpus = cpus
+        self.memory = memory
+        self.walltime = walltime
+
+    @classmethod
+    def from_template(cls, template: dict[str, Any]) -> Resources:
+        """Read the resources that are declared in a method template"""
+        cpus = template.get('cpus')
+        memory = template.get('memory')
+        walltime = template.get('walltime')
+        return cls(
+            cpus=None if cpus is None else int(cpus),
+            memory=None if memory is None else parse_size(memory),
+            walltime=None if walltime is None else parse_duration(walltime),
+        )
+
+    def environment(self) -> dict[str, str] | None:
+        """Get the environment for the command, `None` means unchanged"""
+        if self.cpus is None:
+            return None
+        return {
+            **os.environ,
+            **{variable: str(self.cpus) for variable in thread_variables},
+        }
+
+    @contextlib.contextmanager
+    def reserve_cpus(self) -> Generator[set[int] | None, None, None]:
+        """Select CPUs for a command
+
+        CPUs that are not yet assigned to another command of this process are
+        preferred. The context yields `None`, if no CPUs are declared or if
+        CPU affinity is not supported on this platform.
+        """
+        if self.cpus is None or not hasattr(os, 'sched_getaffinity'):
+            yield None
+            return
+
+        available = sorted(os.sched_getaffinity(0))
+        with _assigned_cpus_lock:
+            # Prefer the least used CPUs
+            available.sort(key=lambda cpu: _assigned_cpus.get(cpu, 0))
+            selected = set(available[: self.cpus])
+            for cpu in selected:
+                _assigned_cpus[cpu] = _assigned_cpus.get(cpu, 0) + 1
+        try:
+            yield selected
+        finally:
+            with _assigned_cpus_lock:
+                for cpu in selected:
+                    _assigned_cpus[cpu] -= 1
+                    if _assigned_cpus[cpu] == 0:
+                        del _assigned_cpus[cpu]
+
+    def limiter(self, cpus: set[int] | None) -> Callable[[], None] | None:
+        """Get a function that applies CPU affinity and memory limit
+
+        The function is meant to be passed as `preexec_fn` to
+        `subprocess.Popen`. It runs in the child process before the command
+        is executed, therefore the limits are in place before the command
+        starts any processes, and they are inherited by all of them. The
+        function only performs system calls, which are safe in the child of
+        a process with threads. Returns `None`, if there is nothing to apply.
+        """
+        if not hasattr(os, 'sched_setaffinity'):
+            cpus = None
+
+        set_memory_limit = None
+        if self.memory is not None:
+            try:
+                import resource
+            except ImportError:
+                lgr.debug('could not limit memory: not supported on this platform')
+            else:
+                limit = (self.memory, self.memory)
+
+                def set_memory_limit() -> None:
+                    resource.setrlimit(resource.RLIMIT_AS, limit)
+
+        if cpus is None and set_memory_limit is None:
+            return None
+
+        def apply() -> None:
+            # Errors are ignored, the command runs without the limit then.
+            if cpus is not None:
+                with contextlib.suppress(OSError):
+                    os.sched_setaffinity(0, cpus)
+            if set_memory_limit is not None:
+                with contextlib.suppress(OSError, ValueError):
+                    set_memory_limit()
+
+        return apply
+
+
+def run_command(
+    command: list[str],
+    resources: Resources,
+    output_handler: Callable[[IO[bytes]], Any] | None = None,
+    *,
+    capture_stderr: bool = False,
+    **kwargs,
+) -> int | None:
+    """Run `command` with `resources` and raise on failure
+
+    Keyword arguments are passed to `subprocess.Popen`. A
+    `subprocess.CalledProcessError` is raised if the command fails, and a
+    `subprocess.TimeoutExpired` is raised if it exceeds its walltime.
+
+    If `output_handler` is given, stdout of the command is piped, and
+    `output_handler` is called with the pipe in a separate thread. If
+    `capture_stderr` is set, stderr of the command is piped and forwarded to
+    stderr of this process, and its last `stderr_tail_size` bytes are attached
+    to the `subprocess.CalledProcessError`.
+
+    Returns the peak memory usage of the command in bytes, or `None`, if it
+    cannot be determined on this platform.
+    """
+    if output_handler is not None:
+        kwargs['stdout'] = subprocess.PIPE
+    if capture_stderr:
+        kwargs['stderr'] = subprocess.PIPE
+    stderr_tail = bytearray()
+    with resources.reserve_cpus() as cpus:
+        process = subprocess.Popen(  # noqa: S603
+            command,
+            env=resources.environment(),
+            # A new session allows to kill the command and all its
+            # sub-processes on timeout.
+            start_new_session=True,
+            preexec_fn=resources.limiter(cpus),  # noqa: PLW1509
+            **kwargs,
+        )
+        reader = None
+        if output_handler is not None:
+            reader = threading.Thread(
+                target=output_handler,
+                args=(process.stdout,),
+                daemon=True,
+            )
+            reader.start()
+        forwarder = None
+        if process.stderr is not None:
+            forwarder = threading.Thread(
+                target=_forward_stderr,
+                args=(process.stderr, stderr_tail),
+                daemon=True,
+            )
+            forwarder.start()
+        try:
+            return_code, peak_memory = _wait(process, resources.walltime)
+        except subprocess.TimeoutExpired:
+            lgr.warning(
+                'command exceeded walltime of %s seconds, killing it: %s',
+                resources.walltime,
+                command,
+            )
+            kill_process_group(process)
+            raise
+        except BaseException:
+            kill_process_group(process)
+            raise
+        finally:
+            if reader is not None:
+                reader.join()
+            if process.stdout is not None:
+                process.stdout.close()
+            if forwarder is not None:
+                forwarder.join(timeout=stderr_drain_timeout)
+    if return_code != 0:
+        raise subprocess.CalledProcessError(
+            return_code, command, stderr=bytes(stderr_tail) or None
+        )
+    return peak_memory
+
+
+def _forward_stderr(source: IO[bytes], tail: bytearray) -> None:
+    """Copy `source` to stderr of this process and keep its tail in `tail`"""
+    with source:
+        while True:
+            chunk = os.read(source.fileno(), 65536)
+            if not chunk:
+                return
+            tail.extend(chunk)
+            del tail[:-stderr_tail_size]
+            # Write to the file descriptor, like the command would have done,
+            # `sys.stderr` might be replaced.
+            with contextlib.suppress(OSError):
+                view = memoryview(chunk)
+                while view:
+                    view = view[os.write(2, view) :]
+
+
+def _wait(
+    process: subprocess.Popen,
+    timeout: float | None,
+) -> tuple[int, int | None]:
+    """Wait for `process` and get its exit code and its peak memory usage"""
+    if not hasattr(os, 'wait4'):
+        return process.wait(timeout=timeout), None
+
+    if timeout is None:
+        _, status, usage = os.wait4(process.pid, 0)
+    else:
+        # Poll like `subprocess.Popen.wait`, but use `wait4` to get the
+        # resource usage of the process.
+        deadline = time.monotonic() + timeout
+        delay = 0.0005
+        while True:
+            pid, status, usage = os.wait4(process.pid, os.WNOHANG)
+            if pid == process.pid:
+                break
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise subprocess.TimeoutExpired(process.args, timeout)
+            time.sleep(min(delay, remaining))
+            delay = min(delay * 2, 0.05)
+
+    process.returncode = os.waitstatus_to_exitcode(status)
+    # `ru_maxrss` is given in bytes on macOS and in KiB elsewhere.
+    scale = 1 if sys.platform == 'darwin' else 1024
+    return process.returncode, usage.ru_maxrss * scale
+
+
+def kill_process_group(process: subprocess.Popen) -> None:
+    """Terminate the process group of `process`, kill it, if necessary"""
+    if not hasattr(os, 'killpg'):
+        process.kill()
+        process.wait()
+        return
+
+    with contextlib.suppress(ProcessLookupError):
+        os.killpg(process.pid, signal.SIGTERM)
+    with contextlib.suppress(subprocess.TimeoutExpired):
+        process.wait(timeout=kill_grace_period)
+    # Kill remaining processes of the group, even if the leader has exited.
+    with contextlib.suppress(ProcessLookupError):
+        os.killpg(process.pid, signal.SIGKILL)
+    process.wait()
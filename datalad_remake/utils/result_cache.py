@@ -0,0 +1,148 @@
+"""Result cache that is shared by several clones of a dataset
+
+If `datalad.make.cache-dir` is set, the special remote stores the outputs of
+every computation in this directory, keyed by the fingerprint of the
+computation, see `datalad_remake.utils.fingerprint`. Before a computation is
+executed, the special remote looks up its fingerprint. If the outputs are
+cached, the requested file is hard linked, or copied, from the cache, and the
+computation is skipped. Clones of the same dataset, e.g. of different users on
+the same file server, thereby compute every file only once.
+
+Entries are directories that contain the outputs at their paths relative to
+the dataset. They are written to a temporary directory first, and published
+by renaming it, such that readers never see incomplete entries. Outputs that
+an existing entry lacks, e.g. because an earlier computation produced fewer
+files, are added to it one by one, by renaming them into the entry. A
+computation holds an `fcntl`-lock on its entry until the entry is published.
+Concurrent computations with the same fingerprint wait for the lock, and find
+the published entry afterwards.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import logging
+import os
+import shutil
+import uuid
+from pathlib import Path
+from typing import (
+    TYPE_CHECKING,
+    Any,
+)
+
+from datalad_remake.utils.locking import (
+    file_lock,
+    locking_supported,
+)
+
+if TYPE_CHECKING:
+    from collections.abc import (
+        Callable,
+        Iterable,
+    )
+
+lgr = logging.getLogger('datalad.remake.utils.result_cache')
+
+
+class ResultCache:
+    """A directory of computation outputs, keyed by fingerprints"""
+
+    def __init__(self, directory: Path):
+        self.directory = directory
+
+    @classmethod
+    def from_directory(cls, directory: str | None) -> ResultCache | None:
+        """Create a cache in `directory`
+
+        Returns `None`, if no directory is given, or if file locking is not
+        supported on this platform.
+        """
+        if not directory:
+            return None
+        if not locking_supported:
+            lgr.warning('the result cache is not supported on this platform')
+            return None
+        return cls(Path(directory))
+
+    def get_entry(self, fingerprint: str) -> Path:
+        """Get the directory of the entry for `fingerprint`"""
+        return self.directory / fingerprint[:2] / fingerprint
+
+    def fetch(self, fingerprint: str, path: Path | str, destination: Path | str) -> int:
+        """Link or copy the cached output `path` to `destination`
+
+        Returns the number of bytes of the output, or `-1`, if it is not
+        cached.
+        """
+        source = self.get_entry(fingerprint) / path
+        if not source.is_file():
+            return -1
+        link_or_copy(source, Path(destination))
+        lgr.debug('fetched %s from cache entry %s', path, fingerprint)
+        return source.stat().st_size
+
+    def publish(
+        self,
+        fingerprint: str,
+        source_dir: Path,
+        paths: Iterable[Path | str],
+    ) -> None:
+        """Publish the files `paths` in `source_dir` as entry `fingerprint`
+
+        If the entry exists, the files that it lacks are added to it, files
+        in the entry are not modified. The caller must hold the lock of the
+        entry, see `locked`.
+        """
+        entry = self.get_entry(fingerprint)
+        exists = entry.exists()
+        temporary_dir = self.directory / 'tmp' / f'{fingerprint}.{uuid.uuid4().hex}'
+        try:
+            added = [path for path in paths if not (exists and (entry / path).exists())]
+            for path in added:
+                destination = temporary_dir / path
+                destination.parent.mkdir(parents=True, exist_ok=True)
+                link_or_copy(source_dir / path, destination)
+            if not exists:
+                temporary_dir.mkdir(parents=True, exist_ok=True)
+                entry.parent.mkdir(parents=True, exist_ok=True)
+                temporary_dir.rename(entry)
+                lgr.debug('published cache entry %s', fingerprint)
+                return
+            for path in added:
+                (entry / path).parent.mkdir(parents=True, exist_ok=True)
+                (temporary_dir / path).rename(entry / path)
+            if added:
+                lgr.debug('added %d files to cache entry %s', len(added), fingerprint)
+        except OSError as e:
+            # Another writer published the entry first, or the cache is not
+            # writable. Neither prevents the computation from succeeding.
+            lgr.debug('could not publish cache entry %s: %s', fingerprint, e)
+        finally:
+            shutil.rmtree(temporary_dir, ignore_errors=True)
+
+    def locked(
+        self,
+        fingerprint: str,
+        notify: Callable[[str], Any] | None = None,
+    ) -> contextlib.AbstractContextManager[None]:
+        """Hold the lock of entry `fingerprint`
+
+        `notify` is called with a message, if the lock is held by another
+        computation.
+        """
+        return file_lock(
+            self.directory / fingerprint[:2] / f'{fingerprint}.lock',
+            f'waiting for a concurrent computation of {fingerprint}',
+            notify,
+        )
+
+
+def link_or_copy(source: Path, destination: Path) -> None:
+    """Hard link `source` to `destination`, copy it, if linking fails"""
+    with contextlib.suppress(FileNotFoundError):
+        destination.unlink()
+    try:
+        os.link(source, destination)
+    except OSError:
+        shutil.copyfile(source, destination)
@@ -0,0 +1,202 @@
+"""Select a scratch location for provisioned worktrees
+
+Candidate directories are read from the configuration variable
+`datalad.make.scratch-dirs`, a comma-separated list in order of preference,
+e.g. a tmpfs, a local NVMe disk, and a shared file system. The first candidate
+that has enough free space for the estimated input and output volume, and
+whose per-host quota (`datalad.make.scratch-quota`) is not exceeded, is used.
+If no candidate is configured, the system temporary directory is used.
+
+The volume of a worktree is reserved by a lease file next to it. Concurrent
+processes check the quota and write their lease while they hold a lock of the
+scratch directory, such that they do not exceed the quota together.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import re
+import shutil
+import socket
+import tempfile
+import uuid
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from datalad_remake import (
+    scratch_dirs_config_key,
+    scratch_quota_config_key,
+    scratch_reserve_config_key,
+)
+from datalad_remake.utils.glob import resolve_patterns
+from datalad_remake.utils.locking import file_lock
+from datalad_remake.utils.size import parse_size
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+
+    from datalad_next.datasets import Dataset
+
+    from datalad_remake import PatternPath
+
+lgr = logging.getLogger('datalad.remake.utils.scratch')
+
+worktree_prefix = 'datalad-remake-'
+lease_suffix = '.lease'
+
+# Name of the lock file in a scratch directory, it does not match the names
+# of worktrees or leases.
+lock_name = 'datalad-remake.lock'
+
+_annex_key_size_matcher = re.compile(r'-s(\d+)-')
+
+
+def get_worktree_dir(
+    dataset: Dataset,
+    input_patterns: Iterable[PatternPath] = (),
+    output_patterns: Iterable[PatternPath] = (),
+    *,
+    transient: bool = False,
+) -> Path:
+    """Get a fresh, not yet existing, path for a provisioned worktree
+
+    Parameters
+    ----------
+    dataset: Dataset
+        Dataset that will be provisioned, it is used as configuration source
+        and to estimate the volume of inputs and outputs.
+    input_patterns: Iterable[PatternPath]
+        Input patterns of the computation.
+    output_patterns: Iterable[PatternPath]
+        Output patterns of the computation.
+    transient: bool
+        If `True`, the worktree is owned by the current process, and it may be
+        garbage collected if the process does not exist anymore.
+
+    Returns
+    -------
+    Path
+        A path in the selected scratch directory. A lease file that records
+        the estimated size and the owner is created next to it.
+    """
+    owner = os.getpid() if transient else None
+    setting = dataset.config.get(scratch_dirs_config_key) or ''
+    candidates = [
+        Path(candidate.strip()).expanduser()
+        for candidate in setting.split(',')
+        if candidate.strip()
+    ]
+    if not candidates:
+        worktree_dir = _unique_path(Path(tempfile.gettempdir()))
+        write_lease(worktree_dir, 0, owner)
+        return worktree_dir
+
+    quota = _get_size_config(dataset, scratch_quota_config_key)
+    reserve = _get_size_config(dataset, scratch_reserve_config_key) or 0
+    estimate = estimate_size(dataset.pathobj, [*input_patterns, *output_patterns])
+
+    for candidate in candidates:
+        try:
+            candidate.mkdir(parents=True, exist_ok=True)
+            free = shutil.disk_usage(candidate).free
+        except OSError as e:
+            lgr.debug('Ignoring unusable scratch directory %s: %s', candidate, e)
+            continue
+        if free < estimate + reserve:
+            lgr.debug(
+                'Skipping scratch directory %s: free: %d, required: %d',
+                candidate,
+                free,
+                estimate + reserve,
+            )
+            continue
+        with file_lock(candidate / lock_name):
+            if quota is not None and get_leased_size(candidate) + estimate > quota:
+                lgr.debug('Skipping scratch directory %s: quota exceeded', candidate)
+                continue
+            worktree_dir = _unique_path(candidate)
+            write_lease(worktree_dir, estimate, owner)
+        lgr.debug('Using scratch directory %s for %s', candidate, worktree_dir)
+        return worktree_dir
+
+    lgr.warning(
+        'No configured scratch directory can hold an estimated %d bytes, '
+        'falling back to %s',
+        estimate,
+        tempfile.gettempdir(),
+    )
+    worktree_dir = _unique_path(Path(tempfile.gettempdir()))
+    write_lease(worktree_dir, estimate, owner)
+    return worktree_dir
+
+
+def estimate_size(root_dir: Path, patterns: Iterable[PatternPath]) -> int:
+    """Estimate the volume of the files that match `patterns` in `root_dir`
+
+    The size of annexed files is read from their annex key, so their content
+    does not have to be present. Files in uninstalled subdatasets are not
+    taken into account.
+    """
+    total = 0
+    for match in resolve_patterns(root_dir=root_dir, patterns=patterns):
+        path = root_dir / match
+        if path.is_symlink():
+            key_size = _annex_key_size_matcher.search(os.readlink(path))
+            if key_size is not None:
+                total += int(key_size[1])
+                continue
+        try:
+            total += path.stat().st_size
+        except OSError:
+            continue
+    return total
+
+
+def write_lease(worktree_dir: Path, size: int, pid: int | None) -> None:
+    """Record the owner and the estimated size of a worktree
+
+    If `pid` is `None`, the worktree is not owned by a process and will not
+    be garbage collected.
+    """
+    _lease_path(worktree_dir).write_text(
+        json.dumps({'host': socket.gethostname(), 'pid': pid, 'size': size})
+    )
+
+
+def read_lease(worktree_dir: Path) -> dict | None:
+    try:
+        return json.loads(_lease_path(worktree_dir).read_text())
+    except (OSError, ValueError):
+        return None
+
+
+def remove_lease(worktree_dir: Path) -> None:
+    _lease_path(worktree_dir).unlink(missing_ok=True)
+
+
+def get_leased_size(scratch_dir: Path) -> int:
+    """Get the leased volume of all worktrees of this host in `scratch_dir`"""
+    host = socket.gethostname()
+    total = 0
+    for lease_file in scratch_dir.glob(f'{worktree_prefix}*{lease_suffix}'):
+        lease = read_lease(lease_file.with_suffix(''))
+        if lease is not None and lease.get('host') == host:
+            total += lease.get('size', 0)
+    return total
+
+
+def _lease_path(worktree_dir: Path) -> Path:
+    return worktree_dir.with_name(worktree_dir.name + lease_suffix)
+
+
+def _unique_path(scratch_dir: Path) -> Path:
+    return (
+        scratch_dir / f'{worktree_prefix}{socket.gethostname()}-{uuid.uuid4().hex}'
+    ).absolute()
+
+
+def _get_size_config(dataset: Dataset, key: str) -> int | None:
+    value = dataset.config.get(key)
+    return None if value is None else parse_size(value)
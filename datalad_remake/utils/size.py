@@ -0,0 +1,29 @@
+from __future__ import annotations
+
+import re
+
+_size_matcher = re.compile(r'^\s*(\d+(?:\.\d+)?)\s*([kmgtp]?)i?b?\s*$', re.IGNORECASE)
+
+_multipliers = {
+    '': 1,
+    'k': 1024,
+    'm': 1024**2,
+    'g': 1024**3,
+    't': 1024**4,
+    'p': 1024**5,
+}
+
+
+def parse_size(size: str | int) -> int:
+    """Convert a size specification like `'500M'` or `'2GiB'` into bytes
+
+    Suffixes are interpreted as powers of 1024. Plain numbers, or numbers with
+    a `B` suffix, are interpreted as bytes.
+    """
+    if isinstance(size, int):
+        return size
+    match = _size_matcher.match(size)
+    if match is None:
+        msg = f'Invalid size specification: {size!r}'
+        raise ValueError(msg)
+    return int(float(match[1]) * _multipliers[match[2].lower()])
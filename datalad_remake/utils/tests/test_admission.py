@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+from datalad_core.config import ConfigItem
+
+from datalad_remake import (
+    admission_dir_config_key,
+    cpu_budget_config_key,
+)
+
+from .. import admission
+from ..admission import AdmissionController
+from ..platform import on_windows
+from ..resources import Resources
+
+pytestmark = pytest.mark.skipif(on_windows, reason='requires fcntl')
+
+
+def test_from_config(tmp_path, cfgman):
+    with cfgman.overrides(
+        {
+            cpu_budget_config_key: ConfigItem('4'),
+            admission_dir_config_key: ConfigItem(str(tmp_path)),
+        }
+    ):
+        controller = AdmissionController.from_config()
+    assert controller is not None
+    assert controller.cpu_budget == 4
+    assert controller.memory_budget is None
+    assert controller.directory == tmp_path
+
+
+def test_private_default_dir(tmp_path, cfgman, monkeypatch):
+    directory = tmp_path / 'admission'
+    monkeypatch.setattr(admission, 'get_default_admission_dir', lambda: directory)
+    with cfgman.overrides(
+        {
+            cpu_budget_config_key: ConfigItem('4'),
+            admission_dir_config_key: ConfigItem(''),
+        }
+    ):
+        controller = AdmissionController.from_config()
+        assert controller is not None
+        assert controller.directory == directory
+        assert directory.stat().st_mode & 0o777 == 0o700
+
+        # The directory was created by another user
+        monkeypatch.setattr(os, 'getuid', lambda: directory.stat().st_uid + 1)
+        assert AdmissionController.from_config() is None
+
+
+def test_queueing(tmp_path):
+    controller = AdmissionController(tmp_path, cpu_budget=2)
+    events = []
+    messages = []
+
+    def run(name, cpus):
+        with controller.admitted(cpus, 0, messages.append):
+            events.append(f'start {name}')
+            time.sleep(0.5)
+            events.append(f'end {name}')
+
+    with controller.admitted(2, 0):
+        # Both jobs have to wait, the second job has to wait for the first
+        threads = [
+            threading.Thread(target=run, args=('a', 2)),
+            threading.Thread(target=run, args=('b', 1)),
+        ]
+        threads[0].start()
+        time.sleep(0.2)
+        threads[1].start()
+        time.sleep(0.2)
+        assert events == []
+    for thread in threads:
+        thread.join()
+    assert events == ['start a', 'end a', 'start b', 'end b']
+    assert any('position 2' in message for message in messages)
+
+
+def test_oversized_job_is_admitted(tmp_path):
+    controller = AdmissionController(tmp_path, cpu_budget=1, memory_budget=1000)
+    with controller.admitted(8, 10000):
+        pass
+
+
+def test_dead_jobs_are_removed(tmp_path):
+    controller = AdmissionController(tmp_path, cpu_budget=1)
+    process = subprocess.Popen([sys.executable, '-c', 'pass'])
+    process.wait()
+    ticket = controller._enqueue(1, 0)
+    with controller._locked():
+        state = controller._read_state()
+        state['jobs'][str(ticket)].update(pid=process.pid, running=True)
+        controller._write_json(controller.state_file, state)
+
+    with controller.admitted(1, 0):
+        pass
+
+
+def test_historical_memory(tmp_path):
+    controller = AdmissionController(tmp_path, memory_budget=1000)
+    assert controller.estimate_memory('abc', Resources()) == 0
+    controller.record_usage('abc', 300)
+    controller.record_usage('abc', 200)
+    assert controller.estimate_memory('abc', Resources()) == 300
+    assert controller.estimate_memory('abc', Resources(memory=100)) == 100
@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+import os
+import subprocess
+
+from datalad_remake import PatternPath
+
+from ..changes import (
+    get_changes,
+    take_snapshot,
+)
+
+
+def _git(path, *args):
+    subprocess.run(['git', *args], cwd=path, check=True, capture_output=True)
+
+
+def test_changes(tmp_path):
+    _git(tmp_path, 'init')
+    (tmp_path / 'tracked.txt').write_text('tracked')
+    (tmp_path / 'modified.txt').write_text('modified')
+    (tmp_path / 'd1').mkdir()
+    (tmp_path / 'd1' / 'clean.txt').write_text('clean')
+    _git(tmp_path, 'add', '.')
+    _git(
+        tmp_path,
+        '-c',
+        'user.name=test',
+        '-c',
+        'user.email=test@example.com',
+        'commit',
+        '-m',
+        'initial',
+    )
+    # A dirty path that is not touched by the computation
+    (tmp_path / 'untracked.txt').write_text('untracked')
+
+    snapshot = take_snapshot(tmp_path)
+    assert set(snapshot) == {PatternPath('untracked.txt')}
+
+    (tmp_path / 'modified.txt').write_text('modified again')
+    (tmp_path / 'd1' / 'new.txt').write_text('new')
+    (tmp_path / 'd2' / 'd3').mkdir(parents=True)
+    (tmp_path / 'd2' / 'd3' / 'deep.txt').write_text('deep')
+    # A new repository, e.g. a subdataset that was created by the computation
+    (tmp_path / 'repo').mkdir()
+    _git(tmp_path / 'repo', 'init')
+    (tmp_path / 'repo' / 'file.txt').write_text('file')
+    (tmp_path / 'tracked.txt').unlink()
+
+    assert get_changes(tmp_path, snapshot) == {
+        PatternPath('modified.txt'),
+        PatternPath('d1/new.txt'),
+        PatternPath('d2/d3/deep.txt'),
+        PatternPath('repo/file.txt'),
+    }
+    assert get_changes(tmp_path, snapshot, include_deleted=True) == {
+        PatternPath('modified.txt'),
+        PatternPath('d1/new.txt'),
+        PatternPath('d2/d3/deep.txt'),
+        PatternPath('repo/file.txt'),
+        PatternPath('tracked.txt'),
+    }
+
+
+def test_identical_rewrite(tmp_path):
+    _git(tmp_path, 'init')
+    output = tmp_path / 'output.txt'
+    output.write_text('output')
+    _git(tmp_path, 'add', '.')
+    _git(
+        tmp_path,
+        '-c',
+        'user.name=test',
+        '-c',
+        'user.email=test@example.com',
+        'commit',
+        '-m',
+        'initial',
+    )
+
+    snapshot = take_snapshot(tmp_path, [PatternPath('output.txt')])
+    unrecorded_snapshot = take_snapshot(tmp_path)
+    output.write_text('output')
+    stat = output.stat()
+    os.utime(output, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+    # git does not consider the file dirty, but the recorded path changed
+    assert get_changes(tmp_path, unrecorded_snapshot) == set()
+    assert get_changes(tmp_path, snapshot) == {PatternPath('output.txt')}
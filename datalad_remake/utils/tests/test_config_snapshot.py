@@ -0,0 +1,47 @@
+from __future__ import annotations
+
+from datalad_core.config import ConfigItem
+
+from ..config_snapshot import (
+    ConfigSnapshot,
+    get_config_snapshot,
+)
+
+
+def test_snapshot_is_shared(existing_dataset):
+    path = existing_dataset.pathobj
+    assert get_config_snapshot(path) is get_config_snapshot(path)
+
+
+def test_memoized_values(existing_dataset):
+    path = existing_dataset.pathobj
+    snapshot = ConfigSnapshot(path)
+    calls = []
+
+    def compute():
+        calls.append(None)
+        return len(calls)
+
+    assert snapshot.memoize('value', compute) == 1
+    assert snapshot.memoize('value', compute) == 1
+    assert len(calls) == 1
+
+
+def test_invalidation_by_config_file(existing_dataset):
+    path = existing_dataset.pathobj
+    snapshot = ConfigSnapshot(path)
+    assert snapshot.get('datalad.make.priority') is None
+    assert snapshot.memoize('value', lambda: 1) == 1
+
+    existing_dataset.config.add('datalad.make.priority', 'a', scope='local')
+    assert snapshot.get('datalad.make.priority') == 'a'
+    assert snapshot.memoize('value', lambda: 2) == 2
+
+
+def test_invalidation_by_environment(existing_dataset, cfgman):
+    path = existing_dataset.pathobj
+    snapshot = ConfigSnapshot(path)
+    assert snapshot.get('datalad.make.priority') is None
+    with cfgman.overrides({'datalad.make.priority': ConfigItem('b')}):
+        assert snapshot.get('datalad.make.priority') == 'b'
+    assert snapshot.get('datalad.make.priority') is None
@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+import subprocess
+import threading
+
+import pytest
+
+from datalad_remake.utils.platform import on_windows
+
+from ..failures import (
+    FailureCache,
+    describe_failure,
+)
+
+
+def test_record_and_clear(tmp_path):
+    failures = FailureCache(tmp_path / 'failures', backoff=60)
+    assert failures.get('ab12') is None
+
+    error = subprocess.CalledProcessError(1, ['false'], stderr=b'first\nlast\n')
+    failures.record('ab12', 'key-1', error)
+    failures.record('ab12', 'key-2', error)
+    failures.record('cd34', 'key-3', RuntimeError('failed'))
+    record = failures.get('ab12')
+    assert record['keys'] == ['key-1', 'key-2']
+    assert record['stderr'] == 'first\nlast\n'
+    assert 'status 1. (last line of stderr: last)' in describe_failure(record, 60)
+
+    # Records expire after the back-off period
+    assert FailureCache(tmp_path / 'failures', backoff=0).get('ab12') is None
+
+    # Records are cleared by the keys of their computations
+    assert [r['fingerprint'] for r in failures.clear(['key-2'])] == ['ab12']
+    assert failures.get('ab12') is None
+    assert [r['fingerprint'] for r in failures.clear()] == ['cd34']
+
+
+@pytest.mark.skipif(on_windows, reason='locking requires fcntl')
+def test_concurrent_request_sees_failure(tmp_path):
+    failures = FailureCache(tmp_path / 'failures', backoff=60)
+    seen = []
+
+    def request():
+        with failures.locked('ab12'):
+            seen.append(failures.get('ab12'))
+
+    with failures.locked('ab12'):
+        sibling = threading.Thread(target=request)
+        sibling.start()
+        failures.record('ab12', 'key-1', RuntimeError('failed'))
+    sibling.join()
+    assert seen[0]['error'] == 'failed'
@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+import os
+from itertools import chain
+from pathlib import Path
+
+import pytest
+
+from datalad_remake import PatternPath
+
+from ..glob import (
+    PatternMatcher,
+    glob,
+    resolve_patterns,
+)
+from ..platform import on_windows
+
+tree_files = [
+    'a.txt',
+    'b.dat',
+    '.hidden.txt',
+    'd1/a.txt',
+    'd1/c.txt',
+    'd1/.hidden/x.txt',
+    'd1/d2/a.txt',
+    'd1/d2/d3/deep.txt',
+    'd4/a.txt',
+    'd4/b.dat',
+    '.git/config',
+]
+
+patterns = [
+    ['a.txt'],
+    ['*.txt'],
+    ['.*'],
+    ['**'],
+    ['**/a.txt'],
+    ['d1/**'],
+    ['d1/**/*.txt'],
+    ['*/a.txt', 'd1/*/a.txt'],
+    ['d?/[ab].*'],
+    ['**/d2/**', 'd4/*'],
+    ['d1/.hidden/*', '.git/config'],
+    ['missing.txt', 'missing/**'],
+    ['d1', 'd1/d2'],
+    ['**/**/deep.txt'],
+]
+
+
+def _reference_resolve(root_dir: Path, pattern_list: list[PatternPath]):
+    # `glob` returns `missing/` for the pattern `missing/**`, even if
+    # `missing` does not exist. Therefore, non-existing paths are removed.
+    return {
+        PatternPath(Path(p))
+        for p in chain.from_iterable(
+            glob(str(Path(pattern)), root_dir=root_dir, recursive=True)
+            for pattern in pattern_list
+        )
+        if os.path.lexists(root_dir / p) and not (root_dir / p).is_dir()
+    }
+
+
+@pytest.fixture
+def tree(tmp_path):
+    for file in tree_files:
+        (tmp_path / file).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / file).write_text(file)
+    if not on_windows:
+        # A dangling symlink, like an annexed file without content
+        os.symlink('.git/annex/objects/missing', tmp_path / 'd4' / 'link.txt')
+    return tmp_path
+
+
+@pytest.mark.parametrize('pattern_strings', patterns)
+def test_resolve_like_glob(tree, pattern_strings):
+    pattern_list = list(map(PatternPath, pattern_strings))
+    assert resolve_patterns(tree, pattern_list) == _reference_resolve(
+        tree, pattern_list
+    )
+
+
+def test_resolve_all_patterns_at_once(tree):
+    pattern_list = [PatternPath(p) for p in chain.from_iterable(patterns)]
+    assert resolve_patterns(tree, pattern_list) == _reference_resolve(
+        tree, pattern_list
+    )
+
+
+def test_resolve_missing_root(tmp_path):
+    assert resolve_patterns(tmp_path / 'missing', [PatternPath('**')]) == set()
+
+
+def test_match():
+    matcher = PatternMatcher(map(PatternPath, ['d1/**/*.txt', 'b.dat']))
+    assert matcher.match(PatternPath('d1/a.txt'))
+    assert matcher.match(PatternPath('d1/d2/d3/deep.txt'))
+    assert matcher.match(PatternPath('b.dat'))
+    assert not matcher.match(PatternPath('d1/.hidden/x.txt'))
+    assert not matcher.match(PatternPath('d4/b.dat'))
+    assert not matcher.match(PatternPath('d1'))
+
+
+def test_match_prefix():
+    matcher = PatternMatcher(map(PatternPath, ['d1/**/*.txt', 'sub/b.dat']))
+    assert matcher.match_prefix(PatternPath('d1'))
+    assert matcher.match_prefix(PatternPath('d1/d2'))
+    assert matcher.match_prefix(PatternPath('sub'))
+    assert not matcher.match_prefix(PatternPath('sub/b.dat'))
+    assert not matcher.match_prefix(PatternPath('d4'))
@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+import threading
+
+import pytest
+
+from ..pipeline import (
+    Pipeline,
+    Stage,
+)
+
+
+class Job:
+    def __init__(self, name: str):
+        self.name = name
+        self.stages: list[str] = []
+        self.finalized = False
+
+
+def _record(name: str, fail: str | None = None):
+    def stage(job):
+        if job.name == fail:
+            msg = f'{name} failed'
+            raise RuntimeError(msg)
+        job.stages.append(name)
+
+    return stage
+
+
+def test_pipeline_order():
+    pipeline = Pipeline(
+        [Stage('a', _record('a'), 2), Stage('b', _record('b'), 1)],
+        finalize=lambda job: setattr(job, 'finalized', True),
+    )
+    pipeline.start()
+    try:
+        futures = [pipeline.submit(Job(str(index))) for index in range(5)]
+        jobs = [future.result(timeout=10) for future in futures]
+    finally:
+        pipeline.stop()
+    assert [job.stages for job in jobs] == [['a', 'b']] * 5
+    assert all(job.finalized for job in jobs)
+
+
+def test_pipeline_failure():
+    pipeline = Pipeline(
+        [Stage('a', _record('a', fail='x')), Stage('b', _record('b'))],
+        finalize=lambda job: setattr(job, 'finalized', True),
+    )
+    pipeline.start()
+    try:
+        failing, succeeding = Job('x'), Job('y')
+        failing_future = pipeline.submit(failing)
+        succeeding_future = pipeline.submit(succeeding)
+        with pytest.raises(RuntimeError, match='a failed'):
+            failing_future.result(timeout=10)
+        assert succeeding_future.result(timeout=10).stages == ['a', 'b']
+    finally:
+        pipeline.stop()
+    # Failed jobs do not reach later stages, but are finalized
+    assert failing.stages == []
+    assert failing.finalized
+
+
+def test_pipeline_stages_overlap():
+    # The second stage of the first job can only finish, if the first stage
+    # of the second job runs at the same time.
+    barrier = threading.Barrier(2, timeout=10)
+
+    def first(job):
+        if job.name == 'second':
+            barrier.wait()
+
+    def second(job):
+        if job.name == 'first':
+            barrier.wait()
+
+    pipeline = Pipeline([Stage('first', first), Stage('second', second)])
+    pipeline.start()
+    try:
+        futures = [pipeline.submit(Job(name)) for name in ('first', 'second')]
+        for future in futures:
+            future.result(timeout=10)
+    finally:
+        pipeline.stop()
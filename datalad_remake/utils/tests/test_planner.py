@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+import threading
+
+import pytest
+
+from datalad_remake import PatternPath
+from datalad_remake.commands.tests.create_datasets import (
+    create_simple_computation_dataset,
+)
+
+from ..instructions import Instruction
+from ..planner import (
+    CyclicDependencyError,
+    Node,
+    Plan,
+)
+from ..trees import (
+    get_annexed_keys,
+    key_from_file_name,
+)
+
+
+def _create_plan(dependencies: dict[str, set[str]]) -> Plan:
+    plan = Plan()
+    for name, node_dependencies in dependencies.items():
+        node = Node(name, Instruction('label', 'commit', name, name), {'input': []})
+        node.dependencies = set(node_dependencies)
+        plan.nodes[node.id] = node
+    return plan
+
+
+def test_topological_order():
+    plan = _create_plan({'c': {'a', 'b'}, 'a': set(), 'b': {'a'}, 'd': set()})
+    executed = []
+    lock = threading.Lock()
+
+    def run_node(node):
+        with lock:
+            executed.append(node.instruction.spec_name)
+        return node.instruction.spec_name.upper()
+
+    results = {
+        node.instruction.spec_name: (result, error)
+        for node, result, error in plan.execute(run_node, jobs=2)
+    }
+    assert results == {
+        'a': ('A', None),
+        'b': ('B', None),
+        'c': ('C', None),
+        'd': ('D', None),
+    }
+    assert executed.index('a') < executed.index('b') < executed.index('c')
+
+
+def test_independent_nodes_run_concurrently():
+    plan = _create_plan({'a': set(), 'b': set()})
+    barrier = threading.Barrier(2, timeout=10)
+    results = list(plan.execute(lambda _: barrier.wait(), jobs=2))
+    assert [error for _, _, error in results] == [None, None]
+
+
+def test_failed_dependency():
+    plan = _create_plan({'a': set(), 'b': {'a'}, 'c': set()})
+
+    def run_node(node):
+        if node.instruction.spec_name == 'a':
+            msg = 'failed'
+            raise RuntimeError(msg)
+
+    errors = {
+        node.instruction.spec_name: error for node, _, error in plan.execute(run_node)
+    }
+    assert isinstance(errors['a'], RuntimeError)
+    assert errors['b'] is errors['a']
+    assert errors['c'] is None
+
+
+def test_cyclic_dependencies():
+    plan = _create_plan({'a': {'b'}, 'b': {'a'}})
+    with pytest.raises(CyclicDependencyError):
+        list(plan.execute(lambda _: None))
+
+
+def test_key_from_file_name():
+    assert (
+        key_from_file_name('VURL--datalad-remake&c%%%,63label-abc')
+        == 'VURL--datalad-remake:///,63label-abc'
+    )
+    assert key_from_file_name('MD5E-s2--a&s&a.txt') == 'MD5E-s2--a%&.txt'
+
+
+def test_annexed_keys_of_equal_files(tmp_path):
+    root_dataset = create_simple_computation_dataset(tmp_path, 'ds1', 0, '')
+    # Equal symlinks in one directory are a single blob
+    for name in ('c.txt', 'd.txt'):
+        (root_dataset.pathobj / name).write_text('equal\n')
+    root_dataset.save(result_renderer='disabled')
+    keys = get_annexed_keys(root_dataset.pathobj, root_dataset.repo.get_hexsha())
+    assert keys[PatternPath('c.txt')] == keys[PatternPath('d.txt')]
@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+import io
+import json
+import sys
+
+import pytest
+from datalad_core.config import ConfigItem
+
+from datalad_remake import metrics_file_config_key
+
+from ..compute import compute
+from ..metrics import measure
+from ..progress import (
+    ProgressParser,
+    copy_with_progress,
+    follow_output,
+)
+
+
+def test_progress_parser():
+    parser = ProgressParser(r'^(?P<percent>[0-9.]+)%')
+    assert parser.parse('50% done') == 0.5
+    assert parser.parse('done') is None
+    assert parser.parse('150%') == 1.0
+
+    parser = ProgressParser(r'step (?P<done>\d+) of (?P<total>\d+)')
+    assert parser.parse('step 1 of 4') == 0.25
+    assert parser.parse('step 1 of 0') is None
+
+    with pytest.raises(ValueError, match='must contain a group'):
+        ProgressParser(r'(?P<done>\d+)')
+
+
+def test_follow_output():
+    parser = ProgressParser(r'^(?P<percent>\d+)%')
+    output = io.BytesIO(b'10%\nsome text\n10%\n60%\n')
+    copy = io.BytesIO()
+    reported = []
+    follow_output(output, parser, reported.append, copy)
+    assert reported == [0.1, 0.6]
+    assert copy.getvalue() == output.getvalue()
+
+
+def test_copy_with_progress(tmp_path, monkeypatch):
+    monkeypatch.setattr('datalad_remake.utils.progress.copy_chunk_size', 3)
+    source = tmp_path / 'source'
+    source.write_bytes(b'1234567')
+    reported = []
+    copied = copy_with_progress(source, tmp_path / 'destination', reported.append)
+    assert copied == 7
+    assert reported == [3, 6, 7]
+    assert (tmp_path / 'destination').read_bytes() == b'1234567'
+
+
+def test_compute_progress(tmp_path):
+    template = tmp_path / 'template'
+    template.write_text(
+        f"""
+parameters = []
+progress = '^(?P<done>\\d+)/(?P<total>\\d+)$'
+command = [
+    "{sys.executable}",
+    "-c",
+    "print('1/2'); print('result'); print('2/2')",
+]
+"""
+    )
+    reported = []
+    compute(tmp_path, template, {}, tmp_path / 'stdout.txt', progress=reported.append)
+    assert reported == [0.5, 1.0]
+    # Output is still written to the stdout file
+    assert (tmp_path / 'stdout.txt').read_text().split() == ['1/2', 'result', '2/2']
+
+
+def test_measure(tmp_path, cfgman):
+    metrics_file = tmp_path / 'metrics.jsonl'
+    with cfgman.overrides({metrics_file_config_key: ConfigItem(str(metrics_file))}):
+        with measure('collection', key='some-key') as record:
+            record['bytes'] = 1000
+        with pytest.raises(RuntimeError), measure('execution'):
+            raise RuntimeError
+
+    records = [json.loads(line) for line in metrics_file.read_text().splitlines()]
+    assert [record['phase'] for record in records] == ['collection', 'execution']
+    assert records[0]['key'] == 'some-key'
+    assert records[0]['bytes'] == 1000
+    assert 'bytes_per_second' in records[0]
+    assert 'failed' not in records[0]
+    assert records[1]['failed'] is True
@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+import subprocess
+import sys
+
+import pytest
+
+from ..platform import on_windows
+from ..reaper import (
+    collect_garbage,
+    force_rmtree,
+)
+from ..scratch import (
+    read_lease,
+    write_lease,
+)
+
+
+def _create_tree(path):
+    (path / 'sub' / 'objects').mkdir(parents=True)
+    (path / 'sub' / 'objects' / 'content').write_text('content')
+    # Mimic write-protected annex object directories
+    (path / 'sub' / 'objects').chmod(0o500)
+
+
+def test_force_rmtree(tmp_path):
+    tree = tmp_path / 'tree'
+    _create_tree(tree)
+    force_rmtree(tree)
+    assert not tree.exists()
+
+
+@pytest.mark.skipif(on_windows, reason='process liveness is not checked on Windows')
+def test_collect_orphans(tmp_path):
+    # Get the PID of a process that does not exist anymore
+    process = subprocess.Popen([sys.executable, '-c', 'pass'])  # noqa: S603
+    process.wait()
+
+    orphan = tmp_path / 'datalad-remake-orphan'
+    _create_tree(orphan)
+    write_lease(orphan, 0, process.pid)
+
+    persistent = tmp_path / 'datalad-remake-persistent'
+    _create_tree(persistent)
+    write_lease(persistent, 0, None)
+
+    collect_garbage(tmp_path)
+    assert not orphan.exists()
+    assert read_lease(orphan) is None
+    assert persistent.exists()
+    assert read_lease(persistent) is not None
+    force_rmtree(persistent)
@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+
+from ..resources import (
+    Resources,
+    parse_duration,
+    run_command,
+    stderr_tail_size,
+)
+
+
+def test_parse_duration():
+    assert parse_duration(90) == 90
+    assert parse_duration('90') == 90
+    assert parse_duration('1.5m') == 90
+    assert parse_duration('2h') == 7200
+    with pytest.raises(ValueError, match='Invalid duration'):
+        parse_duration('forever')
+
+
+def test_from_template():
+    resources = Resources.from_template({'cpus': 2, 'memory': '1G', 'walltime': '1h'})
+    assert resources.cpus == 2
+    assert resources.memory == 1024**3
+    assert resources.walltime == 3600
+    assert resources.environment()['OMP_NUM_THREADS'] == '2'
+    assert Resources.from_template({}).environment() is None
+
+
+def test_thread_variables(tmp_path):
+    output = tmp_path / 'output.txt'
+    with output.open('w') as stdout:
+        run_command(
+            [sys.executable, '-c', 'import os; print(os.environ["MKL_NUM_THREADS"])'],
+            Resources(cpus=1),
+            stdout=stdout,
+        )
+    assert output.read_text().strip() == '1'
+
+
+@pytest.mark.skipif(
+    not hasattr(os, 'sched_getaffinity'), reason='CPU affinity not supported'
+)
+def test_cpu_affinity(tmp_path):
+    output = tmp_path / 'output.txt'
+    with output.open('w') as stdout:
+        run_command(
+            [sys.executable, '-c', 'import os; print(len(os.sched_getaffinity(0)))'],
+            Resources(cpus=1),
+            stdout=stdout,
+        )
+    assert output.read_text().strip() == '1'
+
+
+@pytest.mark.skipif(sys.platform == 'win32', reason='memory limit not supported')
+def test_memory_limit():
+    # The limit is in place when the command starts
+    script = (
+        'import resource, sys; '
+        f'sys.exit(resource.getrlimit(resource.RLIMIT_AS)[0] != {2**32})'
+    )
+    run_command([sys.executable, '-c', script], Resources(memory=2**32))
+
+
+@pytest.mark.skipif(not hasattr(os, 'killpg'), reason='no process groups')
+def test_walltime(tmp_path):
+    marker = tmp_path / 'marker'
+    start = time.monotonic()
+    with pytest.raises(subprocess.TimeoutExpired):
+        # The sub-process of the shell should be killed as well
+        run_command(
+            ['bash', '-c', f'(sleep 3; touch {marker}) & wait'],
+            Resources(walltime=0.5),
+        )
+    assert time.monotonic() - start < 3
+    time.sleep(3)
+    assert not marker.exists()
+
+
+def test_failure():
+    with pytest.raises(subprocess.CalledProcessError):
+        run_command([sys.executable, '-c', 'raise SystemExit(3)'], Resources())
+
+
+def test_failure_stderr(capfd):
+    script = 'import sys; sys.stderr.write("x" * 10000 + "failed"); sys.exit(1)'
+    with pytest.raises(subprocess.CalledProcessError) as error:
+        run_command([sys.executable, '-c', script], Resources(), capture_stderr=True)
+    # The tail of stderr is attached to the error, and stderr is forwarded
+    assert len(error.value.stderr) == stderr_tail_size
+    assert error.value.stderr.endswith(b'failed')
+    assert capfd.readouterr().err.endswith('failed')
@@ -0,0 +1,133 @@
+from __future__ import annotations
+
+import threading
+
+import pytest
+from datalad_core.config import ConfigItem
+
+from datalad_remake import (
+    PatternPath,
+    allow_untrusted_execution_key,
+    cache_dir_config_key,
+)
+from datalad_remake.commands.tests.create_datasets import (
+    create_simple_computation_dataset,
+)
+from datalad_remake.utils.fingerprint import get_fingerprint
+from datalad_remake.utils.platform import on_windows
+from datalad_remake.utils.result_cache import ResultCache
+
+# Every execution appends a line to the log file
+test_method = """
+parameters = ['name', 'log']
+command = ["bash", "-c", "echo {name} > out-{name}.txt; echo {name} >> {log}"]
+"""
+
+
+def test_publish_and_fetch(tmp_path):
+    source_dir = tmp_path / 'source'
+    (source_dir / 'd').mkdir(parents=True)
+    (source_dir / 'd' / 'x.txt').write_text('x\n')
+    cache = ResultCache(tmp_path / 'cache')
+
+    assert cache.fetch('ab12', 'd/x.txt', tmp_path / 'x.txt') == -1
+    cache.publish('ab12', source_dir, [PatternPath('d/x.txt')])
+    assert cache.fetch('ab12', 'd/x.txt', tmp_path / 'x.txt') == 2
+    assert (tmp_path / 'x.txt').read_text() == 'x\n'
+
+    # Existing entries are not replaced
+    (source_dir / 'd' / 'x.txt').unlink()
+    (source_dir / 'd' / 'x.txt').write_text('changed\n')
+    cache.publish('ab12', source_dir, [PatternPath('d/x.txt')])
+    assert (cache.get_entry('ab12') / 'd' / 'x.txt').read_text() == 'x\n'
+    assert not any((cache.directory / 'tmp').iterdir())
+
+    # Missing outputs are added to existing entries
+    (source_dir / 'e').mkdir()
+    (source_dir / 'e' / 'y.txt').write_text('y\n')
+    cache.publish('ab12', source_dir, [PatternPath('d/x.txt'), PatternPath('e/y.txt')])
+    assert cache.fetch('ab12', 'e/y.txt', tmp_path / 'y.txt') == 2
+    assert (cache.get_entry('ab12') / 'd' / 'x.txt').read_text() == 'x\n'
+    assert not any((cache.directory / 'tmp').iterdir())
+
+
+@pytest.mark.skipif(on_windows, reason='the result cache requires fcntl')
+def test_locked(tmp_path):
+    cache = ResultCache(tmp_path / 'cache')
+    messages = []
+    acquired = threading.Event()
+
+    def wait_for_lock():
+        with cache.locked('ab12', messages.append):
+            acquired.set()
+
+    with cache.locked('ab12'):
+        waiter = threading.Thread(target=wait_for_lock)
+        waiter.start()
+        assert not acquired.wait(timeout=1)
+    waiter.join()
+    assert acquired.is_set()
+    assert 'waiting for a concurrent computation' in messages[0]
+
+
+def test_fingerprint(tmp_path):
+    root_dataset = create_simple_computation_dataset(
+        tmp_path, 'ds1', 0, test_method, 'logger'
+    )
+    compute_info = {
+        'root_version': root_dataset.repo.get_hexsha(),
+        'method': 'logger',
+        'parameter': {'name': 'a', 'log': 'log.txt'},
+        'input': [PatternPath('a.txt')],
+        'output': [PatternPath('out-a.txt')],
+        'stdout': None,
+    }
+    fingerprint = get_fingerprint(root_dataset.pathobj, compute_info)
+
+    # Commits that do not change annexed inputs or the template do not change
+    # the fingerprint.
+    (root_dataset.pathobj / 'unrelated.txt').write_text('unrelated\n')
+    root_dataset.save(to_git=True, result_renderer='disabled')
+    other_commit = {**compute_info, 'root_version': root_dataset.repo.get_hexsha()}
+    assert get_fingerprint(root_dataset.pathobj, other_commit) == fingerprint
+
+    # Changed parameters, or changed inputs that are not annexed, do
+    other_parameter = {**compute_info, 'parameter': {'name': 'b', 'log': 'log.txt'}}
+    assert get_fingerprint(root_dataset.pathobj, other_parameter) != fingerprint
+    unannexed_input = {**other_commit, 'input': [PatternPath('unrelated.txt')]}
+    unannexed_fingerprint = get_fingerprint(root_dataset.pathobj, unannexed_input)
+    (root_dataset.pathobj / 'unrelated.txt').write_text('changed\n')
+    root_dataset.save(to_git=True, result_renderer='disabled')
+    changed_input = {**unannexed_input, 'root_version': root_dataset.repo.get_hexsha()}
+    assert get_fingerprint(root_dataset.pathobj, changed_input) != unannexed_fingerprint
+
+
+@pytest.mark.skipif(on_windows, reason='template uses bash')
+def test_cached_computation(tmp_path, cfgman):
+    root_dataset = create_simple_computation_dataset(
+        tmp_path, 'ds1', 0, test_method, 'logger'
+    )
+    log = tmp_path / 'log.txt'
+    root_dataset.make(
+        template='logger',
+        parameter=['name=a', f'log={log}'],
+        output=['out-a.txt'],
+        prospective_execution=True,
+        result_renderer='disabled',
+    )
+
+    cache_dir = tmp_path / 'cache'
+    # Overrides are nested, see `test_queued_computations`
+    untrusted = {allow_untrusted_execution_key + root_dataset.id: ConfigItem('true')}
+    cache = {cache_dir_config_key: ConfigItem(str(cache_dir))}
+    with cfgman.overrides(untrusted), cfgman.overrides(cache):
+        root_dataset.get('out-a.txt', result_renderer='disabled')
+        root_dataset.drop(
+            'out-a.txt', reckless='availability', result_renderer='disabled'
+        )
+        root_dataset.get('out-a.txt', result_renderer='disabled')
+
+    assert (root_dataset.pathobj / 'out-a.txt').read_text() == 'a\n'
+    # The second retrieval was served from the cache
+    assert log.read_text() == 'a\n'
+    assert len(list(cache_dir.glob('*/*/out-a.txt'))) == 1
@@ -0,0 +1,114 @@
+from __future__ import annotations
+
+import os
+import threading
+from unittest.mock import MagicMock
+
+import pytest
+
+from datalad_remake import (
+    PatternPath,
+    scratch_dirs_config_key,
+    scratch_quota_config_key,
+    scratch_reserve_config_key,
+)
+
+from ..platform import on_windows
+from ..scratch import (
+    estimate_size,
+    get_leased_size,
+    get_worktree_dir,
+    read_lease,
+    remove_lease,
+)
+from ..size import parse_size
+
+
+def _mock_dataset(tmp_path, config):
+    dataset = MagicMock()
+    dataset.pathobj = tmp_path
+    dataset.config.get = lambda key, default=None: config.get(key, default)
+    return dataset
+
+
+def test_parse_size():
+    assert parse_size('100') == 100
+    assert parse_size(100) == 100
+    assert parse_size('1k') == 1024
+    assert parse_size('2GiB') == 2 * 1024**3
+    assert parse_size('1.5M') == 1536 * 1024
+    with pytest.raises(ValueError, match='Invalid size'):
+        parse_size('a lot')
+
+
+def test_estimate_size(tmp_path):
+    (tmp_path / 'a.txt').write_text('12345')
+    if not on_windows:
+        os.symlink(
+            '.git/annex/objects/xx/yy/MD5E-s1000--abc.txt/MD5E-s1000--abc.txt',
+            tmp_path / 'b.txt',
+        )
+    expected = 5 if on_windows else 1005
+    assert estimate_size(tmp_path, [PatternPath('*.txt')]) == expected
+
+
+def test_default_scratch_dir(tmp_path):
+    worktree_dir = get_worktree_dir(_mock_dataset(tmp_path, {}), transient=True)
+    assert not worktree_dir.exists()
+    assert read_lease(worktree_dir)['pid'] == os.getpid()
+    remove_lease(worktree_dir)
+
+
+def test_scratch_fallback_order(tmp_path):
+    (tmp_path / 'input.txt').write_text('x' * 1000)
+    first, second = tmp_path / 'first', tmp_path / 'second'
+    config = {
+        scratch_dirs_config_key: f'{first},{second}',
+        scratch_quota_config_key: '1500',
+    }
+    dataset = _mock_dataset(tmp_path, config)
+    patterns = [PatternPath('input.txt')]
+
+    worktree_dir = get_worktree_dir(dataset, patterns)
+    assert worktree_dir.parent == first
+    assert read_lease(worktree_dir)['size'] == 1000
+    assert get_leased_size(first) == 1000
+
+    # The quota of `first` is exhausted, the next candidate should be used.
+    worktree_dir = get_worktree_dir(dataset, patterns)
+    assert worktree_dir.parent == second
+
+    # A reserve that cannot be satisfied, should lead to the system default.
+    config[scratch_reserve_config_key] = '1P'
+    worktree_dir = get_worktree_dir(dataset, patterns)
+    assert worktree_dir.parent not in (first, second)
+    remove_lease(worktree_dir)
+
+
+def test_concurrent_quota(tmp_path):
+    (tmp_path / 'input.txt').write_text('x' * 1000)
+    scratch = tmp_path / 'scratch'
+    config = {
+        scratch_dirs_config_key: str(scratch),
+        scratch_quota_config_key: '1500',
+    }
+    dataset = _mock_dataset(tmp_path, config)
+
+    # Concurrent requests do not exceed the quota together
+    worktree_dirs = []
+    lock = threading.Lock()
+
+    def request():
+        worktree_dir = get_worktree_dir(dataset, [PatternPath('input.txt')])
+        with lock:
+            worktree_dirs.append(worktree_dir)
+
+    threads = [threading.Thread(target=request) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert [d.parent for d in worktree_dirs].count(scratch) == 1
+    assert get_leased_size(scratch) == 1000
+    for worktree_dir in worktree_dirs:
+        remove_lease(worktree_dir)
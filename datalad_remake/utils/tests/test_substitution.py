@@ -1,4 +1,13 @@
+import sys
+from pathlib import Path
+
+import pytest
+
 from ..compute import (
+    CompiledTemplate,
+    compute,
+    get_blob_id,
+    load_template,
     substitute_arguments,
     substitute_string,
 )
@@ -32,3 +41,206 @@ def test_argument_substitution():
         '/path/to/root/input',
         '/path/to/root/output',
     ]
+
+
+def test_single_pass_substitution():
+    # Replacements are not substituted again, unknown placeholders are kept.
+    assert (
+        substitute_string('{a} {b} {unknown}', {'a': '{b}', 'b': 'x'})
+        == '{b} x {unknown}'
+    )
+
+
+def test_compiled_template(tmp_path):
+    template_path = tmp_path / 'method'
+    template_path.write_text(
+        "parameters = ['input', 'output']\n"
+        "command = ['tool', '{root_directory}/{input}', '-o={output}', '{x}', 3]\n"
+    )
+    template = load_template(template_path)
+    assert template.build_command(
+        {'input': 'a.txt', 'output': 'b.txt'}, Path('/root')
+    ) == ['tool', '/root/a.txt', '-o=b.txt', '{x}', '3']
+
+    # Templates with identical content are only compiled once
+    (tmp_path / 'copy').write_bytes(template_path.read_bytes())
+    assert load_template(tmp_path / 'copy') is template
+    template_path.write_text("parameters = []\ncommand = ['tool']\n")
+    assert load_template(template_path) is not template
+
+
+def test_blob_id():
+    # Compare with `git hash-object` of a file containing `hello\n`
+    assert get_blob_id(b'hello\n') == 'ce013625030ba8dba906f756967f9e9ca394464a'
+
+
+def test_list_parameters(tmp_path):
+    template = CompiledTemplate(
+        {
+            'parameters': ['output'],
+            'list_parameters': ['files'],
+            'command': [
+                'tool',
+                '{files}',
+                '--in={files}',
+                '-o',
+                '{output}',
+                '{@files}',
+            ],
+        }
+    )
+    command = template.build_command(
+        {'files': ['a.txt', 'b.txt'], 'output': 'out.txt'},
+        Path('/root'),
+        tmp_path,
+    )
+    assert command == [
+        'tool',
+        'a.txt',
+        'b.txt',
+        '--in=a.txt',
+        '--in=b.txt',
+        '-o',
+        'out.txt',
+        str(tmp_path / 'files'),
+    ]
+    assert (tmp_path / 'files').read_text() == 'a.txt\nb.txt\n'
+
+    # A single value is a list with one element
+    assert template.build_command(
+        {'files': 'a.txt', 'output': 'out.txt'}, Path('/root'), tmp_path
+    )[:3] == ['tool', 'a.txt', '--in=a.txt']
+
+
+def test_list_parameter_errors():
+    with pytest.raises(ValueError, match='more than one list parameter'):
+        CompiledTemplate(
+            {
+                'parameters': [],
+                'list_parameters': ['a', 'b'],
+                'command': ['{a}{b}'],
+            }
+        )
+
+    template = CompiledTemplate(
+        {'parameters': ['a'], 'command': ['tool', '{a}', '{@a}']}
+    )
+    with pytest.raises(ValueError, match='received multiple values'):
+        template.build_command({'a': ['x', 'y']}, Path('/root'))
+    with pytest.raises(ValueError, match='only supported for list parameters'):
+        template.build_command({'a': 'x'}, Path('/root'))
+
+
+def test_steps(tmp_path):
+    template = CompiledTemplate(
+        {
+            'parameters': ['input', 'output'],
+            'steps': [
+                {'command': ['convert', '{input}', 'tmp-{output}']},
+                {'command': ['resample', 'tmp-{output}', '{output}']},
+            ],
+            'intermediate': ['tmp-{output}'],
+        }
+    )
+    arguments = {'input': 'a.txt', 'output': 'b.txt'}
+    assert template.build_commands(arguments, Path('/root')) == [
+        ['convert', 'a.txt', 'tmp-b.txt'],
+        ['resample', 'tmp-b.txt', 'b.txt'],
+    ]
+    assert template.get_intermediate(arguments) == ['tmp-b.txt']
+
+    with pytest.raises(ValueError, match='both "command" and "steps"'):
+        CompiledTemplate({'parameters': [], 'command': ['a'], 'steps': []})
+    with pytest.raises(ValueError, match='must declare a "command"'):
+        CompiledTemplate({'parameters': [], 'steps': [{'cpus': 1}]})
+
+
+def test_compute_steps(tmp_path):
+    template = tmp_path / 'template'
+    template.write_text(
+        f"""
+parameters = ['output']
+intermediate = ['tmp.txt']
+
+[[steps]]
+command = ["{sys.executable}", "-c", "open('tmp.txt', 'w').write('a'); print(1)"]
+
+[[steps]]
+command = [
+    "{sys.executable}",
+    "-c",
+    "open('{{output}}', 'w').write(open('tmp.txt').read() + 'b'); print(2)",
+]
+"""
+    )
+    compute(tmp_path, template, {'output': 'out.txt'}, tmp_path / 'stdout.txt')
+    assert (tmp_path / 'out.txt').read_text() == 'ab'
+    # Intermediate files are removed, the output of all steps is kept
+    assert not (tmp_path / 'tmp.txt').exists()
+    assert (tmp_path / 'stdout.txt').read_text().split() == ['1', '2']
+
+
+def test_map_chunks():
+    template = CompiledTemplate(
+        {
+            'parameters': ['suffix'],
+            'list_parameters': ['files'],
+            'command': ['tool', '{files}'],
+            'map': {'parameter': 'files', 'chunk_size': 2, 'output': '{item}{suffix}'},
+        }
+    )
+    assert template.map is not None
+    substitutions = {'files': ['a', 'b', 'c'], 'suffix': '.out'}
+    assert template.map.get_chunks(substitutions) == ([['a', 'b'], ['c']], None)
+    assert template.map.get_chunks(substitutions, ['c.out']) == ([['c']], {'c.out'})
+    # Outputs that are not computed from a single value require all chunks
+    assert template.map.get_chunks(substitutions, ['x']) == (
+        [['a', 'b'], ['c']],
+        None,
+    )
+
+    with pytest.raises(ValueError, match='is not a list parameter'):
+        CompiledTemplate(
+            {'parameters': ['a'], 'command': ['{a}'], 'map': {'parameter': 'a'}}
+        )
+
+
+def test_compute_map(tmp_path):
+    template = tmp_path / 'template'
+    template.write_text(
+        f"""
+parameters = []
+list_parameters = ['files']
+command = [
+    "{sys.executable}",
+    "-c",
+    "import sys; [open(f + '.out', 'w').write(f) for f in sys.argv[1:]]",
+    "{{files}}",
+]
+
+[map]
+parameter = 'files'
+chunk_size = 2
+jobs = 2
+output = '{{item}}.out'
+"""
+    )
+    files = ['a', 'b', 'c', 'd', 'e']
+    reported = []
+    assert (
+        compute(tmp_path, template, {'files': files}, None, progress=reported.append)
+        is None
+    )
+    assert sorted(path.name for path in tmp_path.glob('*.out')) == [
+        f'{name}.out' for name in files
+    ]
+    assert sorted(reported) == [1 / 3, 2 / 3, 1.0]
+
+    # Only the chunk that computes the requested output is executed
+    for path in tmp_path.glob('*.out'):
+        path.unlink()
+    assert compute(tmp_path, template, {'files': files}, None, requested=['c.out']) == {
+        'c.out',
+        'd.out',
+    }
+    assert sorted(path.name for path in tmp_path.glob('*.out')) == ['c.out', 'd.out']
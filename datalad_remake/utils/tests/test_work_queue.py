@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+import threading
+import time
+
+import pytest
+
+from .. import work_queue
+from ..work_queue import (
+    QueueTimeoutError,
+    WorkQueue,
+)
+
+
+def test_claim_order_and_exclusivity(tmp_path):
+    queue = WorkQueue(tmp_path)
+    first = queue.enqueue({'name': 'first'})
+    second = queue.enqueue({'name': 'second'})
+
+    # Concurrent workers claim every job exactly once, oldest first
+    claims = []
+    lock = threading.Lock()
+
+    def claim():
+        claimed = queue.claim()
+        with lock:
+            claims.append(claimed)
+
+    threads = [threading.Thread(target=claim) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    claimed = sorted(claim for claim in claims if claim is not None)
+    assert claimed == [(first, {'name': 'first'}), (second, {'name': 'second'})]
+    assert queue.claim() is None
+
+
+def test_wait_for_result(tmp_path):
+    queue = WorkQueue(tmp_path)
+    job_id = queue.enqueue({})
+
+    messages = []
+    waiting = threading.Event()
+
+    def notify(message):
+        messages.append(message)
+        waiting.set()
+
+    def work():
+        waiting.wait(timeout=10)
+        claimed_id, _ = queue.claim()
+        (queue.get_results_dir(claimed_id) / 'a').mkdir(parents=True)
+        queue.finish(claimed_id, {'status': 'ok', 'outputs': ['a/b.txt']})
+
+    worker = threading.Thread(target=work)
+    worker.start()
+    assert queue.wait(job_id, notify, claim_timeout=10) == {
+        'status': 'ok',
+        'outputs': ['a/b.txt'],
+    }
+    worker.join()
+    assert 'waiting for a worker' in messages[0]
+
+    queue.remove(job_id)
+    assert not queue.get_results_dir(job_id).exists()
+    assert list((tmp_path / 'claimed').iterdir()) == []
+    assert list((tmp_path / 'done').iterdir()) == []
+
+
+def test_claim_timeout(tmp_path):
+    queue = WorkQueue(tmp_path)
+    job_id = queue.enqueue({})
+    with pytest.raises(QueueTimeoutError):
+        queue.wait(job_id, claim_timeout=0)
+    # The job was withdrawn
+    assert queue.claim() is None
+
+
+def test_expired_lease(tmp_path, monkeypatch):
+    queue = WorkQueue(tmp_path)
+    job_id = queue.enqueue({'name': 'job'})
+    assert queue.claim() == (job_id, {'name': 'job'})
+
+    # A renewed lease does not expire
+    monkeypatch.setattr(work_queue, 'heartbeat_interval', 0.01)
+    monkeypatch.setattr(work_queue, 'lease_duration', 0.5)
+    with queue.leased(job_id):
+        time.sleep(1)
+        assert queue.claim() is None
+
+    # The worker died, another worker claims the job again
+    (queue.get_results_dir(job_id) / 'partial').mkdir(parents=True)
+    time.sleep(1)
+    assert queue.claim() == (job_id, {'name': 'job'})
+    assert not queue.get_results_dir(job_id).exists()
+
+    # The waiting special remote queues the job again
+    time.sleep(1)
+    messages = []
+
+    def notify(message):
+        messages.append(message)
+        if 'waiting for a worker' in message:
+            claimed_id, _ = queue.claim()
+            queue.finish(claimed_id, {'status': 'ok', 'outputs': []})
+
+    assert queue.wait(job_id, notify, claim_timeout=10)['status'] == 'ok'
+    assert 'queued it again' in messages[0]
+    assert 'waiting for a worker' in messages[1]
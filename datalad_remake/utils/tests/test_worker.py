@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+import pytest
+
+from ..compute import compute
+from ..worker import (
+    WorkerError,
+    stop_workers,
+)
+
+worker_script = """
+import json
+import os
+import sys
+
+for line in sys.stdin:
+    job = json.loads(line)
+    if job['parameters']['name'] == 'crash':
+        sys.exit(1)
+    if job['parameters']['name'] == 'fail':
+        print(json.dumps({'id': job['id'], 'status': 'error', 'message': 'failed'}), flush=True)
+        continue
+    with open(os.path.join(job['root_directory'], job['outputs'][0]), 'w') as f:
+        f.write(f"{job['parameters']['name']} {os.getpid()}")
+    print(json.dumps({'id': job['id'], 'status': 'ok'}), flush=True)
+"""
+
+
+@pytest.fixture
+def worker_template(tmp_path):
+    script = tmp_path / 'worker.py'
+    script.write_text(worker_script)
+    template = tmp_path / 'method'
+    template.write_text(
+        "type = 'worker'\n"
+        "parameters = ['name']\n"
+        f'worker = [{str(sys.executable)!r}, {str(script)!r}]\n'
+    )
+    yield template
+    stop_workers()
+
+
+def _run(template: Path, worktree: Path, name: str) -> list[str]:
+    worktree.mkdir(exist_ok=True)
+    compute(worktree, template, {'name': name}, None, ['out.txt'])
+    return (worktree / 'out.txt').read_text().split()
+
+
+def test_worker_is_reused(tmp_path, worker_template):
+    first_name, first_pid = _run(worker_template, tmp_path / 'wt1', 'a')
+    second_name, second_pid = _run(worker_template, tmp_path / 'wt2', 'b')
+    assert (first_name, second_name) == ('a', 'b')
+    assert first_pid == second_pid
+
+
+def test_worker_errors(tmp_path, worker_template):
+    _, first_pid = _run(worker_template, tmp_path / 'wt', 'a')
+    with pytest.raises(WorkerError, match='failed to execute'):
+        _run(worker_template, tmp_path / 'wt', 'fail')
+    with pytest.raises(WorkerError, match='exited'):
+        _run(worker_template, tmp_path / 'wt', 'crash')
+    # A new worker is started after a crash
+    _, second_pid = _run(worker_template, tmp_path / 'wt', 'a')
+    assert first_pid != second_pid
@@ -19,9 +19,15 @@ if (3, 0) < sys.version_info < (3, 11):
     def toml_load(path: Path) -> dict:
         with open(path) as file:
             return toml.load(file)
+
+    def toml_loads(content: str) -> dict:
+        return toml.loads(content)
 else:
     import tomllib
 
     def toml_load(path: Path) -> dict:
         with open(path, 'rb') as file:
             return tomllib.load(file)
+
+    def toml_loads(content: str) -> dict:
+        return tomllib.loads(content)
@@ -0,0 +1,121 @@
+"""Listings of the trees of commits
+
+The planner and the fingerprints of computations both need the blobs and the
+annexed files of the commit of a computation. Listings are read with a single
+`git ls-tree` and a single `git cat-file --batch` per commit.
+"""
+
+from __future__ import annotations
+
+import functools
+import subprocess
+from typing import (
+    TYPE_CHECKING,
+    NamedTuple,
+)
+
+from datalad_remake import PatternPath
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+
+# Prefix of the location of annexed content in symlinks and pointer files
+annex_object_marker = '/annex/objects/'
+
+# Escaped characters in the names of annex object files
+key_file_escapes = {'c': ':', 's': '%', 'a': '&'}
+
+# Upper limit for the size of a blob that is checked for being a pointer file
+max_pointer_size = 1024
+
+
+class TreeEntry(NamedTuple):
+    """An entry of a recursive tree listing"""
+
+    mode: str
+    type: str
+    object: str
+    size: str
+
+
+@functools.lru_cache(maxsize=16)
+def get_tree_entries(dataset_dir: Path, commit: str) -> dict[PatternPath, TreeEntry]:
+    """Get all blobs and submodule commits in `commit`
+
+    The result is cached, because commits are immutable.
+    """
+    listing = subprocess.run(
+        ['git', 'ls-tree', '-r', '-l', '-z', '--full-tree', commit],
+        cwd=dataset_dir,
+        capture_output=True,
+        check=True,
+    ).stdout.decode()
+
+    entries: dict[PatternPath, TreeEntry] = {}
+    for entry in filter(None, listing.split('\0')):
+        info, path = entry.split('\t', 1)
+        entries[PatternPath(path)] = TreeEntry(*info.split())
+    return entries
+
+
+@functools.lru_cache(maxsize=16)
+def get_annexed_keys(dataset_dir: Path, commit: str) -> dict[PatternPath, str]:
+    """Get the keys of all annexed files in `commit`
+
+    Annexed files are symlinks or pointer files, whose content contains the
+    key. Files with equal content share a blob, e.g. equal symlinks in one
+    directory. The result is cached, because commits are immutable.
+    """
+    # Paths of the blobs that might be symlinks or pointer files
+    candidates: dict[str, list[PatternPath]] = {}
+    for path, entry in get_tree_entries(dataset_dir, commit).items():
+        if entry.type != 'blob':
+            continue
+        if entry.mode == '120000' or (
+            entry.size.isdigit() and int(entry.size) <= max_pointer_size
+        ):
+            candidates.setdefault(entry.object, []).append(path)
+    if not candidates:
+        return {}
+
+    contents = subprocess.run(
+        ['git', 'cat-file', '--batch'],
+        cwd=dataset_dir,
+        input=''.join(f'{blob}\n' for blob in candidates).encode(),
+        capture_output=True,
+        check=True,
+    ).stdout
+
+    keys: dict[PatternPath, str] = {}
+    position = 0
+    while position < len(contents):
+        header_end = contents.index(b'\n', position)
+        blob, _, size = contents[position:header_end].decode().split()
+        content = contents[header_end + 1 : header_end + 1 + int(size)]
+        position = header_end + 1 + int(size) + 1
+        target = content.decode(errors='replace').strip()
+        if annex_object_marker in target:
+            key = key_from_file_name(target.rsplit('/', 1)[-1])
+            for path in candidates[blob]:
+                keys[path] = key
+    return keys
+
+
+def key_from_file_name(name: str) -> str:
+    """Get an annex key from the name of its object file
+
+    git-annex escapes `/` as `%`, and `:`, `%`, and `&` as `&c`, `&s`, and
+    `&a` in the names of object files.
+    """
+    key = []
+    characters = iter(name)
+    for character in characters:
+        if character == '%':
+            key.append('/')
+        elif character == '&':
+            escaped = next(characters, '')
+            key.append(key_file_escapes.get(escaped, '&' + escaped))
+        else:
+            key.append(character)
+    return ''.join(key)
@@ -0,0 +1,234 @@
+"""File-system work queue for computations on several hosts
+
+If `datalad.make.queue-dir` is set, the special remote does not execute
+computations itself, but adds them to a queue in this directory, which should
+be on storage that is shared by all hosts. `datalad make-worker` processes on
+any host claim jobs, execute them, and publish their outputs. The special
+remote waits for the job to finish, and collects the outputs.
+
+The queue directory contains the following subdirectories:
+
+- `pending`: a JSON file per job that was not claimed yet
+- `claimed`: a JSON file per job that is executed by a worker. Workers claim
+  a job by renaming its file from `pending` to `claimed`, which is atomic, so
+  that every job is claimed by exactly one worker. The modification time of
+  the file is the lease of the worker on the job. The worker renews it while
+  it executes the job. If a worker dies, its lease expires, and the job is
+  moved back to `pending`, either by the waiting special remote, or by the
+  next worker that claims a job.
+- `results`: a directory per job, with the outputs of the job at their paths
+  relative to the dataset
+- `done`: a JSON file per finished job, with its status and outputs
+
+A job contains the location of the dataset, the requested annex key, and the
+compute instruction, i.e. the root version and the name of the specification.
+Workers read and verify the specification with their own configuration.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import json
+import logging
+import os
+import shutil
+import socket
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import (
+    TYPE_CHECKING,
+    Any,
+)
+
+if TYPE_CHECKING:
+    from collections.abc import (
+        Callable,
+        Generator,
+    )
+
+lgr = logging.getLogger('datalad.remake.utils.work_queue')
+
+
+# Seconds between two checks for new or finished jobs
+poll_interval = 0.5
+
+# Seconds after which the claim of a worker that stopped renewing it expires.
+# The queue directory is shared by several hosts, the duration is therefore
+# much longer than the renewal interval, to tolerate clock differences.
+lease_duration = 120.0
+
+# Seconds between two renewals of the lease on a claimed job
+heartbeat_interval = 10.0
+
+
+class QueueTimeoutError(TimeoutError):
+    """No worker claimed a job in time"""
+
+
+class WorkQueue:
+    """A queue of computations in a directory"""
+
+    def __init__(self, directory: Path):
+        self.directory = directory
+        self.pending_dir = directory / 'pending'
+        self.claimed_dir = directory / 'claimed'
+        self.results_root = directory / 'results'
+        self.done_dir = directory / 'done'
+
+    def enqueue(self, job: dict[str, Any]) -> str:
+        """Add `job` to the queue and return its id
+
+        Job ids start with the time of their creation, and workers claim jobs
+        in the order of their ids.
+        """
+        job_id = f'{time.time_ns()}-{socket.gethostname()}-{uuid.uuid4().hex[:8]}'
+        _write_json(self.pending_dir / f'{job_id}.json', job)
+        lgr.debug('enqueued job %s: %r', job_id, job)
+        return job_id
+
+    def wait(
+        self,
+        job_id: str,
+        notify: Callable[[str], Any] | None = None,
+        claim_timeout: float | None = None,
+    ) -> dict[str, Any]:
+        """Wait until job `job_id` is finished and return its status
+
+        If no worker claims the job within `claim_timeout` seconds, the job is
+        withdrawn, and `QueueTimeoutError` is raised. If the lease of the
+        worker that claimed the job expires, the job is queued again, and
+        `claim_timeout` applies again. `notify` is called with a message,
+        whenever the state of the job changes.
+        """
+        done_file = self.done_dir / f'{job_id}.json'
+        pending_file = self.pending_dir / f'{job_id}.json'
+        start = time.monotonic()
+        reported_state = None
+        while not done_file.exists():
+            state = 'pending' if pending_file.exists() else 'claimed'
+            if state == 'claimed' and self._requeue_expired(job_id):
+                if notify is not None:
+                    notify(f'lease on job {job_id} expired, queued it again')
+                start = time.monotonic()
+                continue
+            if state != reported_state:
+                message = (
+                    f'job {job_id} is waiting for a worker'
+                    if state == 'pending'
+                    else f'job {job_id} is executed by a worker'
+                )
+                lgr.info(message)
+                if notify is not None:
+                    notify(message)
+                reported_state = state
+            if (
+                state == 'pending'
+                and claim_timeout is not None
+                and time.monotonic() - start > claim_timeout
+            ):
+                try:
+                    pending_file.unlink()
+                except FileNotFoundError:
+                    # A worker claimed the job in the meantime
+                    continue
+                msg = f'no worker claimed job {job_id} within {claim_timeout}s'
+                raise QueueTimeoutError(msg)
+            time.sleep(poll_interval)
+        return _read_json(done_file)
+
+    def claim(self) -> tuple[str, dict[str, Any]] | None:
+        """Claim the oldest pending job, return `None` if there is none
+
+        Jobs whose lease expired are queued again before, the caller must
+        renew the lease of the claimed job, see `leased`.
+        """
+        with contextlib.suppress(OSError):
+            for path in self.claimed_dir.glob('*.json'):
+                self._requeue_expired(path.name[: -len('.json')])
+        try:
+            candidates = sorted(self.pending_dir.glob('*.json'))
+        except OSError:
+            return None
+        self.claimed_dir.mkdir(parents=True, exist_ok=True)
+        for path in candidates:
+            claimed_file = self.claimed_dir / path.name
+            try:
+                # Renaming keeps the modification time, the lease starts
+                # before the job is claimed, to not appear expired.
+                os.utime(path)
+                path.rename(claimed_file)
+            except FileNotFoundError:
+                # Another worker claimed the job
+                continue
+            job_id = path.name[: -len('.json')]
+            self.renew(job_id)
+            # Outputs of a previous attempt, whose lease expired, might be
+            # incomplete.
+            shutil.rmtree(self.get_results_dir(job_id), ignore_errors=True)
+            lgr.debug('claimed job %s', job_id)
+            return job_id, _read_json(claimed_file)
+        return None
+
+    def renew(self, job_id: str) -> None:
+        """Renew the lease on the claimed job `job_id`"""
+        with contextlib.suppress(FileNotFoundError):
+            os.utime(self.claimed_dir / f'{job_id}.json')
+
+    @contextlib.contextmanager
+    def leased(self, job_id: str) -> Generator[None]:
+        """Renew the lease on the claimed job `job_id` in the background"""
+        stop = threading.Event()
+
+        def heartbeat():
+            while not stop.wait(heartbeat_interval):
+                self.renew(job_id)
+
+        thread = threading.Thread(target=heartbeat, daemon=True)
+        thread.start()
+        try:
+            yield
+        finally:
+            stop.set()
+            thread.join()
+
+    def get_results_dir(self, job_id: str) -> Path:
+        """Get the directory for the outputs of job `job_id`"""
+        return self.results_root / job_id
+
+    def finish(self, job_id: str, status: dict[str, Any]) -> None:
+        """Publish the status of a claimed job"""
+        _write_json(self.done_dir / f'{job_id}.json', status)
+        (self.claimed_dir / f'{job_id}.json').unlink(missing_ok=True)
+
+    def _requeue_expired(self, job_id: str) -> bool:
+        """Queue the claimed job `job_id` again, if its lease expired"""
+        claimed_file = self.claimed_dir / f'{job_id}.json'
+        try:
+            if time.time() - claimed_file.stat().st_mtime <= lease_duration:
+                return False
+            claimed_file.rename(self.pending_dir / claimed_file.name)
+        except FileNotFoundError:
+            # The job was finished, or queued again by someone else
+            return False
+        lgr.warning('lease on job %s expired, queued it again', job_id)
+        return True
+
+    def remove(self, job_id: str) -> None:
+        """Remove the outputs and the status of a finished job"""
+        shutil.rmtree(self.get_results_dir(job_id), ignore_errors=True)
+        (self.done_dir / f'{job_id}.json').unlink(missing_ok=True)
+
+
+def _read_json(path: Path) -> dict[str, Any]:
+    return json.loads(path.read_text())
+
+
+def _write_json(path: Path, content: dict[str, Any]) -> None:
+    # Readers only see complete files, because they are created by renaming.
+    # Temporary files do not match the `*.json` pattern of pending jobs.
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temporary_path = path.with_name(f'{path.name}.{os.getpid()}.tmp')
+    temporary_path.write_text(json.dumps(content))
+    temporary_path.replace(path)
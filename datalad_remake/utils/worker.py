@@ -0,0 +1,186 @@
+"""Persistent workers for templates of type `worker`
+
+A worker template declares a long-running command in `worker`. The command is
+started once per process and template, and receives jobs as line-delimited
+JSON on its stdin. For every job, the worker writes exactly one line of JSON to
+its stdout. Requests have the form::
+
+    {"id": 1, "root_directory": "/tmp/...", "parameters": {"name": "value"},
+     "outputs": ["results/*.txt"], "stdout": "/tmp/.../stdout.txt"}
+
+`root_directory` is the worktree in which the job has to be executed,
+`outputs` contains the output patterns of the computation, and `stdout` is
+either `null` or the path of a file that should receive the output of the job.
+Responses have the form::
+
+    {"id": 1, "status": "ok"}
+    {"id": 1, "status": "error", "message": "..."}
+
+Workers are started in the system temporary directory, because a worker
+outlives the worktree of its first job. They are stopped when the process
+exits. The resources `cpus` and `memory` of the template apply to the worker
+process, `walltime` is not enforced for workers.
+"""
+
+from __future__ import annotations
+
+import atexit
+import contextlib
+import json
+import logging
+import subprocess
+import tempfile
+import threading
+from itertools import count
+from typing import (
+    TYPE_CHECKING,
+    Any,
+)
+
+from datalad_remake.utils.resources import Resources
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+lgr = logging.getLogger('datalad.remake.utils.worker')
+
+
+class WorkerError(RuntimeError):
+    """A worker failed to execute a job"""
+
+
+class Worker:
+    """A long-running worker process that executes jobs sequentially"""
+
+    def __init__(self, command: list[str], resources: Resources | None = None):
+        self.command = command
+        self.resources = resources or Resources()
+        self.process: subprocess.Popen | None = None
+        self.job_ids = count(1)
+        self.lock = threading.Lock()
+        # Holds the CPU reservation of the running worker process
+        self.reservation = contextlib.ExitStack()
+
+    def start(self) -> subprocess.Popen:
+        lgr.debug('starting worker: %s', self.command)
+        cpus = self.reservation.enter_context(self.resources.reserve_cpus())
+        self.process = subprocess.Popen(  # noqa: S603
+            self.command,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            cwd=tempfile.gettempdir(),
+            env=self.resources.environment(),
+            text=True,
+            bufsize=1,
+            preexec_fn=self.resources.limiter(cpus),  # noqa: PLW1509
+        )
+        return self.process
+
+    def run_job(
+        self,
+        root_directory: Path,
+        parameters: dict[str, Any],
+        outputs: list[str],
+        stdout: Path | None,
+    ) -> None:
+        """Send a job to the worker and wait for its completion"""
+        with self.lock:
+            process = self.process
+            if process is None or process.poll() is not None:
+                process = self.start()
+            requests, responses = process.stdin, process.stdout
+            if requests is None or responses is None:
+                msg = f'worker {self.command} has no stdin or stdout'
+                raise WorkerError(msg)
+
+            job_id = next(self.job_ids)
+            request = {
+                'id': job_id,
+                'root_directory': str(root_directory),
+                'parameters': parameters,
+                'outputs': outputs,
+                'stdout': None if stdout is None else str(stdout),
+            }
+            lgr.debug('worker job: %s', request)
+            try:
+                requests.write(json.dumps(request) + '\n')
+                requests.flush()
+                line = responses.readline()
+            except OSError as e:
+                self.stop()
+                msg = f'worker {self.command} failed: {e}'
+                raise WorkerError(msg) from e
+
+            if not line:
+                self.stop()
+                msg = f'worker {self.command} exited while processing job {job_id}'
+                raise WorkerError(msg)
+
+            try:
+                response = json.loads(line)
+            except json.JSONDecodeError as e:
+                self.stop()
+                msg = f'worker {self.command} sent an invalid response: {line!r}'
+                raise WorkerError(msg) from e
+
+            if response.get('id') != job_id:
+                self.stop()
+                msg = (
+                    f'worker {self.command} responded to job {response.get("id")!r} '
+                    f'instead of job {job_id}'
+                )
+                raise WorkerError(msg)
+            if response.get('status') != 'ok':
+                msg = (
+                    f'worker {self.command} failed to execute job {job_id}: '
+                    f'{response.get("message", "unknown error")}'
+                )
+                raise WorkerError(msg)
+
+    def stop(self) -> None:
+        """Close stdin of the worker and wait for it to exit"""
+        process, self.process = self.process, None
+        if process is None:
+            return
+        lgr.debug('stopping worker: %s', self.command)
+        try:
+            if process.stdin:
+                process.stdin.close()
+            process.wait(timeout=10)
+        except (OSError, subprocess.TimeoutExpired):
+            process.kill()
+            process.wait()
+        finally:
+            if process.stdout:
+                process.stdout.close()
+            self.reservation.close()
+
+
+# Running workers, keyed by template blob ID and worker command
+_workers: dict[tuple[str, tuple[str, ...]], Worker] = {}
+_workers_lock = threading.Lock()
+
+
+def get_worker(
+    blob_id: str,
+    command: list[str],
+    resources: Resources | None = None,
+) -> Worker:
+    """Get the worker for a template, create it, if it does not exist yet"""
+    key = (blob_id, tuple(command))
+    with _workers_lock:
+        worker = _workers.get(key)
+        if worker is None:
+            worker = Worker(command, resources)
+            _workers[key] = worker
+        return worker
+
+
+@atexit.register
+def stop_workers() -> None:
+    """Stop all workers of this process"""
+    with _workers_lock:
+        workers = list(_workers.values())
+        _workers.clear()
+    for worker in workers:
+        worker.stop()